@@ -1,4 +1,5 @@
 
+import os
 from pathlib import Path
 
 class Config:
@@ -7,19 +8,149 @@ class Config:
     DATA_DIR = BASE_DIR / "data"
     RAW_PDF_DIR = DATA_DIR / "raw_pdfs"
     DB_PATH = DATA_DIR / "audit.db"
+    LLM_CACHE_PATH = DATA_DIR / "llm_cache.db"
+    VECTOR_STORE_DIR = DATA_DIR / "vector_store"
+    EMBEDDING_CACHE_PATH = DATA_DIR / "embedding_cache.db"
+    NUMPY_STORE_DIR = DATA_DIR / "numpy_store"
+
+    # Audit Store
+    # With write-behind on, audit rows are buffered and committed in batches
+    # (every AUDIT_FLUSH_ROWS rows or AUDIT_FLUSH_SECONDS, and at run end).
+    AUDIT_WRITE_BEHIND = True
+    AUDIT_FLUSH_ROWS = 100
+    AUDIT_FLUSH_SECONDS = 5.0
+    AUDIT_BUSY_TIMEOUT = 30  # seconds to wait on a locked database
+    # WAL lets batch workers write while others read, but needs every process
+    # on one host; use "DELETE" when workers on several hosts share the DB
+    # over a network filesystem.
+    AUDIT_JOURNAL_MODE = "WAL"
+
+    # Batch Work Queue
+    # batch.py records every (section, chunk) prompt of a run as a job, so an
+    # interrupted batch resumes its unfinished runs where they stopped. A job
+    # whose LLM call fails is retried after JOB_BACKOFF_SECONDS, doubling per
+    # attempt up to JOB_MAX_BACKOFF_SECONDS, and fails after JOB_MAX_ATTEMPTS.
+    # A leased job returns to the queue when its lease runs out.
+    JOB_LEASE_SECONDS = 120
+    JOB_MAX_ATTEMPTS = 3
+    JOB_BACKOFF_SECONDS = 5.0
+    JOB_MAX_BACKOFF_SECONDS = 300.0
+    # Workers renew their leases every JOB_HEARTBEAT_SECONDS, so a lease only
+    # runs out when its worker died.
+    JOB_HEARTBEAT_SECONDS = 30.0
+    WORKER_POLL_SECONDS = 2.0  # idle wait between looks for due work
 
     # AI Settings
     DEFAULT_MODEL = "gemma2:2b"
 
+    # Model Cascade
+    # Models to try in order, smallest first, e.g. ("gemma2:2b", "llama3.1:8b").
+    # A prompt only escalates to the next model when its JSON does not parse,
+    # its quote fails verification or its confidence is low. Empty disables
+    # the cascade and every prompt goes to DEFAULT_MODEL.
+    CASCADE_MODELS = ()
+
+    # Concurrency
+    # Max LLM calls kept in flight at once. Match this to the server's
+    # OLLAMA_NUM_PARALLEL so its parallel slots are kept busy.
+    MAX_CONCURRENT_REQUESTS = 4
+
+    # Grouped Extraction
+    # When several sections retrieve the same chunk, ask all of their
+    # questions in one prompt instead of sending the chunk once per section.
+    GROUPED_EXTRACTION = False
+
+    # Extraction Policy
+    # Chunks retrieved with a BM25 score below MIN_RETRIEVAL_SCORE are never
+    # sent to the LLM (0 disables the gate). With STOP_ON_HIGH_CONFIDENCE a
+    # section stops after its first verified high-confidence fact, and with
+    # LEXICAL_PREFILTER a chunk must mention one of its section's keywords.
+    MIN_RETRIEVAL_SCORE = 0.0
+    STOP_ON_HIGH_CONFIDENCE = False
+    LEXICAL_PREFILTER = False
+    SECTION_KEYWORDS = {
+        "Indications": ("indicat", "treatment", "treat "),
+        "Dosage": ("dose", "dosage", "mg", "administ"),
+        "Contraindications": ("contraindicat",),
+        "Warnings": ("warning", "precaution", "risk")
+    }
+
+    # Response Cache
+    # Greedy decoding + fixed seed make responses reproducible, so identical
+    # (model, prompt, options) calls are served from disk.
+    LLM_CACHE_ENABLED = True
+    LLM_CACHE_MAX_ENTRIES = 50_000
+    # Puts between LRU eviction passes; the cache may exceed its bound by this many
+    LLM_CACHE_EVICT_EVERY = 100
+
+    # Ingestion
+    # Worker processes for PDF parsing. A single label is only split across
+    # processes when it has at least INGEST_PARALLEL_MIN_PAGES pages, since
+    # process start-up outweighs the parse time of short documents.
+    INGEST_WORKERS = min(4, os.cpu_count() or 1)
+    INGEST_PARALLEL_MIN_PAGES = 40
+
+    # Parsed page text is cached per PDF content hash. Bump INGEST_VERSION
+    # whenever page extraction changes so stale entries stop matching.
+    INGEST_CACHE_ENABLED = True
+    INGEST_CACHE_DIR = DATA_DIR / "ingest_cache"
+    INGEST_VERSION = "1"
+
+    # Chunking
+    # "page" keeps one chunk per page. "block" and "section" split long pages
+    # into windows of at most CHUNK_TOKEN_BUDGET tokens so prompts stay short.
+    CHUNK_STRATEGY = "page"
+    CHUNK_TOKEN_BUDGET = 512
+    CHUNK_OVERLAP_TOKENS = 64
+
+    # Knowledge Base
+    EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+    EMBEDDING_DIM = 384  # vector size of EMBEDDING_MODEL; cached vectors of another size are re-embedded
+    KB_COLLECTION = "fda_facts"
+    EMBED_BATCH_SIZE = 256  # facts embedded and upserted per batch
+    EMBEDDING_CACHE_ENABLED = True
+    QUERY_SERVER_HOST = "127.0.0.1"
+    QUERY_SERVER_PORT = 8765
+
+    # Vector backend: "chroma" (PersistentClient) or "numpy" (memory-mapped
+    # exact search). The numpy store keeps vectors as float32 or int8.
+    VECTOR_BACKEND = "chroma"
+    NUMPY_STORE_DTYPE = "float32"
+
     # Determinism Settings
     # Fix this to 42 for development. 
     # Change to None or random.randint() only when stress-testing.
     SEED = 42  
     TEMPERATURE = 0.0 # Greedy decoding for maximum factual consistency
+
+    # Ollama Client
+    # A single pooled client serves every request. OLLAMA_KEEP_ALIVE keeps the
+    # model loaded between calls and across idle gaps (Ollama's own default
+    # unloads it after 5 idle minutes; -1 never unloads). LLM_NUM_CTX and
+    # LLM_NUM_THREAD are passed to the runner when set; None keeps the model's
+    # defaults. With LLM_WARMUP, each run loads its models before timing starts.
+    OLLAMA_HOST = None  # None uses $OLLAMA_HOST, else http://localhost:11434
+    OLLAMA_KEEP_ALIVE = "30m"
+    OLLAMA_TIMEOUT = 600  # seconds
+    LLM_NUM_CTX = None
+    LLM_NUM_THREAD = None
+    LLM_WARMUP = True
+
+    # Generation Limits
+    # Responses are streamed and reading stops once the JSON object closes;
+    # num_predict caps the tokens a runaway generation can produce.
+    LLM_MAX_OUTPUT_TOKENS = 512
     
     # Validation
     VERIFICATION_THRESHOLD = 85
 
+    # Quotes that fail verification against their chunk are looked up in a
+    # whole-document index built at ingestion, so a quote copied from a
+    # neighbouring page or across a page break still yields a fact. Quotes
+    # shorter than QUOTE_INDEX_MIN_CHARS (normalized) are too generic to place.
+    QUOTE_INDEX_ENABLED = True
+    QUOTE_INDEX_MIN_CHARS = 20
+
     # The Target Questions
     TARGET_SECTIONS = {
         "Indications": "What diseases or conditions is this drug indicated to treat?",
@@ -1,28 +1,99 @@
 import time
-import ollama
 import json
-from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
 from src.core.schema import DocumentChunk, Fact, ConfidenceLevel, Citation
 from src.core.verifier import QuoteVerifier
-from src.infra.store import AuditStore 
+from src.infra.cache import ResponseCache
+from src.infra.llm import LLMClient, get_client
+from src.infra.quote_index import QuoteHit, QuoteIndex, normalize
+from src.infra.store import AuditStore
 
 from src.config import Config
 
+# Ollama's structured-output mode for every extraction request
+RESPONSE_FORMAT = "json"
+
+
+class _JsonObjectEnd:
+    """
+    Tracks a streamed response and reports where its top-level JSON value
+    closes, so generation can stop there instead of running to num_predict.
+    """
+
+    def __init__(self):
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+
+    def feed(self, text: str) -> int:
+        """Returns the index in `text` where the value closed, or -1."""
+        for index, char in enumerate(text):
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == "\\":
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = True
+            elif char in "{[":
+                self.depth += 1
+            elif char in "}]":
+                self.depth -= 1
+                if self.depth == 0:
+                    return index
+        return -1
+
+
+@dataclass
+class _Outcome:
+    """
+    Result of one extraction attempt, computed without touching the store.
+    `interactions` holds (response, is_valid_json, latency, cached, model_name,
+    metrics) rows in the order they must be written to the audit log; `facts` holds the verified answers
+    keyed by the caller's label for each question. `error` is set when the
+    last model call raised (e.g. the server was unreachable) rather than
+    answering, i.e. the prompt is worth retrying later.
+    """
+    chunk_id: str
+    question: str
+    prompt: str
+    interactions: List[Tuple[str, bool, float, bool, str, dict]] = field(default_factory=list)
+    facts: Dict[str, Fact] = field(default_factory=dict)
+    error: Optional[str] = None
+
+
 class ExtractionAgent:
     def __init__(self,
                  model_name: str = Config.DEFAULT_MODEL,
                  store: Optional[AuditStore] = None,
                  run_id: str = None,
-                 seed: int = Config.SEED
+                 seed: int = Config.SEED,
+                 max_concurrency: int = Config.MAX_CONCURRENT_REQUESTS,
+                 cache: Optional[ResponseCache] = None,
+                 models: Optional[Sequence[str]] = None,
+                 client: Optional[LLMClient] = None,
+                 quote_index: Optional[QuoteIndex] = None
     ):
         self.model_name = model_name
+        # Model cascade, smallest first. Each prompt only moves on to the next
+        # model when the previous answer is unusable (see _needs_escalation).
+        self.models = list(models) if models else [model_name]
         self.store = store
         self.run_id = run_id
         self.seed = seed
+        self.max_concurrency = max_concurrency
+        self.cache = cache
+        self.client = client or get_client()
+        # Whole-document fallback for quotes that are not in the prompt's chunk
+        self.quote_index = quote_index
         self.verifier = QuoteVerifier(threshold=Config.VERIFICATION_THRESHOLD)
 
-    def extract_fact(self, chunk: DocumentChunk, question: str) -> Optional[Fact]:
-        prompt = f"""
+    def _build_prompt(self, chunk: DocumentChunk, question: str) -> str:
+        return f"""
         You are an expert FDA Regulatory Analyst.
         TASK: Extract the answer to the QUESTION below based ONLY on the provided TEXT context.
         
@@ -45,84 +116,424 @@ class ExtractionAgent:
         }}
         """
 
-        raw_response = ""
+    def _build_grouped_prompt(self, chunk: DocumentChunk, questions: Dict[str, str]) -> str:
+        question_lines = "\n        ".join(
+            f'- "{key}": {question}' for key, question in questions.items()
+        )
+        schema_lines = ",\n".join(
+            f'            "{key}": {{"value": "...", "quote_snippet": "...", "confidence": "high|medium|low"}}'
+            for key in questions
+        )
+        return f"""
+        You are an expert FDA Regulatory Analyst.
+        TASK: Answer EACH of the QUESTIONS below based ONLY on the provided TEXT context.
+
+        RULES:
+        1. If an answer is not clearly stated in the text, set its value="NOT_FOUND".
+        2. Each "quote_snippet" MUST be a single, contiguous string exactly as it appears in the text.
+        3. DO NOT combine separate sentences into one quote. Pick the single best sentence.
+        4. Output must be one valid JSON object with exactly one key per question.
+
+        TEXT CONTEXT (Page {chunk.page_number}):
+        {chunk.text_content}
+
+        QUESTIONS:
+        {question_lines}
+
+        JSON SCHEMA:
+        {{
+{schema_lines}
+        }}
+        """
+
+    def warm_up(self) -> float:
+        """
+        Loads every model the agent may call. Returns the total seconds taken,
+        i.e. the cold-start cost kept out of the per-call latencies.
+        """
+        return sum(self.client.warm_up(model_name) for model_name in self.models)
+
+    def extract_fact(self, chunk: DocumentChunk, question: str) -> Optional[Fact]:
+        outcome = self._run(chunk, question)
+        self._commit(outcome)
+        return outcome.facts.get(question)
+
+    def extract_many(
+            self,
+            tasks: Iterable[Tuple[DocumentChunk, str]],
+            max_concurrency: Optional[int] = None
+        ) -> Iterator[Optional[Fact]]:
+        """
+        Extracts facts for many (chunk, question) pairs, keeping up to
+        `max_concurrency` LLM calls in flight.
+
+        Results are yielded in the same order as `tasks`, and audit rows are
+        written from the calling thread in that order, so the store ends up
+        with exactly the rows a sequential loop over `extract_fact` would log.
+        """
+        for (_, question), outcome in self._dispatch(tasks, lambda task: self._run(*task), max_concurrency):
+            yield outcome.facts.get(question)
+
+    def extract_grouped(self, chunk: DocumentChunk, questions: Dict[str, str]) -> Dict[str, Fact]:
+        """
+        Answers several questions about one chunk with a single prompt.
+        `questions` maps a label (e.g. the section title) to its question;
+        the verified facts come back under the same labels.
+        """
+        outcome = self._run_grouped(chunk, questions)
+        self._commit(outcome)
+        return outcome.facts
+
+    def extract_grouped_many(
+            self,
+            groups: Iterable[Tuple[DocumentChunk, Dict[str, str]]],
+            max_concurrency: Optional[int] = None
+        ) -> Iterator[Dict[str, Fact]]:
+        """Concurrent, order-preserving version of `extract_grouped`."""
+        for facts, _ in self.extract_grouped_results(groups, max_concurrency):
+            yield facts
+
+    def extract_grouped_results(
+            self,
+            groups: Iterable[Tuple[DocumentChunk, Dict[str, str]]],
+            max_concurrency: Optional[int] = None
+        ) -> Iterator[Tuple[Dict[str, Fact], Optional[str]]]:
+        """Like `extract_grouped_many`, but yields (facts, error) so callers can retry failed calls."""
+        for _, outcome in self._dispatch(groups, lambda group: self._run_grouped(*group), max_concurrency):
+            yield outcome.facts, outcome.error
+
+    def _dispatch(self, jobs: Iterable, run: Callable[..., _Outcome], max_concurrency: Optional[int]):
+        jobs = list(jobs)
+        workers = max_concurrency or self.max_concurrency
+
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            for job, outcome in zip(jobs, pool.map(run, jobs)):
+                self._commit(outcome)
+                yield job, outcome
+
+    def _run_grouped(self, chunk: DocumentChunk, questions: Dict[str, str]) -> _Outcome:
+        # A lone question keeps the single-question prompt, so ungrouped
+        # chunks produce exactly the same prompts and audit rows as before.
+        if len(questions) == 1:
+            (key, question), = questions.items()
+            return self._run(chunk, question, key=key)
+
+        prompt = self._build_grouped_prompt(chunk, questions)
+        outcome = _Outcome(chunk_id=chunk.chunk_id, question="\n".join(questions.values()), prompt=prompt)
+
+        # Escalate the whole prompt while any answer still needs a bigger
+        # model, but only replace the answers that did
+        pending = list(questions)
+        for model_name in self.models:
+            pending = self._attempt_grouped(outcome, model_name, chunk, questions, pending)
+            if not pending:
+                break
+        return outcome
+
+    def _attempt_grouped(
+            self,
+            outcome: _Outcome,
+            model_name: str,
+            chunk: DocumentChunk,
+            questions: Dict[str, str],
+            pending: List[str]
+        ) -> List[str]:
+        """Runs a grouped prompt on one model. Returns the labels that need escalation."""
         start_time = time.perf_counter()
 
         try:
-            response = ollama.chat(
-                model=self.model_name,
-                messages=[
-                    {
-                        'role': 'user',
-                        'content': prompt
-                    },
-                ],
-                format='json',
-                options={
-                    "seed": self.seed,
-                    "temperature": Config.TEMPERATURE
-                }
-            )
-            
-            latency = time.perf_counter() - start_time
-            
-            raw_response = response['message']['content']
+            raw_response, latency, cached, metrics = self._chat(outcome.prompt, model_name)
+        except Exception as e:
+            outcome.error = str(e)
+            outcome.interactions.append((str(e), False, time.perf_counter() - start_time, False, model_name, {}))
+            return pending
+        outcome.error = None
+
+        try:
             data = json.loads(raw_response)
-            
-            if self.store and self.run_id:
-                self.store.log_interaction(
-                    run_id=self.run_id,
-                    chunk_id=chunk.chunk_id,
-                    question=question,
-                    prompt=prompt,
-                    response=raw_response,
-                    is_valid_json=True,
-                    latency=latency
-                )
-
-            # Hardening logic
-            if isinstance(data.get('value'), str) and "NOT_FOUND" in data['value']:
-                return None
-            if isinstance(data.get('value'), list):
-                data['value'] = "; ".join([str(x) for x in data['value']])
-            if isinstance(data.get('quote_snippet'), list):
-                data['quote_snippet'] = max(data['quote_snippet'], key=len)
+            if not isinstance(data, dict):
+                raise ValueError("Expected a JSON object keyed by question")
+        except Exception:
+            outcome.interactions.append((raw_response, False, latency, cached, model_name, metrics))
+            return pending
 
-            verification = self.verifier.verify(chunk.text_content, data.get('quote_snippet', ''))
-            
-            if not verification['is_verified']:
-                return None
+        outcome.interactions.append((raw_response, True, latency, cached, model_name, metrics))
 
-            fact = Fact(
-                attribute=question,
-                value=data['value'],
-                is_negation=False,
-                confidence=ConfidenceLevel(data.get('confidence', 'low')),
-                reasoning=f"Extracted via {self.model_name} in {latency:.2f}s",
-                citations=[Citation(
-                    doc_id=chunk.doc_name,
-                    page_number=chunk.page_number,
-                    quote_snippet=data['quote_snippet']
-                )]
-            )
+        answers = {key: data.get(key) for key in pending}
+        malformed = {key for key, answer in answers.items() if not isinstance(answer, dict)}
+
+        # Verify every quote from this prompt against the chunk in one batch;
+        # answers that fail hardening are verified (and rejected) one by one
+        quotes = {}
+        for key, answer in answers.items():
+            try:
+                if key not in malformed and self._harden(answer) and isinstance(answer.get('quote_snippet', ''), str):
+                    quotes[key] = answer.get('quote_snippet', '')
+            except Exception:
+                malformed.add(key)
+        verifications = dict(zip(quotes, self.verifier.verify_many(chunk.text_content, list(quotes.values()))))
+
+        escalate = []
+        for key, answer in answers.items():
+            if key in malformed:
+                escalate.append(key)
+                continue
+            try:
+                fact = self._to_fact(chunk, questions[key], answer, latency, model_name, verifications.get(key))
+            except Exception:
+                # One malformed answer must not discard the others
+                escalate.append(key)
+                continue
+            if fact:
+                outcome.facts[key] = fact
+            if self._needs_escalation(answer, fact):
+                escalate.append(key)
+
+        return escalate
+
+    def _run(self, chunk: DocumentChunk, question: str, key: Optional[str] = None) -> _Outcome:
+        """Calls the LLM and verifies the answer. Safe to run in worker threads."""
+        prompt = self._build_prompt(chunk, question)
+        outcome = _Outcome(chunk_id=chunk.chunk_id, question=question, prompt=prompt)
+
+        for model_name in self.models:
+            fact, escalate = self._attempt(outcome, model_name, chunk, question)
+            # A later model's verified answer replaces an earlier low-confidence one
+            if fact:
+                outcome.facts[key or question] = fact
+            if not escalate:
+                break
+        return outcome
+
+    def _attempt(
+            self,
+            outcome: _Outcome,
+            model_name: str,
+            chunk: DocumentChunk,
+            question: str
+        ) -> Tuple[Optional[Fact], bool]:
+        """Runs the single-question prompt on one model. Returns (fact, needs_escalation)."""
+        raw_response = ""
+        cached = False
+        metrics = {}
+        start_time = time.perf_counter()
 
-            if self.store and self.run_id:
-                self.store.save_fact(self.run_id, fact)
+        try:
+            outcome.error = None
+            raw_response, latency, cached, metrics = self._chat(outcome.prompt, model_name)
+            data = json.loads(raw_response)
+
+            outcome.interactions.append((raw_response, True, latency, cached, model_name, metrics))
 
-            return fact
+            fact = self._to_fact(chunk, question, data, latency, model_name)
+            return fact, self._needs_escalation(data, fact)
 
         # Exception handling:
-        # Simply store the interaction and return None
+        # Simply record the interaction and return no fact
         except Exception as e:
             latency = time.perf_counter() - start_time
-            if self.store and self.run_id:
-                self.store.log_interaction(
-                    run_id=self.run_id,
-                    chunk_id=chunk.chunk_id,
-                    question=question,
-                    prompt=prompt,
-                    response=raw_response or str(e),
-                    is_valid_json=False,
-                    latency=latency
-                )
-            return None
\ No newline at end of file
+            if not raw_response:
+                # The call itself failed; there was no answer to judge
+                outcome.error = str(e)
+            outcome.interactions.append((raw_response or str(e), False, latency, cached, model_name, metrics))
+            return None, True
+
+    @staticmethod
+    def _is_not_found(data: dict) -> bool:
+        return isinstance(data.get('value'), str) and "NOT_FOUND" in data['value']
+
+    @staticmethod
+    def _needs_escalation(data: dict, fact: Optional[Fact]) -> bool:
+        """
+        An answer goes to the next model in the cascade when its quote failed
+        verification or its confidence is low. NOT_FOUND is a valid answer.
+        """
+        if fact is None:
+            return not ExtractionAgent._is_not_found(data)
+        return fact.confidence == ConfidenceLevel.LOW
+
+    def _chat(self, prompt: str, model_name: Optional[str] = None) -> Tuple[str, float, bool, dict]:
+        """
+        Sends one prompt to the model, or serves it from the response cache.
+        Returns (raw_response, latency, cached, metrics); see `_stream` for
+        the metrics, which are empty on a cache hit.
+        """
+        model_name = model_name or self.models[0]
+        start_time = time.perf_counter()
+        options = {
+            "seed": self.seed,
+            "temperature": Config.TEMPERATURE,
+            "num_predict": Config.LLM_MAX_OUTPUT_TOKENS
+        }
+
+        cache_key = None
+        if self.cache:
+            # Keyed on everything the request sends, runner options included
+            cache_key = ResponseCache.make_key(model_name, prompt, self.client.request_options(options), RESPONSE_FORMAT)
+            hit = self.cache.get(cache_key)
+            if hit is not None:
+                return hit, time.perf_counter() - start_time, True, {}
+
+        raw_response, metrics = self._stream(model_name, prompt, options, start_time)
+        latency = time.perf_counter() - start_time
+
+        if cache_key:
+            self.cache.put(cache_key, model_name, raw_response)
+        return raw_response, latency, False, metrics
+
+    def _stream(self, model_name: str, prompt: str, options: dict, start_time: float) -> Tuple[str, dict]:
+        """
+        Streams one response and stops reading as soon as its JSON object is
+        complete, which closes the connection and ends the generation.
+
+        Metrics: ttft (seconds to the first token), prompt_eval_tokens,
+        eval_tokens and tokens_per_sec. They come from Ollama's final stream
+        message; when the stream is cut short that message never arrives, so
+        eval_tokens counts the streamed tokens, tokens_per_sec is measured
+        from the first token and prompt_eval_tokens is unknown.
+        """
+        stream = self.client.chat(
+            model=model_name,
+            messages=[
+                {
+                    'role': 'user',
+                    'content': prompt
+                },
+            ],
+            format=RESPONSE_FORMAT,
+            options=options,
+            stream=True
+        )
+
+        pieces = []
+        tracker = _JsonObjectEnd()
+        first_token_at = None
+        streamed_tokens = 0
+        final = None
+        complete = False
+
+        try:
+            for part in stream:
+                content = part['message']['content'] or ""
+                if content:
+                    if first_token_at is None:
+                        first_token_at = time.perf_counter()
+                    streamed_tokens += 1
+                    end = tracker.feed(content)
+                    pieces.append(content if end < 0 else content[:end + 1])
+                    complete = end >= 0
+                if part.get('done'):
+                    final = part
+                if complete or final is not None:
+                    break
+        finally:
+            finished_at = time.perf_counter()
+            if hasattr(stream, "close"):
+                stream.close()
+
+        metrics = {
+            "ttft": first_token_at - start_time if first_token_at else None,
+            "prompt_eval_tokens": None,
+            "eval_tokens": streamed_tokens,
+            "tokens_per_sec": None
+        }
+        if final is not None and final.get('eval_count') is not None:
+            metrics["prompt_eval_tokens"] = final.get('prompt_eval_count')
+            metrics["eval_tokens"] = final['eval_count']
+            if final.get('eval_duration'):
+                metrics["tokens_per_sec"] = final['eval_count'] / (final['eval_duration'] / 1e9)
+        if metrics["tokens_per_sec"] is None and streamed_tokens > 1 and finished_at > first_token_at:
+            metrics["tokens_per_sec"] = (streamed_tokens - 1) / (finished_at - first_token_at)
+
+        return "".join(pieces), metrics
+
+    def _to_fact(
+            self,
+            chunk: DocumentChunk,
+            question: str,
+            data: dict,
+            latency: float,
+            model_name: Optional[str] = None,
+            verification: Optional[dict] = None
+        ) -> Optional[Fact]:
+        """
+        Hardens one JSON answer and verifies its quote against the chunk,
+        unless `verification` already holds the verifier's result for it.
+        A quote missing from the chunk is still accepted when the document's
+        quote index finds it verbatim elsewhere; the citation then points there.
+        """
+        if not self._harden(data):
+            return None
+
+        if verification is None:
+            verification = self.verifier.verify(chunk.text_content, data.get('quote_snippet', ''))
+
+        reasoning = f"Extracted via {model_name or self.models[0]} in {latency:.2f}s"
+        page_number = chunk.page_number
+        if verification['is_verified']:
+            # Spans are relative to the chunk; citations point into the page text
+            span = verification.get('span')
+            char_start, char_end = (chunk.char_start + span[0], chunk.char_start + span[1]) if span else (None, None)
+            evidence = verification['matched_substring'] if span else None
+        else:
+            hit = self._locate(chunk, data.get('quote_snippet', ''))
+            if hit is None:
+                return None
+            page_number, char_start, evidence = hit.page_number, hit.char_start, hit.evidence
+            char_end = hit.char_end if hit.end_page_number == hit.page_number else None
+            reasoning += f"; quote found on page {hit.page_number}"
+
+        return Fact(
+            attribute=question,
+            value=data['value'],
+            is_negation=False,
+            confidence=ConfidenceLevel(data.get('confidence', 'low')),
+            reasoning=reasoning,
+            citations=[Citation(
+                doc_id=chunk.doc_name,
+                page_number=page_number,
+                quote_snippet=data['quote_snippet'],
+                char_start=char_start,
+                char_end=char_end,
+                evidence=evidence
+            )]
+        )
+
+    def _locate(self, chunk: DocumentChunk, quote: str) -> Optional[QuoteHit]:
+        """The occurrence of `quote` nearest the chunk's page, if the document has one."""
+        if not self.quote_index or not isinstance(quote, str) or len(normalize(quote)) < Config.QUOTE_INDEX_MIN_CHARS:
+            return None
+        hits = self.quote_index.locate(quote)
+        return min(hits, key=lambda hit: abs(hit.page_number - chunk.page_number)) if hits else None
+
+    @staticmethod
+    def _harden(data: dict) -> bool:
+        """Normalizes list-valued fields in place. Returns False for NOT_FOUND answers."""
+        if ExtractionAgent._is_not_found(data):
+            return False
+        if isinstance(data.get('value'), list):
+            data['value'] = "; ".join([str(x) for x in data['value']])
+        if isinstance(data.get('quote_snippet'), list):
+            data['quote_snippet'] = max(data['quote_snippet'], key=len)
+        return True
+
+    def _commit(self, outcome: _Outcome):
+        """Writes the audit rows for an outcome and persists its facts."""
+        if not (self.store and self.run_id):
+            return
+
+        for response, is_valid_json, latency, cached, model_name, metrics in outcome.interactions:
+            self.store.log_interaction(
+                run_id=self.run_id,
+                chunk_id=outcome.chunk_id,
+                question=outcome.question,
+                prompt=outcome.prompt,
+                response=response,
+                is_valid_json=is_valid_json,
+                latency=latency,
+                cached=cached,
+                model_name=model_name,
+                **metrics
+            )
+        for fact in outcome.facts.values():
+            self.store.save_fact(self.run_id, fact, chunk_id=outcome.chunk_id)
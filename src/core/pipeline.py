@@ -0,0 +1,181 @@
+import time
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from src.core.agent import ExtractionAgent
+from src.core.policy import ExtractionPolicy
+from src.core.schema import ConfidenceLevel, DocumentChunk, Fact, Section
+from src.infra.jobs import JobQueue
+from src.infra.retriever import KeywordRetriever
+
+from src.config import Config
+
+SectionCallback = Callable[[str, float, List[Fact]], None]
+
+
+def select_chunks(
+        retriever: KeywordRetriever,
+        sections: Dict[str, str] = Config.TARGET_SECTIONS,
+        top_k: int = 3,
+        policy: Optional[ExtractionPolicy] = None
+    ) -> Tuple[Dict[str, List[DocumentChunk]], Dict[str, int]]:
+    """
+    Retrieves each section's chunks and gates them with `policy`.
+    Returns ({title: admitted chunks in rank order}, {title: rejected count}).
+    """
+    policy = policy or ExtractionPolicy()
+    section_chunks: Dict[str, List[DocumentChunk]] = {}
+    skipped = {}
+    for title, question in sections.items():
+        scored = retriever.retrieve_with_scores(title + " " + question, top_k=top_k)
+        section_chunks[title] = [chunk for score, chunk in scored if policy.admits(title, score, chunk)]
+        skipped[title] = len(scored) - len(section_chunks[title])
+    return section_chunks, skipped
+
+
+def run_extraction(
+        agent: ExtractionAgent,
+        retriever: KeywordRetriever,
+        sections: Dict[str, str] = Config.TARGET_SECTIONS,
+        top_k: int = 3,
+        grouped: bool = Config.GROUPED_EXTRACTION,
+        on_section: Optional[SectionCallback] = None,
+        policy: Optional[ExtractionPolicy] = None,
+        queue: Optional[JobQueue] = None
+    ) -> List[Section]:
+    """
+    Runs every target section through retrieval and extraction.
+
+    All prompts are dispatched together through the agent, so LLM calls for
+    different sections overlap. With `grouped=True`, sections whose retrieval
+    returned the same chunk share one prompt for that chunk, and each section
+    still gets its own verified facts.
+
+    `policy` gates retrieved chunks before any LLM call (see ExtractionPolicy).
+    With `stop_on_high_confidence`, chunks are sent in rounds by retrieval
+    rank, and a section leaves the next round once it has a high-confidence
+    fact. Skipped chunks are counted in the section's stats.
+
+    With a `queue`, every admitted (section, chunk) pair is a persistent work
+    item and only the items leased now are sent: items finished by an
+    earlier pass are not sent again, and items whose LLM call failed are
+    handed back to the queue for a later retry. Leased items that are no
+    longer selected are marked skipped. Sections with nothing left to
+    send, and sections an earlier pass over the run already reported, log
+    no stats.
+
+    A section finishes when its last prompt has been committed. Its duration
+    is the wall-clock time since the previous section finished, which keeps
+    the per-section durations summing to the total pipeline time.
+    """
+    policy = policy or ExtractionPolicy()
+    mark = time.perf_counter()
+
+    section_chunks, skipped = select_chunks(retriever, sections, top_k, policy)
+
+    silent = set()
+    if queue:
+        # Each section reports once per run, not on every retry pass
+        silent = queue.reported_sections()
+        queue.enqueue((title, chunk.chunk_id) for title in sections for chunk in section_chunks[title])
+        leased = set(queue.lease())
+        # Items a resumed run no longer selects (e.g. after a policy or
+        # chunking change) would otherwise stay leased and keep it open
+        selected = {(title, chunk.chunk_id) for title in sections for chunk in section_chunks[title]}
+        for title, chunk_id in leased - selected:
+            queue.complete(title, chunk_id, status="skipped")
+        for title in sections:
+            remaining = [chunk for chunk in section_chunks[title] if (title, chunk.chunk_id) in leased]
+            if section_chunks[title] and not remaining:
+                silent.add(title)
+            section_chunks[title] = remaining
+
+    answers = {title: {} for title in sections}
+    sent = {title: 0 for title in sections}
+    finished = {}
+
+    def dispatch(assignments: Dict[str, List[DocumentChunk]]) -> Iterator[str]:
+        """Sends the assigned chunks and yields each section as its last prompt is committed."""
+        # Ordered by first appearance: chunk_id -> (chunk, {title: question})
+        groups = {}
+        for title, chunks in assignments.items():
+            sent[title] += len(chunks)
+            for chunk in chunks:
+                key = chunk.chunk_id if grouped else (chunk.chunk_id, title)
+                groups.setdefault(key, (chunk, {}))[1][title] = sections[title]
+
+        jobs = list(groups.values())
+
+        # Index of the last job each section depends on
+        last_job = {}
+        for index, (_, questions) in enumerate(jobs):
+            for title in questions:
+                last_job[title] = index
+
+        for index, ((chunk, questions), (facts, error)) in enumerate(zip(jobs, agent.extract_grouped_results(jobs))):
+            for title, fact in facts.items():
+                answers[title][chunk.chunk_id] = fact
+            if queue:
+                for title in questions:
+                    if error:
+                        queue.fail(title, chunk.chunk_id, error)
+                    else:
+                        queue.complete(title, chunk.chunk_id)
+            for title in questions:
+                if last_job[title] == index:
+                    yield title
+
+    def finish(title):
+        nonlocal mark
+        now = time.perf_counter()
+        duration = now - mark
+        mark = now
+
+        # Keep facts in retrieval order for the section
+        section_facts = [
+            answers[title][chunk.chunk_id]
+            for chunk in section_chunks[title]
+            if chunk.chunk_id in answers[title]
+        ]
+        section_facts = [f for f in section_facts if f.value != "NOT_FOUND"]
+
+        if title not in silent:
+            if agent.store and agent.run_id:
+                agent.store.log_section_stats(agent.run_id, title, duration, sent[title], skipped[title])
+            if on_section:
+                on_section(title, duration, section_facts)
+
+        finished[title] = Section(
+            title=title,
+            facts=section_facts,
+            missing_info=[] if section_facts else ["No evidence found"]
+        )
+
+    def confident(title) -> bool:
+        return any(f.confidence == ConfidenceLevel.HIGH for f in answers[title].values())
+
+    for title in sections:
+        if not section_chunks[title]:
+            finish(title)
+
+    pending = [title for title in sections if section_chunks[title]]
+
+    if not policy.stop_on_high_confidence:
+        for title in dispatch({title: section_chunks[title] for title in pending}):
+            finish(title)
+        return [finished[title] for title in sections]
+
+    rank = 0
+    while pending:
+        done = set()
+        for title in dispatch({title: section_chunks[title][rank:rank + 1] for title in pending}):
+            remaining = len(section_chunks[title]) - rank - 1
+            if remaining == 0 or confident(title):
+                skipped[title] += remaining
+                if queue:
+                    for chunk in section_chunks[title][rank + 1:]:
+                        queue.complete(title, chunk.chunk_id, status="skipped")
+                finish(title)
+                done.add(title)
+        pending = [title for title in pending if title not in done]
+        rank += 1
+
+    return [finished[title] for title in sections]
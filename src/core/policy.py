@@ -0,0 +1,35 @@
+from dataclasses import dataclass, field
+from typing import Dict, Sequence
+from src.core.schema import DocumentChunk
+
+from src.config import Config
+
+
+def _configured_prefilters() -> Dict[str, Sequence[str]]:
+    return dict(Config.SECTION_KEYWORDS) if Config.LEXICAL_PREFILTER else {}
+
+
+@dataclass
+class ExtractionPolicy:
+    """
+    Decides which retrieved chunks are worth an LLM call.
+
+    min_score:               chunks whose BM25 retrieval score is below this
+                             are skipped (0 admits every retrieved chunk).
+    stop_on_high_confidence: a section stops sending chunks once it has a
+                             verified high-confidence fact.
+    prefilters:              section title -> keywords; a chunk is only sent
+                             for that section if its text contains one of them.
+    """
+    min_score: float = Config.MIN_RETRIEVAL_SCORE
+    stop_on_high_confidence: bool = Config.STOP_ON_HIGH_CONFIDENCE
+    prefilters: Dict[str, Sequence[str]] = field(default_factory=_configured_prefilters)
+
+    def admits(self, title: str, score: float, chunk: DocumentChunk) -> bool:
+        if score < self.min_score:
+            return False
+        keywords = self.prefilters.get(title)
+        if keywords:
+            text = chunk.text_content.lower()
+            return any(keyword in text for keyword in keywords)
+        return True
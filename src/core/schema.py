@@ -1,6 +1,6 @@
 import hashlib
 from enum import Enum
-from typing import List
+from typing import List, Optional
 from pydantic import BaseModel, Field
 
 
@@ -14,6 +14,9 @@ class Citation(BaseModel):
     doc_id: str
     page_number: int
     quote_snippet: str = Field(..., description="Exact substring from source text verifying the fact.")
+    char_start: Optional[int] = Field(None, description="Offset of the matched evidence within the page text")
+    char_end: Optional[int] = Field(None, description="End offset of the matched evidence within the page text")
+    evidence: Optional[str] = Field(None, description="The source text the quote matched, verbatim")
 
 class Fact(BaseModel):
     attribute: str       # e.g., "indication_primary"
@@ -42,8 +45,18 @@ class DocumentChunk(BaseModel):
     doc_name: str = Field(..., description="Filename of the source PDF")
     page_number: int = Field(..., description="1-based page number")
     text_content: str = Field(..., description="The actual extracted text")
+    char_start: int = Field(0, description="Offset of text_content within the page text")
+    char_end: Optional[int] = Field(None, description="End offset within the page text; None for a whole page")
     
     def compute_id(self):
         """Generates a reproducible hash ID based on content and location."""
         raw = f"{self.doc_name}-{self.page_number}-{self.text_content[:50]}"
-        return hashlib.md5(raw.encode()).hexdigest()
\ No newline at end of file
+        # Whole-page chunks keep their original IDs
+        if self.char_end is not None:
+            raw += f"-{self.char_start}-{self.char_end}"
+        return hashlib.md5(raw.encode()).hexdigest()
+
+    def content_hash(self):
+        """Hash of the full text and its place on the page; unlike the ID, independent of file name and page number."""
+        raw = f"{self.char_start}-{self.char_end}-{self.text_content}"
+        return hashlib.sha256(raw.encode()).hexdigest()
\ No newline at end of file
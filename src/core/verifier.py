@@ -1,8 +1,37 @@
-from rapidfuzz import fuzz, utils
+from functools import lru_cache
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+import numpy as np
+from rapidfuzz import fuzz, process, utils
+
+
+class NormalizedSource(NamedTuple):
+    """A source text prepared once for fuzzy matching against many quotes."""
+    text: str              # stripped original, for the length and exact checks
+    lead: int              # characters stripped from the front of the original
+    processed: str         # utils.default_process(text)
+    offset: Optional[int]  # where `processed` starts in the original; None if not length-preserving
+
+
+def normalize_source(source_text: str) -> NormalizedSource:
+    stripped = source_text.strip()
+    lead = len(source_text) - len(source_text.lstrip())
+    processed = utils.default_process(stripped)
+
+    # default_process maps characters one-to-one and then trims, so
+    # processing between two sentinels recovers how much was trimmed
+    padded = utils.default_process(f"a{stripped}a")[1:-1]
+    offset = None
+    if len(padded) == len(stripped) and padded.strip() == processed:
+        offset = len(padded) - len(padded.lstrip())
+    return NormalizedSource(stripped, lead, processed, offset)
+
 
 class QuoteVerifier:
-    def __init__(self, threshold: int = 90):
+    def __init__(self, threshold: int = 90, cache_size: int = 256):
         self.threshold = threshold
+        # Chunks are verified against many quotes (cascades, grouped prompts),
+        # so keep their normalized form around
+        self._normalize = lru_cache(maxsize=cache_size)(normalize_source)
 
     def verify(self, source_text: str, quote: str) -> dict:
         """
@@ -17,64 +46,91 @@ class QuoteVerifier:
         while rejecting hallucinated or unrelated quotes.
 
         Returns:
-            dict: {'is_verified': bool, 'score': float}
+            dict: {'is_verified': bool, 'score': float, 'matched_substring': str,
+                   'span': (start, end) offsets of the match in source_text, or None}
+
+        """
+        return self.verify_many(source_text, [quote])[0]
 
+    def verify_many(self, source_text: str, quotes: Sequence[str]) -> List[dict]:
         """
-        
-        if not quote or not source_text:
-            return {
-                "is_verified": False,
-                "score": 0,
-                "matched_substring": ""
-            }
-
-        quote_clean = quote.strip()
-        source_clean = source_text.strip()
-        
-        q_len = len(quote_clean)
-        s_len = len(source_clean)
-
-        # 1. STRICT Physical Constraint
-        # A quote cannot be strictly longer than the source.
-        if q_len > s_len:
-            return {
-                "is_verified": False,
-                "score": 0,
-                "matched_substring": "Quote longer than source"
-            }
-
-        # 2. Fast check: Exact match
-        if quote_clean in source_clean:
-             return {
-                "is_verified": True, 
-                "score": 100, 
-                "matched_substring": quote_clean
-            }
-
-        # 3. Smart Fuzzy Matching
-        # If the quote is nearly the entire text (e.g. >70% of source),
-        # we must match the *whole* string structure (fuzz.ratio).
-        # Otherwise, we look for the quote *inside* the text (fuzz.partial_ratio).
-        
-        if q_len > s_len * 0.7:
-            # Strict mode: penalizes "melanoma" vs "lung cancer" mismatch
-            score = fuzz.ratio(
-                quote_clean.lower(), 
-                source_clean.lower(), 
-                processor=utils.default_process
-            )
-        else:
-            # Substring mode: finds "dosage is 10mg" inside a long paragraph
-            score = fuzz.partial_ratio(
-                quote_clean.lower(), 
-                source_clean.lower(), 
-                processor=utils.default_process
-            )
-        
-        is_verified = score >= self.threshold
+        Verifies many quotes against one source, in order. The source is
+        normalized once (and cached), and all fuzzy candidates are scored in
+        one batched rapidfuzz call. Each result is shaped like `verify`'s.
+        """
+        results: List[Optional[dict]] = [None] * len(quotes)
+        if not source_text:
+            return [self._result(False, 0, "") for _ in quotes]
+
+        source = self._normalize(source_text)
+        s_len = len(source.text)
+        strict, partial = [], []
+
+        for i, quote in enumerate(quotes):
+            if not quote:
+                results[i] = self._result(False, 0, "")
+                continue
+
+            quote_clean = quote.strip()
+            q_len = len(quote_clean)
+
+            # 1. STRICT Physical Constraint
+            # A quote cannot be strictly longer than the source.
+            if q_len > s_len:
+                results[i] = self._result(False, 0, "Quote longer than source")
+                continue
+
+            # 2. Fast check: Exact match
+            position = source.text.find(quote_clean)
+            if position >= 0:
+                start = source.lead + position
+                results[i] = self._result(True, 100, quote_clean, (start, start + q_len))
+                continue
+
+            # 3. Smart Fuzzy Matching
+            # If the quote is nearly the entire text (e.g. >70% of source),
+            # we must match the *whole* string structure (fuzz.ratio).
+            # Otherwise, we look for the quote *inside* the text (fuzz.partial_ratio).
+            (strict if q_len > s_len * 0.7 else partial).append(i)
+
+        # Strict mode penalizes "melanoma" vs "lung cancer" mismatch;
+        # substring mode finds "dosage is 10mg" inside a long paragraph
+        for indexes, scorer in ((strict, fuzz.ratio), (partial, fuzz.partial_ratio)):
+            if not indexes:
+                continue
+            processed = [utils.default_process(quotes[i]) for i in indexes]
+            scores = process.cdist(processed, [source.processed], scorer=scorer, dtype=np.float64)[:, 0]
+            for i, quote, score in zip(indexes, processed, scores):
+                results[i] = self._fuzzy_result(source_text, source, quote, float(score), scorer is fuzz.ratio)
+
+        return results
+
+    def _fuzzy_result(self, source_text: str, source: NormalizedSource, quote: str, score: float, whole: bool) -> dict:
+        if score < self.threshold:
+            return self._result(False, score, "")
+
+        span = None
+        if source.offset is not None:
+            if whole:
+                start, end = 0, len(source.processed)
+            else:
+                alignment = fuzz.partial_ratio_alignment(quote, source.processed)
+                start, end = alignment.dest_start, alignment.dest_end
+                # The alignment window can cut words; widen it to whole words
+                while start > 0 and source.processed[start - 1] != " ":
+                    start -= 1
+                while end < len(source.processed) and source.processed[end] != " ":
+                    end += 1
+            shift = source.lead + source.offset
+            span = (start + shift, end + shift)
+        matched = source_text[span[0]:span[1]] if span else "Fuzzy Match"
+        return self._result(True, score, matched, span)
 
+    @staticmethod
+    def _result(is_verified: bool, score: float, matched: str, span: Optional[Tuple[int, int]] = None) -> dict:
         return {
             "is_verified": is_verified,
             "score": round(score, 2),
-            "matched_substring": "Fuzzy Match" 
-        }
\ No newline at end of file
+            "matched_substring": matched,
+            "span": span,
+        }
@@ -0,0 +1,110 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+from src.config import Config
+
+
+class ResponseCache:
+    """
+    Persistent, content-addressed cache of raw LLM responses.
+
+    With greedy decoding and a fixed seed, a (model, prompt, options, format)
+    request always yields the same answer, so the response can be reused
+    verbatim. Keys must be built from the options as sent to the server,
+    runner options such as num_ctx included, since those change outputs too.
+    Entries beyond `max_entries` are evicted least-recently-used, checked
+    every `evict_every` puts rather than counting the table on each one.
+    """
+
+    def __init__(
+            self,
+            db_path: str = Config.LLM_CACHE_PATH,
+            max_entries: int = Config.LLM_CACHE_MAX_ENTRIES,
+            evict_every: int = Config.LLM_CACHE_EVICT_EVERY
+        ):
+        self.db_path = Path(db_path)
+        self.max_entries = max_entries
+        self.evict_every = max(1, evict_every)
+        self.hits = 0
+        self.misses = 0
+        self._puts = 0
+        self._lock = threading.Lock()
+        self._init_db()
+
+    def _get_conn(self):
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def _init_db(self):
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = self._get_conn()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                cache_key TEXT PRIMARY KEY,
+                model_name TEXT,
+                response TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                last_used_at REAL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_used ON responses(last_used_at)")
+        conn.commit()
+        conn.close()
+
+    @staticmethod
+    def make_key(model_name: str, prompt: str, options: dict, format: Optional[str] = None) -> str:
+        payload = json.dumps(
+            {"model": model_name, "prompt": prompt, "options": options, "format": format},
+            sort_keys=True,
+            ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        conn = self._get_conn()
+        row = conn.execute("SELECT response FROM responses WHERE cache_key = ?", (key,)).fetchone()
+        if row:
+            conn.execute("UPDATE responses SET last_used_at = ? WHERE cache_key = ?", (time.time(), key))
+            conn.commit()
+        conn.close()
+
+        with self._lock:
+            if row:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return row[0] if row else None
+
+    def put(self, key: str, model_name: str, response: str):
+        conn = self._get_conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO responses (cache_key, model_name, response, last_used_at) VALUES (?, ?, ?, ?)",
+            (key, model_name, response, time.time())
+        )
+        with self._lock:
+            self._puts += 1
+            evict = self._puts % self.evict_every == 0
+        if evict:
+            # Evict the least recently used entries beyond the size bound
+            conn.execute(
+                """DELETE FROM responses WHERE cache_key IN (
+                       SELECT cache_key FROM responses
+                       ORDER BY last_used_at ASC
+                       LIMIT MAX((SELECT COUNT(*) FROM responses) - ?, 0)
+                   )""",
+                (self.max_entries,)
+            )
+        conn.commit()
+        conn.close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
@@ -0,0 +1,136 @@
+import re
+from typing import List, Tuple
+from src.core.schema import DocumentChunk
+from src.config import Config
+
+BLOCK_SEPARATOR = "\n\n"
+
+# Label headings such as "1 INDICATIONS AND USAGE", "5.2 Hepatotoxicity"
+# or "WARNING: EMBRYO-FETAL TOXICITY"
+HEADING_PATTERN = re.compile(
+    r"^(\d+(\.\d+)*\s+[A-Z][\w ,&/()\-]{2,80}|[A-Z][A-Z0-9 ,&/()\-:]{3,80})$"
+)
+SENTENCE_END = re.compile(r"(?<=[.;:!?])\s+")
+
+STRATEGIES = ("page", "block", "section")
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for budgeting (~4 characters per token)."""
+    return max(1, len(text) // 4)
+
+
+def _split_oversized(text: str, start: int, end: int, budget: int) -> List[Tuple[int, int]]:
+    """Splits one span that exceeds the budget at sentence, then hard, boundaries."""
+    max_chars = budget * 4
+    spans = []
+    cursor = start
+    while end - cursor > max_chars:
+        limit = cursor + max_chars
+        cut = None
+        for match in SENTENCE_END.finditer(text, cursor + 1, limit):
+            cut = match.start()
+        if cut is None:
+            space = text.rfind(" ", cursor + 1, limit)
+            cut = space if space > cursor else limit
+        spans.append((cursor, cut))
+        cursor = cut
+        while cursor < end and text[cursor].isspace():
+            cursor += 1
+    if cursor < end:
+        spans.append((cursor, end))
+    return spans
+
+
+def _units(page_text: str, budget: int) -> List[Tuple[int, int, bool]]:
+    """Returns (start, end, is_heading) spans for the blocks of a page."""
+    units = []
+    cursor = 0
+    for block in page_text.split(BLOCK_SEPARATOR):
+        start, end = cursor, cursor + len(block)
+        cursor = end + len(BLOCK_SEPARATOR)
+        if not block.strip():
+            continue
+
+        is_heading = bool(HEADING_PATTERN.match(block.split("\n", 1)[0].strip()))
+        if estimate_tokens(block) <= budget:
+            units.append((start, end, is_heading))
+        else:
+            for i, (s, e) in enumerate(_split_oversized(page_text, start, end, budget)):
+                units.append((s, e, is_heading and i == 0))
+    return units
+
+
+def _windows(page_text: str, units, budget: int, overlap: int, break_on_headings: bool) -> List[Tuple[int, int]]:
+    windows = []
+    current = []
+
+    def cost(span):
+        return estimate_tokens(page_text[span[0][0]:span[-1][1]])
+
+    for unit in units:
+        starts_section = break_on_headings and unit[2]
+        if current and (starts_section or cost(current + [unit]) > budget):
+            windows.append((current[0][0], current[-1][1]))
+
+            # Carry trailing blocks forward as overlap, within the same section
+            carried = []
+            if overlap and not starts_section:
+                for previous in reversed(current):
+                    candidate = [previous] + carried
+                    if cost(candidate) > overlap or cost(candidate + [unit]) > budget:
+                        break
+                    carried = candidate
+            current = carried
+        current.append(unit)
+
+    if current:
+        windows.append((current[0][0], current[-1][1]))
+    return windows
+
+
+def chunk_pages(
+        pages: List[DocumentChunk],
+        strategy: str = Config.CHUNK_STRATEGY,
+        token_budget: int = Config.CHUNK_TOKEN_BUDGET,
+        overlap_tokens: int = Config.CHUNK_OVERLAP_TOKENS
+    ) -> List[DocumentChunk]:
+    """
+    Splits page chunks into smaller windows for prompting.
+
+    Strategies:
+        page:    one chunk per page (no splitting).
+        block:   packs consecutive text blocks into windows of at most
+                 `token_budget` tokens, repeating up to `overlap_tokens` of
+                 trailing blocks at the start of the next window.
+        section: like `block`, but a label heading always starts a new window.
+
+    Windows keep their page number and the character offsets of their text
+    within the page, so citations resolve to the same page text.
+    """
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown chunking strategy '{strategy}'. Expected one of {STRATEGIES}.")
+    if strategy == "page":
+        return list(pages)
+
+    chunks = []
+    for page in pages:
+        page_text = page.text_content
+        if estimate_tokens(page_text) <= token_budget:
+            chunks.append(page)
+            continue
+
+        units = _units(page_text, token_budget)
+        for start, end in _windows(page_text, units, token_budget, overlap_tokens, strategy == "section"):
+            chunk = DocumentChunk(
+                chunk_id="",
+                doc_name=page.doc_name,
+                page_number=page.page_number,
+                text_content=page_text[start:end],
+                char_start=start,
+                char_end=end
+            )
+            chunk.chunk_id = chunk.compute_id()
+            chunks.append(chunk)
+
+    return chunks
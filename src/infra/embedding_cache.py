@@ -0,0 +1,136 @@
+import hashlib
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Callable, List, Optional, Sequence
+import numpy as np
+from src.config import Config
+
+
+def normalize_text(text: str) -> str:
+    """Whitespace-insensitive form of a text, used for cache keys."""
+    return " ".join(text.split())
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(normalize_text(text).encode()).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Persistent store of embedding vectors keyed by (embedding model, text hash).
+    Vectors are stored as raw float32 BLOBs with their dimension; a row whose
+    BLOB does not hold `dim` floats, or whose `dim` is not the one asked
+    for, is treated as a miss.
+    """
+
+    def __init__(self, db_path: str = Config.EMBEDDING_CACHE_PATH):
+        self.db_path = Path(db_path)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._init_db()
+
+    def _get_conn(self):
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def _init_db(self):
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = self._get_conn()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS embeddings (
+                model_name TEXT,
+                text_hash TEXT,
+                dim INTEGER,
+                vector BLOB,
+                PRIMARY KEY (model_name, text_hash)
+            )
+        """)
+        conn.commit()
+        conn.close()
+
+    def get_many(self, model_name: str, hashes: Sequence[str], dim: Optional[int] = None) -> List[Optional[np.ndarray]]:
+        found = {}
+        conn = self._get_conn()
+        # Stay well under SQLite's bound-parameter limit
+        for start in range(0, len(hashes), 500):
+            chunk = list(hashes[start:start + 500])
+            placeholders = ",".join("?" * len(chunk))
+            rows = conn.execute(
+                f"SELECT text_hash, dim, vector FROM embeddings WHERE model_name = ? AND text_hash IN ({placeholders})",
+                [model_name, *chunk]
+            ).fetchall()
+            for key, stored_dim, blob in rows:
+                # A different size means a model or config change (or a torn write)
+                if len(blob) != stored_dim * 4 or (dim is not None and stored_dim != dim):
+                    continue
+                found[key] = np.frombuffer(blob, dtype=np.float32)
+        conn.close()
+
+        vectors = [found.get(key) for key in hashes]
+        with self._lock:
+            hit_count = sum(v is not None for v in vectors)
+            self.hits += hit_count
+            self.misses += len(vectors) - hit_count
+        return vectors
+
+    def put_many(self, model_name: str, hashes: Sequence[str], vectors: Sequence[np.ndarray]):
+        rows = []
+        for key, vector in zip(hashes, vectors):
+            vector = np.asarray(vector, dtype=np.float32)
+            rows.append((model_name, key, vector.shape[0], vector.tobytes()))
+        conn = self._get_conn()
+        conn.executemany(
+            "INSERT OR REPLACE INTO embeddings (model_name, text_hash, dim, vector) VALUES (?, ?, ?, ?)",
+            rows
+        )
+        conn.commit()
+        conn.close()
+
+
+class CachedEmbeddingFunction:
+    """
+    Wraps an embedding function with an EmbeddingCache. Only texts missing
+    from the cache are embedded, in one call; the wrapped function is built
+    lazily from `factory`, so a fully cached batch never loads the model.
+    With `dim`, cached vectors of any other size are embedded again.
+    """
+
+    def __init__(
+            self,
+            factory: Callable[[], Callable],
+            model_name: str = Config.EMBEDDING_MODEL,
+            cache: Optional[EmbeddingCache] = None,
+            dim: Optional[int] = None
+        ):
+        self.factory = factory
+        self.model_name = model_name
+        self.dim = dim
+        self.cache = cache or EmbeddingCache()
+        self._ef = None
+        self._lock = threading.Lock()
+
+    @property
+    def embedding_function(self):
+        with self._lock:
+            if self._ef is None:
+                self._ef = self.factory()
+            return self._ef
+
+    def __call__(self, texts: Sequence[str]) -> List[np.ndarray]:
+        hashes = [text_hash(t) for t in texts]
+        vectors = self.cache.get_many(self.model_name, hashes, self.dim)
+
+        missing = [i for i, v in enumerate(vectors) if v is None]
+        if missing:
+            # Embed each distinct missing text once
+            unique = {}
+            for i in missing:
+                unique.setdefault(hashes[i], texts[i])
+            computed = self.embedding_function(list(unique.values()))
+            by_hash = {key: np.asarray(vec, dtype=np.float32) for key, vec in zip(unique, computed)}
+            self.cache.put_many(self.model_name, list(by_hash), list(by_hash.values()))
+            for i in missing:
+                vectors[i] = by_hash[hashes[i]]
+
+        return vectors
@@ -1,58 +1,228 @@
 import fitz
+import gzip
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import List
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple
 from src.core.schema import DocumentChunk
+from src.infra.chunking import chunk_pages
+from src.config import Config
 
-def ingest_pdf(file_path: Path) -> List[DocumentChunk]:
-    doc = fitz.open(file_path)
+
+def _page_to_chunk(doc_name: str, page_index: int, page) -> Optional[DocumentChunk]:
+    text_blocks = page.get_text("blocks")
+
+    valid_text = []
+    for b in text_blocks:
+        # b[6] is block_type (0=text). b[4] is the text content.
+        if b[6] == 0:
+            clean_line = b[4].strip()
+            if clean_line:
+                valid_text.append(clean_line)
+
+    # Join with double newline to separate paragraphs clearly
+    text_content = "\n\n".join(valid_text)
+
+    if not text_content:
+        return None
+
+    chunk = DocumentChunk(
+        chunk_id="",
+        doc_name=doc_name,
+        page_number=page_index + 1,
+        text_content=text_content
+    )
+    chunk.chunk_id = chunk.compute_id()
+    return chunk
+
+
+def _parse_pages(file_path: Path, start: int = 0, stop: Optional[int] = None) -> List[DocumentChunk]:
+    """Parses pages [start, stop) of one PDF. Runs inside worker processes."""
     chunks = []
-    
-    print(f"Ingesting {file_path.name}...")
+    with fitz.open(file_path) as doc:
+        stop = doc.page_count if stop is None else min(stop, doc.page_count)
+        for page_index in range(start, stop):
+            chunk = _page_to_chunk(file_path.name, page_index, doc[page_index])
+            if chunk:
+                chunks.append(chunk)
+    return chunks
+
+
+def _split_pages(page_count: int, parts: int) -> List[Tuple[int, int]]:
+    size = -(-page_count // parts)  # ceil division
+    return [(start, min(start + size, page_count)) for start in range(0, page_count, size)]
+
 
-    for page_index, page in enumerate(doc):
-        text_blocks = page.get_text("blocks")
-        
-        valid_text = []
-        for b in text_blocks:
-            # b[6] is block_type (0=text). b[4] is the text content.
-            if b[6] == 0:
-                clean_line = b[4].strip()
-                if clean_line:
-                    valid_text.append(clean_line)
-        
-        # Join with double newline to separate paragraphs clearly
-        text_content = "\n\n".join(valid_text)
-        
-        if not text_content:
-            continue
+def file_content_hash(file_path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
 
+
+def _cache_file(file_path: Path, content_hash: Optional[str] = None) -> Path:
+    """Cache entries are keyed by file content and the ingest version tag."""
+    content_hash = content_hash or file_content_hash(file_path)
+    return Config.INGEST_CACHE_DIR / f"{content_hash}-v{Config.INGEST_VERSION}.json.gz"
+
+
+def _read_cache(cache_file: Path, doc_name: str) -> Optional[List[DocumentChunk]]:
+    if not cache_file.exists():
+        return None
+    try:
+        with gzip.open(cache_file, "rt", encoding="utf-8") as f:
+            pages = json.load(f)["pages"]
+    except (OSError, ValueError, KeyError):
+        # Corrupt or partial entry: fall back to parsing
+        return None
+
+    # Only page text is cached, so a renamed copy of the same file still
+    # gets its own doc_name and chunk_ids.
+    chunks = []
+    for page_number, text_content in pages:
         chunk = DocumentChunk(
             chunk_id="",
-            doc_name=file_path.name,
-            page_number=page_index + 1,
+            doc_name=doc_name,
+            page_number=page_number,
             text_content=text_content
         )
         chunk.chunk_id = chunk.compute_id()
         chunks.append(chunk)
-
     return chunks
 
+
+def _write_cache(cache_file: Path, chunks: List[DocumentChunk]):
+    cache_file.parent.mkdir(parents=True, exist_ok=True)
+    payload = {"pages": [[c.page_number, c.text_content] for c in chunks]}
+    tmp_file = cache_file.with_suffix(f".{os.getpid()}.tmp")
+    with gzip.open(tmp_file, "wt", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp_file, cache_file)
+
+
+def _iter_parsed(file_path: Path, workers: int) -> Iterator[DocumentChunk]:
+    with fitz.open(file_path) as doc:
+        page_count = doc.page_count
+        if workers <= 1 or page_count < Config.INGEST_PARALLEL_MIN_PAGES:
+            for page_index, page in enumerate(doc):
+                chunk = _page_to_chunk(file_path.name, page_index, page)
+                if chunk:
+                    yield chunk
+            return
+
+    ranges = _split_pages(page_count, workers)
+    with ProcessPoolExecutor(max_workers=min(workers, len(ranges))) as pool:
+        futures = [pool.submit(_parse_pages, file_path, start, stop) for start, stop in ranges]
+        for future in futures:
+            yield from future.result()
+
+
+def iter_pdf_chunks(
+        file_path: Path,
+        workers: int = Config.INGEST_WORKERS,
+        use_cache: bool = Config.INGEST_CACHE_ENABLED,
+        content_hash: Optional[str] = None
+    ) -> Iterator[DocumentChunk]:
+    """
+    Yields one chunk per page, in page order, as pages are parsed. Pages are
+    split into prompt-sized chunks afterwards, by `chunk_pages`.
+
+    Documents with at least Config.INGEST_PARALLEL_MIN_PAGES pages are split
+    into contiguous page ranges parsed by `workers` processes; ranges are
+    yielded in order, so the output is identical to a single-process parse.
+
+    With `use_cache`, a file whose content and Config.INGEST_VERSION match an
+    earlier parse is served from Config.INGEST_CACHE_DIR without opening it.
+    Pass the file's `content_hash` when it is already known, so the file is
+    not read again to compute it.
+    """
+    file_path = Path(file_path)
+
+    cache_file = None
+    if use_cache:
+        cache_file = _cache_file(file_path, content_hash)
+        cached = _read_cache(cache_file, file_path.name)
+        if cached is not None:
+            yield from cached
+            return
+
+    chunks = []
+    for chunk in _iter_parsed(file_path, workers):
+        chunks.append(chunk)
+        yield chunk
+
+    if cache_file:
+        _write_cache(cache_file, chunks)
+
+
+def _ingest_file(file_path: Path, use_cache: bool, strategy: str, content_hash: Optional[str]) -> List[DocumentChunk]:
+    pages = iter_pdf_chunks(file_path, workers=1, use_cache=use_cache, content_hash=content_hash)
+    return chunk_pages(list(pages), strategy=strategy)
+
+
+def ingest_pdf(
+        file_path: Path,
+        workers: int = Config.INGEST_WORKERS,
+        use_cache: bool = Config.INGEST_CACHE_ENABLED,
+        strategy: str = Config.CHUNK_STRATEGY,
+        content_hash: Optional[str] = None
+    ) -> List[DocumentChunk]:
+    """Parses a PDF and splits its pages with the given chunking strategy."""
+    print(f"Ingesting {file_path.name}...")
+    pages = list(iter_pdf_chunks(file_path, workers=workers, use_cache=use_cache, content_hash=content_hash))
+    return chunk_pages(pages, strategy=strategy)
+
+
+def ingest_many(
+        file_paths: Iterable[Path],
+        workers: int = Config.INGEST_WORKERS,
+        use_cache: bool = Config.INGEST_CACHE_ENABLED,
+        strategy: str = Config.CHUNK_STRATEGY,
+        content_hashes: Optional[Sequence[str]] = None
+    ) -> Iterator[Tuple[Path, Optional[List[DocumentChunk]], Optional[Exception]]]:
+    """
+    Parses many PDFs across `workers` processes, one file per process.
+    `content_hashes`, when known, are the files' hashes in the same order.
+
+    Yields (path, chunks, error) in input order. Later files keep parsing in
+    the background while the caller works on earlier ones.
+    """
+    file_paths = [Path(p) for p in file_paths]
+    if not file_paths:
+        return
+    content_hashes = list(content_hashes or [None] * len(file_paths))
+
+    with ProcessPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = [
+            pool.submit(_ingest_file, path, use_cache, strategy, content_hash)
+            for path, content_hash in zip(file_paths, content_hashes)
+        ]
+        for path, future in zip(file_paths, futures):
+            try:
+                yield path, future.result(), None
+            except Exception as e:
+                yield path, None, e
+
+
 if __name__ == "__main__":
     import sys
-    
+
     if len(sys.argv) < 2:
         print("Usage: python -m src.ingest <path_to_pdf>")
         sys.exit(1)
-        
+
     path = Path(sys.argv[1])
     result_chunks = ingest_pdf(path)
-    
+
     print(f"Extracted {len(result_chunks)} chunks.")
-    
+
     # Preview: Show Page 2 (often denser text) instead of Page 1
     # and only show the first 500 characters
     if len(result_chunks) > 1:
-        sample_chunk = result_chunks[1] 
+        sample_chunk = result_chunks[1]
         print(f"\n--- Sample (Page {sample_chunk.page_number}) ---")
         print(sample_chunk.text_content[:500])
-        print("--- End Sample ---")
\ No newline at end of file
+        print("--- End Sample ---")
@@ -0,0 +1,118 @@
+import os
+import socket
+import sqlite3
+import threading
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from src.infra.store import AuditStore
+from src.config import Config
+
+# Items that still need an LLM call; 'done', 'skipped' and 'failed' are final
+OPEN_STATUSES = ("pending", "leased")
+
+
+def default_owner() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class JobQueue:
+    """
+    The persistent (section, chunk) work items of one run.
+
+    `run_extraction` enqueues every chunk it would send, leases the ones that
+    are due and only sends those; each item is completed (or failed, with
+    backoff) as its prompt's audit rows are written. Completions share the
+    store's write-behind buffer with the facts, so after a crash an item is
+    either done with its facts saved or still open and sent again.
+    """
+
+    def __init__(
+            self,
+            store: AuditStore,
+            run_id: str,
+            owner: Optional[str] = None,
+            lease_seconds: float = Config.JOB_LEASE_SECONDS,
+            max_attempts: int = Config.JOB_MAX_ATTEMPTS,
+            backoff_seconds: float = Config.JOB_BACKOFF_SECONDS,
+            max_backoff_seconds: float = Config.JOB_MAX_BACKOFF_SECONDS
+        ):
+        self.store = store
+        self.run_id = run_id
+        self.owner = owner or default_owner()
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self._leased: Dict[Tuple[str, str], int] = {}
+
+    def enqueue(self, items: Iterable[Tuple[str, str]]):
+        self.store.enqueue_jobs(self.run_id, items)
+
+    def lease(self) -> List[Tuple[str, str]]:
+        """Leases every due item. Returns the (section_name, chunk_id) keys of all items held."""
+        self._leased.update(self.store.lease_jobs(self.run_id, self.owner, self.lease_seconds))
+        return list(self._leased)
+
+    def adopt(self, leased: Dict[Tuple[str, str], int]):
+        """Takes over items this owner already leased, e.g. with AuditStore.lease_next_run."""
+        self._leased.update(leased)
+
+    def complete(self, section: str, chunk_id: str, status: str = "done"):
+        job_id = self._leased.pop((section, chunk_id), None)
+        if job_id is not None:
+            self.store.complete_job(job_id, self.owner, status)
+
+    def fail(self, section: str, chunk_id: str, error: str):
+        job_id = self._leased.pop((section, chunk_id), None)
+        if job_id is not None:
+            self.store.fail_job(job_id, self.owner, error, self.max_attempts, self.backoff_seconds, self.max_backoff_seconds)
+
+    def reported_sections(self) -> Set[str]:
+        """Sections whose stats an earlier pass over the run already logged."""
+        return self.store.logged_sections(self.run_id)
+
+    def progress(self) -> Dict[str, int]:
+        return self.store.job_progress(self.run_id)
+
+    def is_finished(self) -> bool:
+        progress = self.progress()
+        return not any(progress.get(status) for status in OPEN_STATUSES)
+
+    def next_due(self) -> Optional[float]:
+        return self.store.next_job_due(self.run_id)
+
+
+class Heartbeat:
+    """
+    Renews every lease of `owner` from a daemon thread while the block runs,
+    so long passes keep their items and a crashed worker's leases run out
+    within `lease_seconds`.
+    """
+
+    def __init__(
+            self,
+            store: AuditStore,
+            owner: str,
+            lease_seconds: float = Config.JOB_LEASE_SECONDS,
+            interval: float = Config.JOB_HEARTBEAT_SECONDS
+        ):
+        self.store = store
+        self.owner = owner
+        self.lease_seconds = lease_seconds
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._beat, name=f"heartbeat-{owner}", daemon=True)
+
+    def _beat(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.store.renew_leases(self.owner, self.lease_seconds)
+            except sqlite3.Error:
+                pass  # Busy database: the next beat retries well before the lease runs out
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
@@ -0,0 +1,74 @@
+import numpy as np
+from typing import List, Optional
+from src.config import Config
+from src.infra.embedding_cache import CachedEmbeddingFunction
+from src.infra.vector_store import VectorStore
+
+
+def fact_document(attribute: str, value: str, quote: str) -> str:
+    """The text embedded for each fact."""
+    return f"Attribute: {attribute}. Value: {value}. Context: {quote}"
+
+
+class SentenceTransformerEmbedder:
+    """Embeds texts with Config.EMBEDDING_MODEL, loading it on construction."""
+
+    def __init__(self, model_name: str = Config.EMBEDDING_MODEL):
+        # Imported here so fully cached runs never import torch
+        from sentence_transformers import SentenceTransformer
+        self.model = SentenceTransformer(model_name)
+
+    def __call__(self, texts: List[str]) -> List[np.ndarray]:
+        vectors = self.model.encode(list(texts), batch_size=Config.EMBED_BATCH_SIZE, convert_to_numpy=True)
+        return list(vectors.astype(np.float32))
+
+
+def get_embedder():
+    """
+    Returns the callable used to embed fact and query texts. With
+    Config.EMBEDDING_CACHE_ENABLED, vectors are served from the embedding
+    cache and the SentenceTransformer is only loaded on a cache miss; no
+    vector backend loads a model of its own.
+    """
+    if not Config.EMBEDDING_CACHE_ENABLED:
+        return SentenceTransformerEmbedder()
+    return CachedEmbeddingFunction(
+        factory=SentenceTransformerEmbedder, model_name=Config.EMBEDDING_MODEL, dim=Config.EMBEDDING_DIM
+    )
+
+
+def warm_up(embedder):
+    """Loads the embedding model now rather than on the first cache miss."""
+    model = getattr(embedder, "embedding_function", embedder)
+    model(["warm-up"])
+
+
+def search(store: VectorStore, query_text: str, n_results: int = 3, embedder=None, where: Optional[dict] = None) -> list:
+    """Runs one semantic query and returns ranked hits as plain dicts."""
+    return search_many(store, [query_text], n_results, embedder=embedder, where=where)[0]
+
+
+def search_many(store: VectorStore, query_texts: list, n_results: int = 3, embedder=None, where: Optional[dict] = None) -> list:
+    """
+    Runs many semantic queries with one embedding pass and one multi-query
+    store query. Returns one list of hits per query, in order.
+    """
+    if not query_texts:
+        return []
+    embed = embedder or get_embedder()
+    results = store.query(query_embeddings=embed(list(query_texts)), n_results=n_results, where=where)
+    return [_hits(results, index) for index in range(len(query_texts))]
+
+
+def _hits(results: dict, index: int) -> list:
+    ids = results['ids'][index]
+    return [
+        {
+            "rank": rank + 1,
+            "fact_id": int(fact_id),
+            "document": results['documents'][index][rank],
+            "distance": float(results['distances'][index][rank]),
+            "metadata": results['metadatas'][index][rank],
+        }
+        for rank, fact_id in enumerate(ids)
+    ]
@@ -0,0 +1,73 @@
+import threading
+import time
+from typing import Dict, Optional, Sequence
+import ollama
+from src.config import Config
+
+
+class LLMClient:
+    """
+    One Ollama client shared by every request in the process.
+
+    ollama.Client keeps a pooled HTTP session, so concurrent calls reuse
+    connections instead of opening one per request. Every request carries
+    Config.OLLAMA_KEEP_ALIVE, so the model stays loaded across idle gaps
+    (e.g. between files in a batch), and the runner options num_ctx and
+    num_thread when they are set.
+    """
+
+    def __init__(
+            self,
+            host: Optional[str] = Config.OLLAMA_HOST,
+            keep_alive=Config.OLLAMA_KEEP_ALIVE,
+            timeout: float = Config.OLLAMA_TIMEOUT,
+            num_ctx: Optional[int] = Config.LLM_NUM_CTX,
+            num_thread: Optional[int] = Config.LLM_NUM_THREAD
+    ):
+        self.client = ollama.Client(host=host, timeout=timeout)
+        self.keep_alive = keep_alive
+        self.runtime_options = {
+            key: value
+            for key, value in (("num_ctx", num_ctx), ("num_thread", num_thread))
+            if value is not None
+        }
+        # model -> seconds its last warm-up took
+        self.warmup_seconds: Dict[str, float] = {}
+
+    def request_options(self, options: Optional[dict] = None) -> dict:
+        """The options a chat request actually sends: the runner options overlaid with `options`."""
+        return {**self.runtime_options, **(options or {})}
+
+    def chat(self, model: str, messages: Sequence[dict], format=None, options: Optional[dict] = None, stream: bool = False):
+        return self.client.chat(
+            model=model,
+            messages=messages,
+            format=format,
+            options=self.request_options(options),
+            stream=stream,
+            keep_alive=self.keep_alive
+        )
+
+    def warm_up(self, model: str) -> float:
+        """
+        Loads `model` into memory with an empty prompt and returns the seconds
+        it took: the cold-start cost, or close to zero if it was already loaded.
+        """
+        start_time = time.perf_counter()
+        self.client.generate(model=model, prompt="", options=self.runtime_options, keep_alive=self.keep_alive)
+        elapsed = time.perf_counter() - start_time
+        self.warmup_seconds[model] = elapsed
+        return elapsed
+
+
+_client: Optional[LLMClient] = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> LLMClient:
+    """Returns the process-wide LLMClient, creating it on first use."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = LLMClient()
+        return _client
@@ -0,0 +1,251 @@
+import sqlite3
+from pathlib import Path
+from typing import Callable, List, Tuple
+from src.config import Config
+
+# Every schema change to the audit DB is a numbered migration appended to
+# MIGRATIONS below. Migrations run in order, once each, and the applied
+# versions are recorded in the `schema_version` table. Never edit or reorder
+# a migration that has shipped; add a new one instead.
+
+
+def _column_exists(conn: sqlite3.Connection, table: str, column: str) -> bool:
+    return column in {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+
+
+def _add_column(conn: sqlite3.Connection, table: str, column: str, definition: str):
+    if not _column_exists(conn, table, column):
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+
+def _baseline(conn: sqlite3.Connection):
+    # runs table
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS runs (
+            run_id TEXT PRIMARY KEY,
+            filename TEXT,
+            model_name TEXT,
+            seed INTEGER,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+    # section_stats table
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS section_stats (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            run_id TEXT,
+            section_name TEXT,
+            duration_seconds REAL,
+            chunk_count INTEGER,
+            FOREIGN KEY(run_id) REFERENCES runs(run_id)
+        )
+    """)
+
+    # interactions table
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS interactions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            run_id TEXT,
+            chunk_id TEXT,
+            question TEXT,
+            prompt_snapshot TEXT,
+            raw_response TEXT,
+            is_valid_json BOOLEAN,
+            latency_seconds REAL,
+            FOREIGN KEY(run_id) REFERENCES runs(run_id)
+        )
+    """)
+
+    # facts table
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS facts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            run_id TEXT,
+            chunk_page INTEGER,
+            attribute TEXT,
+            value TEXT,
+            citation_quote TEXT,
+            confidence TEXT,
+            FOREIGN KEY(run_id) REFERENCES runs(run_id)
+        )
+    """)
+
+
+def _interaction_cache_flag(conn: sqlite3.Connection):
+    _add_column(conn, "interactions", "cached", "BOOLEAN DEFAULT 0")
+
+
+def _lookup_indexes(conn: sqlite3.Connection):
+    # batch.py skip-check
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_runs_filename_model ON runs(filename, model_name)")
+    # report.py / visualize.py "latest run"
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_runs_created_at ON runs(created_at)")
+    # per-run lookups from report.py, visualize.py and the audit trail
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_section_stats_run ON section_stats(run_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_interactions_run ON interactions(run_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_facts_run ON facts(run_id)")
+    # build_knowledge_base.py confidence filter
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_facts_confidence ON facts(confidence)")
+
+
+def _interaction_model(conn: sqlite3.Connection):
+    # Cascade runs use several models per run, so record it per interaction.
+    # Older rows were all answered by their run's model.
+    _add_column(conn, "interactions", "model_name", "TEXT")
+    conn.execute("""
+        UPDATE interactions
+        SET model_name = (SELECT runs.model_name FROM runs WHERE runs.run_id = interactions.run_id)
+        WHERE model_name IS NULL
+    """)
+
+
+def _section_skipped_chunks(conn: sqlite3.Connection):
+    # Retrieved chunks the extraction policy never sent to the LLM
+    _add_column(conn, "section_stats", "skipped_chunks", "INTEGER DEFAULT 0")
+
+
+def _interaction_generation_metrics(conn: sqlite3.Connection):
+    # Split prompt processing (time to first token) from generation
+    _add_column(conn, "interactions", "ttft_seconds", "REAL")
+    _add_column(conn, "interactions", "prompt_eval_tokens", "INTEGER")
+    _add_column(conn, "interactions", "eval_tokens", "INTEGER")
+    _add_column(conn, "interactions", "tokens_per_sec", "REAL")
+
+
+def _run_warmup(conn: sqlite3.Connection):
+    # Model load time at run start, kept apart from per-call latencies
+    _add_column(conn, "runs", "warmup_seconds", "REAL")
+
+
+def _fact_evidence_span(conn: sqlite3.Connection):
+    # Where the verified quote matched in the page text, so reports can
+    # show the exact evidence without searching for it again
+    _add_column(conn, "facts", "citation_start", "INTEGER")
+    _add_column(conn, "facts", "citation_end", "INTEGER")
+    _add_column(conn, "facts", "citation_evidence", "TEXT")
+
+
+def _run_status_and_jobs(conn: sqlite3.Connection):
+    # Runs are 'running' until every work item is finished. Earlier runs
+    # were only ever recorded once, so they count as completed.
+    _add_column(conn, "runs", "status", "TEXT DEFAULT 'completed'")
+
+    # One row per (section, chunk) prompt of a run; see JobQueue
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            run_id TEXT,
+            section_name TEXT,
+            chunk_id TEXT,
+            status TEXT DEFAULT 'pending',
+            attempts INTEGER DEFAULT 0,
+            lease_owner TEXT,
+            lease_expires_at REAL,
+            next_attempt_at REAL DEFAULT 0,
+            last_error TEXT,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE(run_id, section_name, chunk_id),
+            FOREIGN KEY(run_id) REFERENCES runs(run_id)
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_run_status ON jobs(run_id, status)")
+
+
+def _run_revisions(conn: sqlite3.Connection):
+    # The PDF a run read, and the earlier run of the label it carried facts from
+    _add_column(conn, "runs", "content_hash", "TEXT")
+    _add_column(conn, "runs", "parent_run_id", "TEXT")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_runs_content_hash ON runs(content_hash, model_name)")
+
+    # The chunk a fact was answered from; carried facts point at the fact they copy
+    _add_column(conn, "facts", "chunk_id", "TEXT")
+    _add_column(conn, "facts", "carried_from", "INTEGER")
+
+    # Every chunk of the run's document, so a revision can tell which pages changed
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS run_chunks (
+            run_id TEXT,
+            chunk_id TEXT,
+            page_number INTEGER,
+            content_hash TEXT,
+            PRIMARY KEY(run_id, chunk_id),
+            FOREIGN KEY(run_id) REFERENCES runs(run_id)
+        )
+    """)
+
+
+MIGRATIONS: List[Tuple[int, str, Callable[[sqlite3.Connection], None]]] = [
+    (1, "Baseline schema: runs, section_stats, interactions, facts", _baseline),
+    (2, "Add interactions.cached", _interaction_cache_flag),
+    (3, "Add lookup indexes for runs, stats, interactions and facts", _lookup_indexes),
+    (4, "Add interactions.model_name", _interaction_model),
+    (5, "Add section_stats.skipped_chunks", _section_skipped_chunks),
+    (6, "Add interactions generation metrics", _interaction_generation_metrics),
+    (7, "Add runs.warmup_seconds", _run_warmup),
+    (8, "Add facts citation span and evidence", _fact_evidence_span),
+    (9, "Add runs.status and the jobs work queue", _run_status_and_jobs),
+    (10, "Add run content hashes, run chunks and fact lineage", _run_revisions),
+]
+
+
+def current_version(conn: sqlite3.Connection) -> int:
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            description TEXT,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    row = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+    return row[0] or 0
+
+
+def apply_migrations(conn: sqlite3.Connection) -> List[int]:
+    """
+    Brings the database up to the latest schema version.
+    Each pending migration runs in its own write transaction, which re-reads
+    the version once it holds the lock, so processes opening the database
+    at the same time apply every migration once. Returns the versions applied.
+    """
+    applied = []
+    version = current_version(conn)
+    conn.commit()
+
+    for number, description, migrate in MIGRATIONS:
+        if number <= version:
+            continue
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            version = current_version(conn)
+            if number <= version:
+                # Another process applied it while we waited for the lock
+                conn.commit()
+                continue
+            migrate(conn)
+            conn.execute(
+                "INSERT INTO schema_version (version, description) VALUES (?, ?)",
+                (number, description)
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        applied.append(number)
+
+    return applied
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Apply audit DB schema migrations")
+    parser.add_argument("--db", default=Config.DB_PATH, help="Path to audit DB")
+    args = parser.parse_args()
+
+    db_path = Path(args.db)
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(db_path)
+    applied = apply_migrations(conn)
+    print(f"Applied migrations: {applied or 'none'}. Schema version: {current_version(conn)}")
+    conn.close()
@@ -0,0 +1,177 @@
+import re
+from typing import Dict, List, NamedTuple, Optional
+import numpy as np
+from src.core.schema import DocumentChunk
+
+# Letters and digits; everything else (punctuation, whitespace, layout
+# breaks between blocks and pages) collapses to a single space
+TOKEN_PATTERN = re.compile(r"[^\W_]+")
+
+
+class QuoteHit(NamedTuple):
+    """One occurrence of a quote, in the coordinates of the page text."""
+    page_number: int
+    char_start: int
+    end_page_number: int  # differs from page_number when the quote crosses a page break
+    char_end: int         # offset within end_page_number's text
+    evidence: str         # the matched source text, verbatim
+
+
+def _fold(token: str) -> str:
+    """Lowercases a token without changing its length, so offsets stay aligned."""
+    lowered = token.lower()
+    if len(lowered) == len(token):
+        return lowered
+    # e.g. "İ" lowercases to two characters; such characters are kept as they are
+    return "".join(c if len(c.lower()) != 1 else c.lower() for c in token)
+
+
+def normalize(text: str) -> str:
+    return " ".join(_fold(token) for token in TOKEN_PATTERN.findall(text))
+
+
+def _normalize_with_offsets(text: str):
+    """Normalizes like `normalize`, returning the page offset of every normalized character."""
+    parts, offsets = [], []
+    for match in TOKEN_PATTERN.finditer(text):
+        if parts:
+            parts.append(" ")
+            offsets.append(np.array([match.start()]))
+        parts.append(_fold(match.group()))
+        offsets.append(np.arange(match.start(), match.end()))
+    positions = np.concatenate(offsets) if offsets else np.zeros(0, dtype=np.int64)
+    return "".join(parts), positions
+
+
+def suffix_array(codes: np.ndarray) -> np.ndarray:
+    """Suffix array of an integer sequence by prefix doubling (O(n log^2 n), all in NumPy)."""
+    n = len(codes)
+    if n == 0:
+        return np.zeros(0, dtype=np.int64)
+    rank = np.unique(codes, return_inverse=True)[1].astype(np.int64)
+    order = np.argsort(rank, kind="stable")
+    k = 1
+    while k < n:
+        # Suffixes shorter than k sort before longer ones sharing their prefix
+        second = np.full(n, -1, dtype=np.int64)
+        second[:n - k] = rank[k:]
+        order = np.lexsort((second, rank))
+        changed = (rank[order][1:] != rank[order][:-1]) | (second[order][1:] != second[order][:-1])
+        rank = np.empty(n, dtype=np.int64)
+        rank[order] = np.concatenate(([0], np.cumsum(changed)))
+        if rank[order[-1]] == n - 1:
+            break
+        k *= 2
+    return order
+
+
+class QuoteIndex:
+    """
+    Exact-quote lookup over a whole document.
+
+    The text of every page is normalized (lowercased, punctuation and
+    whitespace collapsed to single spaces) and concatenated, and a suffix
+    array is built over the result once. `locate` then finds every
+    occurrence of a quote with two binary searches, i.e. O(m log n) for an
+    m-character quote, and maps each hit back to its page and offsets. Quotes
+    that cross block or page boundaries match, since both collapse to a space;
+    pages without text (scans, figures) are left out, so a quote also
+    matches across them.
+    """
+
+    def __init__(self, pages: Dict[int, str]):
+        self.pages = dict(sorted(pages.items()))
+        texts, positions, starts, numbers = [], [], [], []
+        cursor = 0
+        for page_number, page_text in self.pages.items():
+            normalized, offsets = _normalize_with_offsets(page_text)
+            if not normalized:
+                continue
+            if texts:
+                # Page break; never the first or last character of a hit
+                texts.append(" ")
+                positions.append(np.array([-1]))
+                cursor += 1
+            starts.append(cursor)
+            numbers.append(page_number)
+            texts.append(normalized)
+            positions.append(offsets)
+            cursor += len(normalized)
+
+        self.text = "".join(texts)
+        self._positions = np.concatenate(positions) if positions else np.zeros(0, dtype=np.int64)
+        self._page_starts = np.array(starts, dtype=np.int64)
+        self._page_numbers = numbers
+        codes = np.frombuffer(self.text.encode("utf-32-le"), dtype=np.uint32)
+        self._suffixes = suffix_array(codes)
+
+    @classmethod
+    def from_chunks(cls, chunks: List[DocumentChunk]) -> "QuoteIndex":
+        """
+        Rebuilds each page's text from its chunks. Windows are placed at their
+        offsets; the gaps between them only ever held block separators.
+        """
+        pieces: Dict[int, List[DocumentChunk]] = {}
+        for chunk in chunks:
+            pieces.setdefault(chunk.page_number, []).append(chunk)
+
+        pages = {}
+        for page_number, page_chunks in pieces.items():
+            whole = [c for c in page_chunks if c.char_end is None]
+            if whole:
+                pages[page_number] = whole[0].text_content
+                continue
+            buffer = [" "] * max(c.char_end for c in page_chunks)
+            for chunk in page_chunks:
+                buffer[chunk.char_start:chunk.char_end] = chunk.text_content
+            pages[page_number] = "".join(buffer)
+        return cls(pages)
+
+    def _bound(self, quote: str, upper: bool) -> int:
+        low, high = 0, len(self._suffixes)
+        m = len(quote)
+        while low < high:
+            middle = (low + high) // 2
+            start = self._suffixes[middle]
+            prefix = self.text[start:start + m]
+            if prefix < quote or (upper and prefix == quote):
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def _page_at(self, position: int) -> int:
+        return int(np.searchsorted(self._page_starts, position, side="right")) - 1
+
+    def locate(self, quote: str, limit: Optional[int] = None) -> List[QuoteHit]:
+        """Every occurrence of `quote` in the document, in reading order."""
+        needle = normalize(quote)
+        if not needle:
+            return []
+        first, last = self._bound(needle, upper=False), self._bound(needle, upper=True)
+        hits = []
+        for start in np.sort(self._suffixes[first:last]):
+            start, end = int(start), int(start) + len(needle)
+            # Whole words only: "dose is 10" must not match inside "dose is 100"
+            if (start > 0 and self.text[start - 1] != " ") or (end < len(self.text) and self.text[end] != " "):
+                continue
+            hits.append(self._hit(start, end - 1))
+            if limit is not None and len(hits) >= limit:
+                break
+        return hits
+
+    def _hit(self, first: int, last: int) -> QuoteHit:
+        start_page, end_page = self._page_at(first), self._page_at(last)
+        start_number, end_number = self._page_numbers[start_page], self._page_numbers[end_page]
+        char_start = int(self._positions[first])
+        char_end = int(self._positions[last]) + 1
+
+        if start_page == end_page:
+            evidence = self.pages[start_number][char_start:char_end]
+        else:
+            evidence = "\n\n".join(
+                [self.pages[start_number][char_start:]]
+                + [self.pages[self._page_numbers[p]] for p in range(start_page + 1, end_page)]
+                + [self.pages[end_number][:char_end]]
+            )
+        return QuoteHit(start_number, char_start, end_number, char_end, evidence)
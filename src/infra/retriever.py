@@ -1,28 +1,66 @@
-from typing import List
+import math
+import re
+from collections import Counter, defaultdict
+from typing import Dict, List, Tuple
 from src.core.schema import DocumentChunk
 
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_PATTERN.findall(text.lower())
+
+
 class KeywordRetriever:
-    def __init__(self, chunks: List[DocumentChunk]):
+    """
+    BM25 keyword retriever backed by an inverted index.
+
+    Chunks are tokenized once at construction; each query then only touches
+    the postings of its own terms instead of scanning every chunk's text.
+    """
+
+    def __init__(self, chunks: List[DocumentChunk], k1: float = 1.5, b: float = 0.75):
         self.chunks = chunks
+        self.k1 = k1
+        self.b = b
+
+        # term -> [(chunk index, term frequency), ...]
+        self.postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        self.doc_lengths: List[int] = []
+
+        for index, chunk in enumerate(chunks):
+            tokens = tokenize(chunk.text_content)
+            self.doc_lengths.append(len(tokens))
+            for term, freq in Counter(tokens).items():
+                self.postings[term].append((index, freq))
+
+        self.avg_doc_length = (sum(self.doc_lengths) / len(chunks)) if chunks else 0.0
+
+    def idf(self, term: str) -> float:
+        # Lucene-style IDF: always positive, even for terms in most chunks
+        df = len(self.postings.get(term, ()))
+        n = len(self.chunks)
+        return math.log(1 + (n - df + 0.5) / (df + 0.5))
+
+    def retrieve_with_scores(self, query: str, top_k: int = 5) -> List[Tuple[float, DocumentChunk]]:
+        """Returns (bm25_score, chunk) pairs for matching chunks, best first."""
+        scores: Dict[int, float] = defaultdict(float)
+
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = self.idf(term)
+            for index, freq in postings:
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[index] / self.avg_doc_length)
+                scores[index] += idf * freq * (self.k1 + 1) / (freq + norm)
+
+        # Ties keep document order, like the previous stable sort
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return [(score, self.chunks[index]) for index, score in ranked[:top_k]]
 
     def retrieve(self, query: str, top_k: int = 5) -> List[DocumentChunk]:
         """
-        Returns chunks that contain words from the query, ranked by count.
+        Returns chunks that contain words from the query, ranked by BM25.
         """
-        query_words = set(query.lower().split())
-        scored_chunks = []
-
-        for chunk in self.chunks:
-            text_lower = chunk.text_content.lower()
-            score = 0
-            for word in query_words:
-                if word in text_lower:
-                    score += 1
-            
-            if score > 0:
-                scored_chunks.append((score, chunk))
-
-        # Sort by score descending
-        scored_chunks.sort(key=lambda x: x[0], reverse=True)
-        
-        return [item[1] for item in scored_chunks[:top_k]]
+        return [chunk for _, chunk in self.retrieve_with_scores(query, top_k)]
@@ -0,0 +1,61 @@
+from typing import Dict, List, Set, Tuple
+from src.core.schema import DocumentChunk
+from src.infra.store import AuditStore
+from src.config import Config
+
+
+def match_unchanged(previous: List[Tuple[str, int, str]], chunks: List[DocumentChunk]) -> Dict[str, Tuple[str, int]]:
+    """
+    Pairs the chunks of a label revision with the chunks of an earlier run
+    (`previous`, as returned by AuditStore.run_chunks) on pages whose text
+    did not change. A page is unchanged when an earlier page has exactly the
+    same chunks, so pages that only moved (e.g. after an inserted page) still
+    match; an earlier page at the same position is preferred.
+    Returns {chunk_id: (previous chunk_id, previous page_number)}.
+    """
+    previous_pages: Dict[int, List[Tuple[str, str]]] = {}
+    for chunk_id, page_number, content_hash in previous:
+        previous_pages.setdefault(page_number, []).append((chunk_id, content_hash))
+    by_signature: Dict[Tuple[str, ...], List[int]] = {}
+    for page_number, page_chunks in previous_pages.items():
+        by_signature.setdefault(tuple(h for _, h in page_chunks), []).append(page_number)
+
+    pages: Dict[int, List[DocumentChunk]] = {}
+    for chunk in chunks:
+        pages.setdefault(chunk.page_number, []).append(chunk)
+
+    matched = {}
+    for page_number, page_chunks in pages.items():
+        candidates = by_signature.get(tuple(c.content_hash() for c in page_chunks))
+        if not candidates:
+            continue
+        previous_page = page_number if page_number in candidates else candidates[0]
+        candidates.remove(previous_page)
+        for chunk, (previous_id, _) in zip(page_chunks, previous_pages[previous_page]):
+            matched[chunk.chunk_id] = (previous_id, previous_page)
+    return matched
+
+
+def carry_forward(
+        store: AuditStore,
+        run_id: str,
+        parent_run_id: str,
+        chunks: List[DocumentChunk],
+        section_chunks: Dict[str, List[DocumentChunk]],
+        sections: Dict[str, str] = Config.TARGET_SECTIONS
+    ) -> Tuple[int, Set[int]]:
+    """
+    Carries the parent run's answers into a new run of a revised label, for
+    every selected (section, chunk) item on an unchanged page (see
+    AuditStore.carry_facts). Returns (items carried, page numbers that
+    changed); items on changed pages are left for the LLM.
+    """
+    matched = match_unchanged(store.run_chunks(parent_run_id), chunks)
+    items = []
+    for title, selected in section_chunks.items():
+        for chunk in selected:
+            if chunk.chunk_id in matched:
+                parent_chunk_id, parent_page = matched[chunk.chunk_id]
+                items.append((title, sections[title], chunk.chunk_id, parent_chunk_id, chunk.page_number, parent_page))
+    changed = {chunk.page_number for chunk in chunks if chunk.chunk_id not in matched}
+    return store.carry_facts(run_id, parent_run_id, items), changed
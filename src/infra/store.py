@@ -1,118 +1,492 @@
+import atexit
 import sqlite3
+import threading
+import time
 import uuid
+import weakref
 from pathlib import Path
-from src.core.schema import Fact
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from src.core.schema import DocumentChunk, Fact
+from src.infra.migrations import apply_migrations
 from src.config import Config
 
 class AuditStore:
-    def __init__(self, db_path: str = Config.DB_PATH):
+    """
+    SQLite audit log of runs, LLM interactions and verified facts.
+
+    Holds one connection for its lifetime, in WAL mode. With `write_behind`,
+    interaction, fact and section rows are buffered and written with
+    `executemany` in a single transaction once `flush_rows` rows are pending,
+    `flush_seconds` after the first of them was buffered (by a timer thread,
+    so rows are written during long LLM calls too), or on `flush()`/`close()`.
+    Runs and job leases are always written immediately; job completions
+    and failures go through the buffer, so they commit together with the
+    facts and interactions they account for.
+    """
+
+    def __init__(
+            self,
+            db_path: str = Config.DB_PATH,
+            write_behind: bool = Config.AUDIT_WRITE_BEHIND,
+            flush_rows: int = Config.AUDIT_FLUSH_ROWS,
+            flush_seconds: float = Config.AUDIT_FLUSH_SECONDS
+        ):
         self.db_path = Path(db_path)
+        self.write_behind = write_behind
+        self.flush_rows = flush_rows
+        self.flush_seconds = flush_seconds
+
+        self._lock = threading.RLock()
+        self._conn = None
+        # sql -> pending parameter rows, in insertion order
+        self._pending = {}
+        self._pending_count = 0
+        self._timer = None
+
         self._init_db()
 
     def _get_conn(self):
-        return sqlite3.connect(self.db_path)
+        with self._lock:
+            if self._conn is None:
+                self._conn = sqlite3.connect(
+                    self.db_path,
+                    timeout=Config.AUDIT_BUSY_TIMEOUT,
+                    check_same_thread=False
+                )
+                self._conn.execute(f"PRAGMA journal_mode={Config.AUDIT_JOURNAL_MODE}")
+                self._conn.execute("PRAGMA synchronous=NORMAL")
+                self._conn.execute("PRAGMA temp_store=MEMORY")
+                self._conn.execute("PRAGMA cache_size=-16000")
+                # Writes buffered rows on interpreter exit; close() unregisters it
+                atexit.register(self.close)
+            return self._conn
+
+    def _write(self, sql: str, params: tuple):
+        with self._lock:
+            if not self.write_behind:
+                conn = self._get_conn()
+                conn.execute(sql, params)
+                conn.commit()
+                return
+
+            self._pending.setdefault(sql, []).append(params)
+            self._pending_count += 1
+            if self._pending_count >= self.flush_rows:
+                self.flush()
+            elif self._timer is None:
+                # Holds only a weak reference, so a pending timer never keeps the store alive
+                self._timer = threading.Timer(self.flush_seconds, AuditStore._flush_later, (weakref.ref(self),))
+                self._timer.daemon = True
+                self._timer.start()
+
+    @staticmethod
+    def _flush_later(ref: "weakref.ref[AuditStore]"):
+        store = ref()
+        if store is None:
+            return
+        try:
+            store.flush()
+        except sqlite3.Error:
+            pass  # Busy database: the rows stay buffered for the next write or flush
+
+    def flush(self):
+        """Writes all buffered rows in one transaction."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._pending:
+                return
+            conn = self._get_conn()
+            with conn:
+                for sql, rows in self._pending.items():
+                    conn.executemany(sql, rows)
+            self._pending = {}
+            self._pending_count = 0
+
+    def close(self):
+        with self._lock:
+            if self._conn is None:
+                return
+            self.flush()
+            self._conn.close()
+            self._conn = None
+            atexit.unregister(self.close)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
 
     def _init_db(self):
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
-        conn = self._get_conn()
-        cursor = conn.cursor()
-        
-        # runs table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS runs (
-                run_id TEXT PRIMARY KEY,
-                filename TEXT,
-                model_name TEXT,
-                seed INTEGER,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        with self._lock:
+            apply_migrations(self._get_conn())
+
+    def start_run(
+            self,
+            filename: str,
+            model_name: str,
+            seed: int,
+            content_hash: Optional[str] = None,
+            parent_run_id: Optional[str] = None
+        ) -> str:
+        run_id = str(uuid.uuid4())
+        with self._lock:
+            conn = self._get_conn()
+            conn.execute(
+                """INSERT INTO runs (run_id, filename, model_name, seed, status, content_hash, parent_run_id)
+                   VALUES (?, ?, ?, ?, 'running', ?, ?)""",
+                (run_id, filename, model_name, seed, content_hash, parent_run_id)
             )
-        """)
-        
-        # section_stats table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS section_stats (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                run_id TEXT,
-                section_name TEXT,
-                duration_seconds REAL,
-                chunk_count INTEGER,
-                FOREIGN KEY(run_id) REFERENCES runs(run_id)
+            conn.commit()
+        return run_id
+
+    def finish_run(self, run_id: str, status: str = "completed"):
+        """Flushes the run's buffered rows, then records its final status."""
+        with self._lock:
+            self.flush()
+            conn = self._get_conn()
+            conn.execute("UPDATE runs SET status = ? WHERE run_id = ?", (status, run_id))
+            conn.commit()
+
+    def reopen_run(self, run_id: str):
+        """Marks a run being resumed as 'running' again."""
+        with self._lock:
+            conn = self._get_conn()
+            conn.execute("UPDATE runs SET status = 'running' WHERE run_id = ?", (run_id,))
+            conn.commit()
+
+    def log_warmup(self, run_id: str, seconds: float):
+        """Records how long the run's model warm-up (cold start) took."""
+        self._write("UPDATE runs SET warmup_seconds = ? WHERE run_id = ?", (seconds, run_id))
+
+    def find_run(
+            self,
+            filename: str,
+            model_name: str,
+            status: Optional[str] = None,
+            content_hash: Optional[str] = None,
+            with_jobs: bool = False
+        ) -> Optional[str]:
+        """
+        Returns the run_id of the latest earlier run of this file and model
+        (with `status`), if any. With `content_hash`, only runs of that
+        content count; runs from before hashes were recorded never match,
+        so their files are processed again. With `with_jobs`, only runs tracked in the
+        jobs table count, i.e. runs that batch.py can resume.
+        """
+        sql = "SELECT run_id FROM runs WHERE filename = ? AND model_name = ?"
+        params = (filename, model_name)
+        if status is not None:
+            sql += " AND status = ?"
+            params += (status,)
+        if content_hash is not None:
+            sql += " AND content_hash = ?"
+            params += (content_hash,)
+        if with_jobs:
+            sql += " AND EXISTS (SELECT 1 FROM jobs WHERE jobs.run_id = runs.run_id)"
+        with self._lock:
+            row = self._get_conn().execute(sql + " ORDER BY created_at DESC, rowid DESC", params).fetchone()
+        return row[0] if row else None
+
+    def find_parent_run(self, filename: str, model_name: str, content_hash: str) -> Optional[str]:
+        """
+        The completed run a new run of this file can carry facts from: the
+        latest one of the same content under any name, else the latest one
+        of this file name. Only runs that recorded their chunks qualify.
+        """
+        with self._lock:
+            row = self._get_conn().execute(
+                """SELECT run_id FROM runs
+                   WHERE model_name = ? AND status = 'completed' AND (content_hash = ? OR filename = ?)
+                     AND EXISTS (SELECT 1 FROM run_chunks WHERE run_chunks.run_id = runs.run_id)
+                   ORDER BY content_hash = ? DESC, created_at DESC, rowid DESC LIMIT 1""",
+                (model_name, content_hash, filename, content_hash)
+            ).fetchone()
+        return row[0] if row else None
+
+    def record_chunks(self, run_id: str, chunks: Iterable[DocumentChunk]):
+        with self._lock:
+            conn = self._get_conn()
+            conn.executemany(
+                "INSERT OR IGNORE INTO run_chunks (run_id, chunk_id, page_number, content_hash) VALUES (?, ?, ?, ?)",
+                [(run_id, c.chunk_id, c.page_number, c.content_hash()) for c in chunks]
             )
-        """)
-
-        # interactions table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS interactions (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                run_id TEXT,
-                chunk_id TEXT,
-                question TEXT,
-                prompt_snapshot TEXT,
-                raw_response TEXT,
-                is_valid_json BOOLEAN,
-                latency_seconds REAL,
-                FOREIGN KEY(run_id) REFERENCES runs(run_id)
+            conn.commit()
+
+    def run_chunks(self, run_id: str) -> List[Tuple[str, int, str]]:
+        """(chunk_id, page_number, content_hash) of every chunk of the run, in document order."""
+        with self._lock:
+            return self._get_conn().execute(
+                "SELECT chunk_id, page_number, content_hash FROM run_chunks WHERE run_id = ? ORDER BY page_number, rowid",
+                (run_id,)
+            ).fetchall()
+
+    def carry_facts(self, run_id: str, parent_run_id: str, items: Iterable[Tuple[str, str, str, str, int, int]]) -> int:
+        """
+        Copies answers from `parent_run_id` into the run, in one transaction.
+        Each item is (section_name, question, chunk_id, parent_chunk_id,
+        page_number, parent_page_number) for two chunks with the same text.
+        An item is carried when the parent finished it and every fact it
+        gave cites the chunk's own page; it is then recorded as a 'carried'
+        job, its facts are copied with `carried_from` pointing at the
+        originals, and it is never sent to the LLM. Returns how many items
+        were carried.
+        """
+        carried = 0
+        with self._lock:
+            self.flush()
+            conn = self._get_conn()
+            with conn:
+                for section, question, chunk_id, parent_chunk_id, page, parent_page in items:
+                    row = conn.execute(
+                        """SELECT 1 FROM jobs
+                           WHERE run_id = ? AND section_name = ? AND chunk_id = ? AND status IN ('done', 'carried')
+                             AND NOT EXISTS (SELECT 1 FROM facts WHERE run_id = ? AND chunk_id = ?
+                                             AND attribute = ? AND chunk_page != ?)""",
+                        (parent_run_id, section, parent_chunk_id, parent_run_id, parent_chunk_id, question, parent_page)
+                    ).fetchone()
+                    if row is None:
+                        continue
+                    cursor = conn.execute(
+                        "INSERT OR IGNORE INTO jobs (run_id, section_name, chunk_id, status) VALUES (?, ?, ?, 'carried')",
+                        (run_id, section, chunk_id)
+                    )
+                    if not cursor.rowcount:
+                        continue
+                    conn.execute(
+                        """INSERT INTO facts
+                           (run_id, chunk_page, attribute, value, citation_quote, confidence,
+                            citation_start, citation_end, citation_evidence, chunk_id, carried_from)
+                           SELECT ?, ?, attribute, value, citation_quote, confidence,
+                                  citation_start, citation_end, citation_evidence, ?, id
+                           FROM facts WHERE run_id = ? AND chunk_id = ? AND attribute = ? ORDER BY id""",
+                        (run_id, page, chunk_id, parent_run_id, parent_chunk_id, question)
+                    )
+                    carried += 1
+        return carried
+
+    def enqueue_jobs(self, run_id: str, items: Iterable[Tuple[str, str]]):
+        """Adds (section_name, chunk_id) work items to a run; items it already has are kept as they are."""
+        with self._lock:
+            conn = self._get_conn()
+            conn.executemany(
+                "INSERT OR IGNORE INTO jobs (run_id, section_name, chunk_id) VALUES (?, ?, ?)",
+                [(run_id, section, chunk_id) for section, chunk_id in items]
             )
-        """)
-        
-        # facts table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS facts (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                run_id TEXT,
-                chunk_page INTEGER,
-                attribute TEXT,
-                value TEXT,
-                citation_quote TEXT,
-                confidence TEXT,
-                FOREIGN KEY(run_id) REFERENCES runs(run_id)
+            conn.commit()
+
+    def lease_jobs(self, run_id: str, owner: str, lease_seconds: float) -> Dict[Tuple[str, str], int]:
+        """
+        Leases every item of the run that is due: pending items past their
+        backoff, and leased items whose lease has expired. Returns
+        {(section_name, chunk_id): job_id} for the items now held by `owner`.
+        """
+        with self._lock:
+            conn = self._get_conn()
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                return self._lease_due(conn, run_id, owner, lease_seconds)
+
+    def lease_next_run(self, run_ids: List[str], owner: str, lease_seconds: float) -> Tuple[Optional[str], Dict[Tuple[str, str], int]]:
+        """
+        Picks the first of `run_ids` with due items and leases all of them, in
+        one transaction, so concurrent workers never lease the same item.
+        Returns (run_id, leased items), or (None, {}) when nothing is due.
+        """
+        if not run_ids:
+            return None, {}
+        now = time.time()
+        marks = ", ".join("?" for _ in run_ids)
+        with self._lock:
+            conn = self._get_conn()
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                row = conn.execute(
+                    f"""SELECT run_id FROM jobs
+                        WHERE run_id IN ({marks}) AND ((status = 'pending' AND next_attempt_at <= ?)
+                                                       OR (status = 'leased' AND lease_expires_at <= ?))
+                        ORDER BY id LIMIT 1""",
+                    (*run_ids, now, now)
+                ).fetchone()
+                if row is None:
+                    return None, {}
+                return row[0], self._lease_due(conn, row[0], owner, lease_seconds)
+
+    @staticmethod
+    def _lease_due(conn: sqlite3.Connection, run_id: str, owner: str, lease_seconds: float) -> Dict[Tuple[str, str], int]:
+        now = time.time()
+        rows = conn.execute(
+            """SELECT id, section_name, chunk_id FROM jobs
+               WHERE run_id = ? AND ((status = 'pending' AND next_attempt_at <= ?)
+                                     OR (status = 'leased' AND lease_expires_at <= ?))
+               ORDER BY id""",
+            (run_id, now, now)
+        ).fetchall()
+        conn.executemany(
+            """UPDATE jobs SET status = 'leased', lease_owner = ?, lease_expires_at = ?,
+               attempts = attempts + 1, updated_at = CURRENT_TIMESTAMP WHERE id = ?""",
+            [(owner, now + lease_seconds, job_id) for job_id, _, _ in rows]
+        )
+        return {(section, chunk_id): job_id for job_id, section, chunk_id in rows}
+
+    def renew_leases(self, owner: str, lease_seconds: float) -> int:
+        """Heartbeat: extends every lease `owner` holds. Returns how many it holds."""
+        with self._lock:
+            conn = self._get_conn()
+            cursor = conn.execute(
+                "UPDATE jobs SET lease_expires_at = ? WHERE status = 'leased' AND lease_owner = ?",
+                (time.time() + lease_seconds, owner)
             )
-        """)
-        
-        conn.commit()
-        conn.close()
+            conn.commit()
+        return cursor.rowcount
 
-    def start_run(self, filename: str, model_name: str, seed: int) -> str:
-        run_id = str(uuid.uuid4())
-        conn = self._get_conn()
-        conn.execute(
-            "INSERT INTO runs (run_id, filename, model_name, seed) VALUES (?, ?, ?, ?)",
-            (run_id, filename, model_name, seed)
+    def complete_job(self, job_id: int, owner: str, status: str = "done"):
+        """
+        No-op unless `owner` still holds the lease: an item whose lease ran
+        out was handed to another worker, which completes it instead.
+        """
+        # lease_owner is kept, recording which worker did the item
+        self._write(
+            """UPDATE jobs SET status = ?, updated_at = CURRENT_TIMESTAMP
+               WHERE id = ? AND status = 'leased' AND lease_owner = ?""",
+            (status, job_id, owner)
         )
-        conn.commit()
-        conn.close()
-        return run_id
 
-    def log_section_stats(self, run_id: str, section_name: str, duration: float, chunk_count: int):
-        conn = self._get_conn()
-        conn.execute(
-            "INSERT INTO section_stats (run_id, section_name, duration_seconds, chunk_count) VALUES (?, ?, ?, ?)",
-            (run_id, section_name, duration, chunk_count)
+    def fail_job(self, job_id: int, owner: str, error: str, max_attempts: int, backoff_seconds: float, max_backoff_seconds: float):
+        """
+        Returns the item to the queue after an exponential backoff, or marks
+        it failed once out of attempts. No-op unless `owner` still holds the lease.
+        """
+        self._write(
+            """UPDATE jobs SET
+                   status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END,
+                   next_attempt_at = ? + MIN(?, ? * (1 << (attempts - 1))),
+                   lease_owner = NULL, last_error = ?, updated_at = CURRENT_TIMESTAMP
+               WHERE id = ? AND status = 'leased' AND lease_owner = ?""",
+            (max_attempts, time.time(), max_backoff_seconds, backoff_seconds, error, job_id, owner)
+        )
+
+    def release_jobs(self, run_id: str, failed: bool = False, leased: bool = True):
+        """
+        With `leased`, returns the run's leased items to the queue without
+        charging the attempt, e.g. after the only worker holding them crashed.
+        With `failed`, items that ran out of attempts are given a fresh set.
+        """
+        with self._lock:
+            conn = self._get_conn()
+            if leased:
+                conn.execute(
+                    """UPDATE jobs SET status = 'pending', lease_owner = NULL, attempts = MAX(0, attempts - 1)
+                       WHERE run_id = ? AND status = 'leased'""",
+                    (run_id,)
+                )
+            if failed:
+                conn.execute(
+                    "UPDATE jobs SET status = 'pending', attempts = 0, next_attempt_at = 0 WHERE run_id = ? AND status = 'failed'",
+                    (run_id,)
+                )
+            conn.commit()
+
+    def job_progress(self, run_id: str) -> Dict[str, int]:
+        """Item counts by status for one run."""
+        with self._lock:
+            rows = self._get_conn().execute(
+                "SELECT status, COUNT(*) FROM jobs WHERE run_id = ? GROUP BY status", (run_id,)
+            ).fetchall()
+        return dict(rows)
+
+    def batch_progress(self, run_ids: List[str]) -> dict:
+        """
+        Totals across several runs: item counts by status, items done per
+        worker, and the LLM calls (and generated tokens) logged for them.
+        """
+        if not run_ids:
+            return {"jobs": {}, "workers": {}, "prompts": 0, "eval_tokens": 0}
+        marks = ", ".join("?" for _ in run_ids)
+        with self._lock:
+            conn = self._get_conn()
+            jobs = conn.execute(
+                f"SELECT status, COUNT(*) FROM jobs WHERE run_id IN ({marks}) GROUP BY status", run_ids
+            ).fetchall()
+            workers = conn.execute(
+                f"""SELECT lease_owner, COUNT(*) FROM jobs
+                    WHERE run_id IN ({marks}) AND status = 'done' GROUP BY lease_owner""",
+                run_ids
+            ).fetchall()
+            prompts, eval_tokens = conn.execute(
+                f"SELECT COUNT(*), COALESCE(SUM(eval_tokens), 0) FROM interactions WHERE run_id IN ({marks})", run_ids
+            ).fetchone()
+        return {"jobs": dict(jobs), "workers": dict(workers), "prompts": prompts, "eval_tokens": eval_tokens}
+
+    def run_source(self, run_id: str) -> Optional[Tuple[str, Optional[str]]]:
+        """(filename, content_hash) of the PDF the run reads."""
+        with self._lock:
+            row = self._get_conn().execute("SELECT filename, content_hash FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+        return tuple(row) if row else None
+
+    def next_job_due(self, run_id: str) -> Optional[float]:
+        """Earliest time (epoch seconds) a pending or leased item of the run can be leased."""
+        with self._lock:
+            row = self._get_conn().execute(
+                """SELECT MIN(CASE status WHEN 'pending' THEN next_attempt_at ELSE lease_expires_at END)
+                   FROM jobs WHERE run_id = ? AND status IN ('pending', 'leased')""",
+                (run_id,)
+            ).fetchone()
+        return row[0]
+
+    def logged_sections(self, run_id: str) -> Set[str]:
+        """Sections of the run whose stats are already written."""
+        with self._lock:
+            rows = self._get_conn().execute(
+                "SELECT DISTINCT section_name FROM section_stats WHERE run_id = ?", (run_id,)
+            ).fetchall()
+        return {row[0] for row in rows}
+
+    def log_section_stats(self, run_id: str, section_name: str, duration: float, chunk_count: int, skipped_chunks: int = 0):
+        self._write(
+            "INSERT INTO section_stats (run_id, section_name, duration_seconds, chunk_count, skipped_chunks) VALUES (?, ?, ?, ?, ?)",
+            (run_id, section_name, duration, chunk_count, skipped_chunks)
         )
-        conn.commit()
-        conn.close()
 
-    def log_interaction(self, run_id: str, chunk_id: str, question: str, prompt: str, response: str, is_valid_json: bool, latency: float = 0.0):
-        conn = self._get_conn()
-        conn.execute(
+    def log_interaction(
+            self,
+            run_id: str,
+            chunk_id: str,
+            question: str,
+            prompt: str,
+            response: str,
+            is_valid_json: bool,
+            latency: float = 0.0,
+            cached: bool = False,
+            model_name: Optional[str] = None,
+            ttft: Optional[float] = None,
+            prompt_eval_tokens: Optional[int] = None,
+            eval_tokens: Optional[int] = None,
+            tokens_per_sec: Optional[float] = None
+        ):
+        self._write(
             """INSERT INTO interactions 
-               (run_id, chunk_id, question, prompt_snapshot, raw_response, is_valid_json, latency_seconds) 
-               VALUES (?, ?, ?, ?, ?, ?, ?)""",
-            (run_id, chunk_id, question, prompt, response, is_valid_json, latency)
+               (run_id, chunk_id, question, prompt_snapshot, raw_response, is_valid_json, latency_seconds, cached, model_name,
+                ttft_seconds, prompt_eval_tokens, eval_tokens, tokens_per_sec) 
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            (run_id, chunk_id, question, prompt, response, is_valid_json, latency, cached, model_name,
+             ttft, prompt_eval_tokens, eval_tokens, tokens_per_sec)
         )
-        conn.commit()
-        conn.close()
 
-    def save_fact(self, run_id: str, fact: Fact):
-        conn = self._get_conn()
-        citation_txt = fact.citations[0].quote_snippet if fact.citations else ""
-        page_num = fact.citations[0].page_number if fact.citations else 0
+    def save_fact(self, run_id: str, fact: Fact, chunk_id: Optional[str] = None):
+        citation = fact.citations[0] if fact.citations else None
+        citation_txt = citation.quote_snippet if citation else ""
+        page_num = citation.page_number if citation else 0
+        start, end, evidence = (citation.char_start, citation.char_end, citation.evidence) if citation else (None, None, None)
         
-        conn.execute(
+        self._write(
             """INSERT INTO facts 
-               (run_id, chunk_page, attribute, value, citation_quote, confidence) 
-               VALUES (?, ?, ?, ?, ?, ?)""",
-            (run_id, page_num, fact.attribute, fact.value, citation_txt, fact.confidence.value)
-        )
-        conn.commit()
-        conn.close()
\ No newline at end of file
+               (run_id, chunk_page, attribute, value, citation_quote, confidence,
+                citation_start, citation_end, citation_evidence, chunk_id) 
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            (run_id, page_num, fact.attribute, fact.value, citation_txt, fact.confidence.value,
+             start, end, evidence, chunk_id)
+        )
\ No newline at end of file
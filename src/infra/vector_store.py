@@ -0,0 +1,280 @@
+import json
+import os
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+from src.config import Config
+
+BACKENDS = ("chroma", "numpy")
+# Stored rows converted to float32 at a time when scoring a query
+SCORE_BLOCK_ROWS = 8192
+
+
+class VectorStore(ABC):
+    """
+    Minimal interface the knowledge base needs from a vector backend.
+
+    `query` returns Chroma-shaped results (one inner list per query embedding)
+    for 'ids', 'documents', 'metadatas' and 'distances', so callers do not
+    care which backend answered.
+    """
+
+    name = Config.KB_COLLECTION
+    state_file: Path
+
+    @abstractmethod
+    def upsert(self, ids: List[str], embeddings: Sequence, documents: List[str], metadatas: List[dict]):
+        ...
+
+    @abstractmethod
+    def query(self, query_embeddings: Sequence, n_results: int = 3, where: Optional[dict] = None) -> dict:
+        ...
+
+    @abstractmethod
+    def count(self) -> int:
+        ...
+
+    @abstractmethod
+    def reset(self):
+        """Drops every vector and the indexing high-water mark."""
+
+    def load_watermark(self) -> int:
+        """Highest facts.id already indexed into this store."""
+        try:
+            state = json.loads(self.state_file.read_text())
+        except (OSError, ValueError):
+            return 0
+        return int(state.get(self.name, 0))
+
+    def save_watermark(self, last_fact_id: int):
+        try:
+            state = json.loads(self.state_file.read_text())
+        except (OSError, ValueError):
+            state = {}
+        state[self.name] = last_fact_id
+        self.state_file.parent.mkdir(parents=True, exist_ok=True)
+        self.state_file.write_text(json.dumps(state, indent=2))
+
+
+class ChromaVectorStore(VectorStore):
+    def __init__(self, path: Path = Config.VECTOR_STORE_DIR, create: bool = False):
+        # Imported here so the NumPy backend never pays for chromadb
+        import chromadb
+
+        self.path = Path(path)
+        self.state_file = self.path / "index_state.json"
+        self._client = chromadb.PersistentClient(path=str(self.path))
+        self._create = create
+        self._collection = None
+
+    @property
+    def collection(self):
+        # No embedding function: vectors always come from the caller (see
+        # knowledge_base.get_embedder), so opening the store never loads a model
+        if self._collection is None:
+            if self._create:
+                self._collection = self._client.get_or_create_collection(name=self.name, embedding_function=None)
+            else:
+                self._collection = self._client.get_collection(name=self.name, embedding_function=None)
+        return self._collection
+
+    def upsert(self, ids, embeddings, documents, metadatas):
+        self.collection.upsert(ids=ids, embeddings=embeddings, documents=documents, metadatas=metadatas)
+
+    def query(self, query_embeddings, n_results=3, where=None):
+        return self.collection.query(query_embeddings=query_embeddings, n_results=n_results, where=where or None)
+
+    def count(self):
+        return self.collection.count()
+
+    def reset(self):
+        try:
+            self._client.delete_collection(name=self.name)
+        except Exception:
+            pass  # Nothing to drop yet
+        self._collection = None
+        self.save_watermark(0)
+
+
+class NumpyVectorStore(VectorStore):
+    """
+    Exact-search store for small corpora, kept in plain files:
+
+        vectors.npy    (n, dim) float32, or int8 with per-row scales
+        scales.npy     (n,) float32 dequantization scales (int8 only)
+        records.json   ids, documents and metadatas, row-aligned with vectors
+
+    Vectors are L2-normalized on write and memory-mapped on read; a query is
+    one matrix-vector product. Distances are squared L2 between unit vectors
+    (2 - 2 * cosine), the same scale as Chroma's default space.
+    Metadata filters are answered from cached per-(key, value) boolean masks.
+    """
+
+    def __init__(self, path: Path = Config.NUMPY_STORE_DIR, dtype: str = Config.NUMPY_STORE_DTYPE):
+        if dtype not in ("float32", "int8"):
+            raise ValueError(f"Unsupported dtype '{dtype}'. Expected 'float32' or 'int8'.")
+        self.path = Path(path) / self.name
+        self.state_file = self.path / "index_state.json"
+        self.dtype = dtype
+        self._load()
+
+    def _load(self):
+        records_file = self.path / "records.json"
+        if records_file.exists():
+            records = json.loads(records_file.read_text())
+            self.dtype = records["dtype"]
+            self.ids = records["ids"]
+            self.documents = records["documents"]
+            self.metadatas = records["metadatas"]
+            self.vectors = np.load(self.path / "vectors.npy", mmap_mode="r")
+            self.scales = np.load(self.path / "scales.npy", mmap_mode="r") if self.dtype == "int8" else None
+        else:
+            self.ids, self.documents, self.metadatas = [], [], []
+            self.vectors, self.scales = None, None
+        self._row_of = {fact_id: row for row, fact_id in enumerate(self.ids)}
+        self._masks: Dict[tuple, np.ndarray] = {}
+
+    def _dense(self) -> Optional[np.ndarray]:
+        """All stored vectors as normalized float32 (dequantized if needed)."""
+        if self.vectors is None:
+            return None
+        dense = np.asarray(self.vectors, dtype=np.float32)
+        if self.scales is not None:
+            dense = dense * np.asarray(self.scales)[:, None]
+        return dense
+
+    @staticmethod
+    def _normalize(matrix: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix / np.where(norms == 0, 1, norms)
+
+    def upsert(self, ids, embeddings, documents, metadatas):
+        new = self._normalize(np.asarray(embeddings, dtype=np.float32))
+        dense = self._dense()
+        rows = list(dense) if dense is not None else []
+
+        for i, fact_id in enumerate(ids):
+            row = self._row_of.get(fact_id)
+            if row is None:
+                self._row_of[fact_id] = len(self.ids)
+                self.ids.append(fact_id)
+                self.documents.append(documents[i])
+                self.metadatas.append(metadatas[i])
+                rows.append(new[i])
+            else:
+                self.documents[row] = documents[i]
+                self.metadatas[row] = metadatas[i]
+                rows[row] = new[i]
+
+        self._write(np.vstack(rows))
+
+    def _write(self, dense: np.ndarray):
+        self.path.mkdir(parents=True, exist_ok=True)
+        if self.dtype == "int8":
+            scales = np.abs(dense).max(axis=1) / 127.0
+            scales[scales == 0] = 1.0
+            vectors = np.round(dense / scales[:, None]).astype(np.int8)
+            self._save_array("scales.npy", scales.astype(np.float32))
+        else:
+            vectors = dense.astype(np.float32)
+        self._save_array("vectors.npy", vectors)
+
+        records = {"dtype": self.dtype, "ids": self.ids, "documents": self.documents, "metadatas": self.metadatas}
+        tmp = self.path / "records.json.tmp"
+        tmp.write_text(json.dumps(records))
+        os.replace(tmp, self.path / "records.json")
+        self._load()
+
+    def _save_array(self, filename: str, array: np.ndarray):
+        tmp = self.path / f"{filename}.tmp"
+        with open(tmp, "wb") as f:
+            np.save(f, array)
+        os.replace(tmp, self.path / filename)
+
+    def _mask(self, where: Optional[dict]) -> Optional[np.ndarray]:
+        """Supports {k: v}, {k: {"$eq": v}}, {k: {"$ne": v}}, {k: {"$in": [...]}} and {"$and": [...]}."""
+        if not where:
+            return None
+        mask = np.ones(len(self.ids), dtype=bool)
+        for key, condition in where.items():
+            if key == "$and":
+                for clause in condition:
+                    mask &= self._mask(clause)
+                continue
+            if not isinstance(condition, dict):
+                condition = {"$eq": condition}
+            for op, value in condition.items():
+                if op == "$eq":
+                    mask &= self._value_mask(key, value)
+                elif op == "$ne":
+                    mask &= ~self._value_mask(key, value)
+                elif op == "$in":
+                    mask &= np.logical_or.reduce([self._value_mask(key, v) for v in value] or [np.zeros_like(mask)])
+                else:
+                    raise ValueError(f"Unsupported filter operator '{op}'")
+        return mask
+
+    def _value_mask(self, key: str, value) -> np.ndarray:
+        cache_key = (key, json.dumps(value))
+        if cache_key not in self._masks:
+            self._masks[cache_key] = np.array([m.get(key) == value for m in self.metadatas], dtype=bool)
+        return self._masks[cache_key]
+
+    def query(self, query_embeddings, n_results=3, where=None):
+        results = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        queries = self._normalize(np.asarray(query_embeddings, dtype=np.float32))
+        if self.vectors is None:
+            for key in results:
+                results[key] = [[] for _ in queries]
+            return results
+
+        scores = self._scores(queries)
+        mask = self._mask(where)
+        if mask is not None:
+            scores[~mask] = -np.inf
+        available = len(self.ids) if mask is None else int(mask.sum())
+        k = min(n_results, available)
+
+        for column in scores.T:
+            if k == 0:
+                top = np.array([], dtype=int)
+            else:
+                top = np.argpartition(-column, k - 1)[:k]
+                top = top[np.argsort(-column[top], kind="stable")]
+            results["ids"].append([self.ids[i] for i in top])
+            results["documents"].append([self.documents[i] for i in top])
+            results["metadatas"].append([self.metadatas[i] for i in top])
+            results["distances"].append([float(2 - 2 * column[i]) for i in top])
+        return results
+
+    def _scores(self, queries: np.ndarray) -> np.ndarray:
+        """
+        (n, q) cosine similarities. Stored rows are converted to float32 one
+        block at a time, so an int8 store is never copied to float in full;
+        int8 rows are rescaled after the product.
+        """
+        scores = np.empty((len(self.ids), len(queries)), dtype=np.float32)
+        for start in range(0, len(self.ids), SCORE_BLOCK_ROWS):
+            block = np.asarray(self.vectors[start:start + SCORE_BLOCK_ROWS], dtype=np.float32)
+            scores[start:start + SCORE_BLOCK_ROWS] = block @ queries.T
+        if self.scales is not None:
+            scores *= np.asarray(self.scales)[:, None]
+        return scores
+
+    def count(self):
+        return len(self.ids)
+
+    def reset(self):
+        for filename in ("vectors.npy", "scales.npy", "records.json"):
+            (self.path / filename).unlink(missing_ok=True)
+        self._load()
+        self.save_watermark(0)
+
+
+def open_store(backend: str = Config.VECTOR_BACKEND, create: bool = False) -> VectorStore:
+    if backend == "chroma":
+        return ChromaVectorStore(create=create)
+    if backend == "numpy":
+        return NumpyVectorStore()
+    raise ValueError(f"Unknown vector backend '{backend}'. Expected one of {BACKENDS}.")
@@ -1,71 +1,219 @@
 import time
 import argparse
 from pathlib import Path
+from typing import Dict, List, Optional
 from rich.console import Console
 
-from src.infra.ingest import ingest_pdf
+from src.infra.ingest import file_content_hash, ingest_many, ingest_pdf
+from src.infra.chunking import STRATEGIES
 from src.infra.retriever import KeywordRetriever
+from src.infra.quote_index import QuoteIndex
 from src.core.agent import ExtractionAgent
+from src.core.pipeline import run_extraction, select_chunks
+from src.core.policy import ExtractionPolicy
+from src.core.schema import DocumentChunk
 from src.infra.store import AuditStore
+from src.infra.jobs import Heartbeat, JobQueue
+from src.infra.revisions import carry_forward
+from src.infra.cache import ResponseCache
 
 from src.config import Config
 
 console = Console()
 
+
+def format_progress(progress: dict) -> str:
+    order = ("done", "carried", "skipped", "failed", "pending", "leased")
+    return ", ".join(f"{progress[status]} {status}" for status in order if progress.get(status)) or "no work items"
+
+
+def find_finished_run(
+        store: AuditStore,
+        filename: str,
+        model_name: str,
+        retry_failed: bool = False,
+        content_hash: Optional[str] = None
+    ) -> Optional[str]:
+    """
+    A run of this file's content that needs no more work: completed, or
+    failed when failed items are not being retried.
+    """
+    return store.find_run(filename, model_name, status="completed", content_hash=content_hash) or (
+        None if retry_failed else store.find_run(filename, model_name, status="failed", content_hash=content_hash)
+    )
+
+
+def open_run(
+        store: AuditStore,
+        pdf_path: Path,
+        model_name: str,
+        chunks: List[DocumentChunk],
+        retriever: KeywordRetriever,
+        content_hash: str,
+        policy: Optional[ExtractionPolicy] = None,
+        retry_failed: bool = False,
+        release_leased: bool = True
+    ) -> str:
+    """
+    Returns the run to work on for this file. A 'running' batch run of the
+    same content (or, with `retry_failed`, a 'failed' one) is resumed; pass
+    `release_leased=False` when other workers may still hold its leases.
+    Runs without work items (e.g. an interrupted main.py run) are never
+    resumed, since their finished prompts are unknown.
+
+    Otherwise a new run is started. When an earlier completed run read the
+    same content under another name, or an earlier revision of this label,
+    the answers for chunks on unchanged pages are carried forward from it,
+    so only changed pages are sent to the LLM.
+
+    Either way the run's work items are enqueued before it is returned, so
+    its job progress shows whether anything is left to send.
+    """
+    section_chunks, _ = select_chunks(retriever, policy=policy)
+    run_id = store.find_run(pdf_path.name, model_name, status="running", content_hash=content_hash, with_jobs=True)
+    if run_id is None and retry_failed:
+        run_id = store.find_run(pdf_path.name, model_name, status="failed", content_hash=content_hash, with_jobs=True)
+    if run_id:
+        store.release_jobs(run_id, failed=retry_failed, leased=release_leased)
+        store.reopen_run(run_id)
+        console.print(f"  - Resuming run {run_id} ({format_progress(store.job_progress(run_id))})")
+    else:
+        run_id = _start_revision(store, pdf_path, model_name, chunks, section_chunks, content_hash)
+    store.enqueue_jobs(run_id, [(title, c.chunk_id) for title, cs in section_chunks.items() for c in cs])
+    return run_id
+
+
+def _start_revision(
+        store: AuditStore,
+        pdf_path: Path,
+        model_name: str,
+        chunks: List[DocumentChunk],
+        section_chunks: Dict[str, List[DocumentChunk]],
+        content_hash: str
+    ) -> str:
+    """Starts a run, carrying forward what it can from its parent run (see open_run)."""
+    parent_run_id = store.find_parent_run(pdf_path.name, model_name, content_hash)
+    run_id = store.start_run(
+        filename=pdf_path.name, model_name=model_name, seed=Config.SEED,
+        content_hash=content_hash, parent_run_id=parent_run_id
+    )
+    store.record_chunks(run_id, chunks)
+    if parent_run_id:
+        carried, changed = carry_forward(store, run_id, parent_run_id, chunks, section_chunks)
+        pages = len({chunk.page_number for chunk in chunks})
+        console.print(f"  - Revision of run {parent_run_id}: {len(changed)} of {pages} pages changed, {carried} items carried forward")
+    return run_id
+
+
 def process_one_file(
         pdf_path: Path,
         model_name: str,
-        store: AuditStore
-    ):
-    """Process a single PDF file for fact extraction."""
+        store: AuditStore,
+        cache: Optional[ResponseCache] = None,
+        max_concurrency: int = Config.MAX_CONCURRENT_REQUESTS,
+        grouped: bool = Config.GROUPED_EXTRACTION,
+        chunks: Optional[List[DocumentChunk]] = None,
+        models: Optional[List[str]] = None,
+        policy: Optional[ExtractionPolicy] = None,
+        retry_failed: bool = False,
+        content_hash: Optional[str] = None
+    ) -> Optional[str]:
+    """
+    Process a single PDF file for fact extraction.
+    Pass `chunks` when the file has already been ingested, and `models` to
+    run a model cascade (recorded on the run under `model_name`).
+
+    Work is tracked per (section, chunk) in the jobs table. A run left
+    'running' by an interrupted batch is resumed, sending only its
+    unfinished items; with `retry_failed`, items of a 'failed' run that ran
+    out of attempts get a fresh set. Runs are matched on the file's
+    `content_hash` (computed when not given), so a revised label is
+    processed again, reusing the answers for its unchanged pages (see
+    open_run). Returns the run's final status, or None when the file was
+    skipped.
+    """
 
     # Check if already done
-    conn = store._get_conn()
-    cursor = conn.cursor()
-    cursor.execute(
-        "SELECT run_id FROM runs WHERE filename = ? AND model_name = ?", 
-        (pdf_path.name, model_name)
-    )
-    existing = cursor.fetchone()
-    conn.close()
-    
+    content_hash = content_hash or file_content_hash(pdf_path)
+    existing = find_finished_run(store, pdf_path.name, model_name, retry_failed, content_hash)
     if existing:
-        console.print(f"[dim]Skipping {pdf_path.name} (Already processed in run {existing[0]})[/dim]")
-        return
+        console.print(f"[dim]Skipping {pdf_path.name} (Already processed in run {existing})[/dim]")
+        return None
 
     # Ingest
     console.print(f"[bold blue]Processing {pdf_path.name}...[/bold blue]")
-    try:
-        chunks = ingest_pdf(pdf_path)
-    except Exception as e:
-        console.print(f"[red]Failed to ingest {pdf_path.name}: {e}[/red]")
-        return
+    if chunks is None:
+        try:
+            chunks = ingest_pdf(pdf_path, content_hash=content_hash)
+        except Exception as e:
+            console.print(f"[red]Failed to ingest {pdf_path.name}: {e}[/red]")
+            return None
 
     # Setup agent
     retriever = KeywordRetriever(chunks)
-    run_id = store.start_run(filename=pdf_path.name, model_name=model_name)
-    agent = ExtractionAgent(model_name=model_name, store=store, run_id=run_id)
+    # Single worker: leases still held from an interrupted batch are stale
+    run_id = open_run(store, pdf_path, model_name, chunks, retriever, content_hash, policy, retry_failed)
+    queue = JobQueue(store, run_id)
+    agent = ExtractionAgent(
+        model_name=model_name,
+        store=store,
+        run_id=run_id,
+        max_concurrency=max_concurrency,
+        cache=cache,
+        models=models,
+        quote_index=QuoteIndex.from_chunks(chunks) if Config.QUOTE_INDEX_ENABLED else None
+    )
     
+    # Near zero when keep-alive held the model loaded since the last file.
+    # Skipped when every item was carried forward from an earlier revision.
+    if Config.LLM_WARMUP and not queue.is_finished():
+        warmup = agent.warm_up()
+        store.log_warmup(run_id, warmup)
+        console.print(f"  - Model warm-up: {warmup:.1f}s")
+
     # Extract (Silent Mode - no huge printouts)
     start_time = time.perf_counter()
-    
-    for title, question in Config.TARGET_SECTIONS.items():
-        section_start = time.perf_counter()
-        relevant_chunks = retriever.retrieve(title + " " + question, top_k=3)
-        
-        for chunk in relevant_chunks:
-            agent.extract_fact(chunk, question)
-            
-        duration = time.perf_counter() - section_start
-        store.log_section_stats(run_id, title, duration, len(relevant_chunks))
+
+    def report_section(title, duration, facts):
         console.print(f"  - {title}: {duration:.1f}s")
 
+    with Heartbeat(store, queue.owner):
+        while True:
+            run_extraction(agent, retriever, grouped=grouped, on_section=report_section, policy=policy, queue=queue)
+            store.flush()
+            if queue.is_finished():
+                break
+            # Failed calls wait out their backoff before the next pass
+            wait = max(0.0, (queue.next_due() or 0) - time.time())
+            console.print(f"  - Retrying in {wait:.0f}s ({format_progress(queue.progress())})")
+            time.sleep(wait)
+
+    progress = queue.progress()
+    status = "failed" if progress.get("failed") else "completed"
+    store.finish_run(run_id, status)
+
     total_time = time.perf_counter() - start_time
-    console.print(f"✅ Finished {pdf_path.name} in {total_time:.1f}s\n")
+    if status == "failed":
+        console.print(f"[yellow]⚠️ Finished {pdf_path.name} with failed items in {total_time:.1f}s ({format_progress(progress)})[/yellow]\n")
+    else:
+        console.print(f"✅ Finished {pdf_path.name} in {total_time:.1f}s ({format_progress(progress)})\n")
+    return status
 
-def batch_process(folder_path: Path, model_name: str):
-    """Process all PDF files in a given folder."""
+def batch_process(
+        folder_path: Path,
+        model_name: str,
+        max_concurrency: int = Config.MAX_CONCURRENT_REQUESTS,
+        grouped: bool = Config.GROUPED_EXTRACTION,
+        use_cache: bool = Config.LLM_CACHE_ENABLED,
+        ingest_workers: int = Config.INGEST_WORKERS,
+        chunking: str = Config.CHUNK_STRATEGY,
+        models: Optional[List[str]] = None,
+        policy: Optional[ExtractionPolicy] = None,
+        retry_failed: bool = False
+    ):
+    """Process all PDF files in a given folder, resuming any interrupted runs."""
     store = AuditStore()
+    cache = ResponseCache() if use_cache else None
     files = list(folder_path.glob("*.pdf"))
     
     if not files:
@@ -73,14 +221,75 @@ def batch_process(folder_path: Path, model_name: str):
         return
 
     console.print(f"Found {len(files)} PDFs. Starting Batch Job...")
-    
+
+    pending = []
+    hashes = {pdf_file: file_content_hash(pdf_file) for pdf_file in files}
     for pdf_file in files:
-        process_one_file(pdf_file, model_name, store)
+        existing = find_finished_run(store, pdf_file.name, model_name, retry_failed, hashes[pdf_file])
+        if existing:
+            console.print(f"[dim]Skipping {pdf_file.name} (Already processed in run {existing})[/dim]")
+        else:
+            pending.append(pdf_file)
+
+    # Files are parsed across processes ahead of extraction, so later labels
+    # are ready by the time the LLM finishes the current one.
+    statuses = []
+    content_hashes = [hashes[pdf_file] for pdf_file in pending]
+    for pdf_file, chunks, error in ingest_many(pending, workers=ingest_workers, strategy=chunking, content_hashes=content_hashes):
+        if error:
+            console.print(f"[red]Failed to ingest {pdf_file.name}: {error}[/red]")
+            continue
+        statuses.append(process_one_file(
+            pdf_file, model_name, store, cache, max_concurrency, grouped,
+            chunks=chunks, models=models, policy=policy, retry_failed=retry_failed,
+            content_hash=hashes[pdf_file]
+        ))
+
+    store.close()
+
+    console.print(f"Batch done: {statuses.count('completed')} completed, "
+                  f"{statuses.count('failed')} with failed items, {len(files) - len(pending)} skipped")
+    if statuses.count("failed"):
+        console.print("[dim]Rerun with --retry-failed to retry their failed items.[/dim]")
+
+    if cache:
+        stats = cache.stats()
+        console.print(f"Response cache: {stats['hits']} hits, {stats['misses']} misses")
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("folder", help="Folder containing PDFs")
     parser.add_argument("--model", default=Config.DEFAULT_MODEL, help="Model to use")
+    parser.add_argument("--concurrency", type=int, default=Config.MAX_CONCURRENT_REQUESTS, help="Max LLM calls in flight")
+    parser.add_argument("--grouped", action="store_true", default=Config.GROUPED_EXTRACTION, help="Ask all questions sharing a chunk in one prompt")
+    parser.add_argument("--no-cache", action="store_true", help="Always call the LLM, bypassing the response cache")
+    parser.add_argument("--ingest-workers", type=int, default=Config.INGEST_WORKERS, help="Processes used to parse PDFs")
+    parser.add_argument("--chunking", choices=STRATEGIES, default=Config.CHUNK_STRATEGY, help="How pages are split into prompt-sized chunks")
+    parser.add_argument("--cascade", nargs="+", default=list(Config.CASCADE_MODELS), metavar="MODEL", help="Models to escalate through, smallest first (overrides --model)")
+    parser.add_argument("--min-score", type=float, default=Config.MIN_RETRIEVAL_SCORE, help="Skip retrieved chunks below this BM25 score")
+    parser.add_argument("--stop-early", action="store_true", default=Config.STOP_ON_HIGH_CONFIDENCE, help="Stop a section after its first high-confidence fact")
+    parser.add_argument("--prefilter", action="store_true", default=Config.LEXICAL_PREFILTER, help="Only send chunks that mention one of the section's keywords")
+    parser.add_argument("--retry-failed", action="store_true", help="Resume runs with failed items and give those items a fresh set of attempts")
+    parser.add_argument("--workers", type=int, default=0, help="Worker processes sharing the job table (0 processes files one by one in this process)")
+    parser.add_argument("--hosts", nargs="+", metavar="URL", help="Ollama servers to spread the workers over, round-robin")
+    parser.add_argument("--join", action="store_true", help="Add workers to a batch already planned for this folder, e.g. from another host")
     args = parser.parse_args()
-    
-    batch_process(Path(args.folder), args.model)
\ No newline at end of file
+
+    policy = ExtractionPolicy(
+        min_score=args.min_score,
+        stop_on_high_confidence=args.stop_early,
+        prefilters=dict(Config.SECTION_KEYWORDS) if args.prefilter else {}
+    )
+
+    # A cascade run is recorded (and skip-checked) under its joined model list
+    model_name = ">".join(args.cascade) if args.cascade else args.model
+    if args.workers > 0:
+        from src.scripts.batch_workers import WorkerSettings, supervise
+        settings = WorkerSettings(
+            folder=Path(args.folder), model_name=model_name, models=args.cascade or None,
+            max_concurrency=args.concurrency, grouped=args.grouped, use_cache=not args.no_cache,
+            chunking=args.chunking, policy=policy
+        )
+        supervise(Path(args.folder), settings, args.workers, args.hosts, args.ingest_workers, args.retry_failed, args.join)
+    else:
+        batch_process(Path(args.folder), model_name, args.concurrency, args.grouped, not args.no_cache, args.ingest_workers, args.chunking, args.cascade or None, policy, args.retry_failed)
\ No newline at end of file
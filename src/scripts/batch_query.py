@@ -0,0 +1,84 @@
+import sys
+import json
+import time
+import argparse
+from itertools import islice
+from typing import Iterator, List, TextIO
+from rich.console import Console
+from src.config import Config
+from src.infra.knowledge_base import get_embedder, search_many
+from src.infra.vector_store import BACKENDS, open_store
+
+# Progress goes to stderr so stdout stays pure JSONL
+console = Console(stderr=True)
+
+def read_queries(stream: TextIO) -> Iterator[dict]:
+    """
+    Accepts JSONL objects ({"id": ..., "query": ...}) or plain one-query-per-line
+    text. Queries without an id get their 1-based line number. JSON lines
+    without a "query" are reported and skipped.
+    """
+    for line_number, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith("{"):
+            try:
+                item = json.loads(line)
+                query = item["query"]
+            except (ValueError, KeyError, TypeError):
+                console.print(f"[yellow]⚠️ Skipping line {line_number}: expected a JSON object with a \"query\" key[/yellow]")
+                continue
+            yield {"id": item.get("id", line_number), "query": query}
+        else:
+            yield {"id": line_number, "query": line}
+
+def _batches(items: Iterator[dict], size: int) -> Iterator[List[dict]]:
+    while True:
+        batch = list(islice(items, size))
+        if not batch:
+            return
+        yield batch
+
+def run_batch_queries(
+        source: TextIO,
+        sink: TextIO,
+        n_results: int = 3,
+        batch_size: int = Config.EMBED_BATCH_SIZE,
+        backend: str = Config.VECTOR_BACKEND
+    ) -> int:
+    """Streams ranked results for every query in `source` to `sink` as JSONL."""
+    embed = get_embedder()
+    store = open_store(backend)
+
+    count = 0
+    start = time.perf_counter()
+    for batch in _batches(read_queries(source), batch_size):
+        all_hits = search_many(store, [item["query"] for item in batch], n_results, embedder=embed)
+        for item, hits in zip(batch, all_hits):
+            sink.write(json.dumps({"id": item["id"], "query": item["query"], "results": hits}) + "\n")
+        sink.flush()
+        count += len(batch)
+
+    elapsed = time.perf_counter() - start
+    console.print(f"✅ Answered {count} queries in {elapsed:.2f}s")
+    return count
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run many semantic queries and emit JSONL results")
+    parser.add_argument("input", nargs="?", help="JSONL or text file of queries (default: stdin)")
+    parser.add_argument("-o", "--output", help="Write results here instead of stdout")
+    parser.add_argument("-n", "--n-results", type=int, default=3, help="Results per query")
+    parser.add_argument("--batch-size", type=int, default=Config.EMBED_BATCH_SIZE, help="Queries embedded per pass")
+    parser.add_argument("--backend", choices=BACKENDS, default=Config.VECTOR_BACKEND, help="Vector store to search")
+    args = parser.parse_args()
+
+    source = open(args.input, encoding="utf-8") if args.input else sys.stdin
+    sink = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        run_batch_queries(source, sink, args.n_results, args.batch_size, args.backend)
+    finally:
+        if args.input:
+            source.close()
+        if args.output:
+            sink.close()
@@ -0,0 +1,214 @@
+import time
+import multiprocessing
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+from rich.console import Console
+from rich.table import Table
+
+from src.infra.ingest import file_content_hash, ingest_many, ingest_pdf
+from src.infra.retriever import KeywordRetriever
+from src.infra.quote_index import QuoteIndex
+from src.infra.llm import LLMClient, get_client
+from src.infra.jobs import Heartbeat, JobQueue, OPEN_STATUSES, default_owner
+from src.infra.store import AuditStore
+from src.infra.cache import ResponseCache
+from src.core.agent import ExtractionAgent
+from src.core.pipeline import run_extraction
+from src.core.policy import ExtractionPolicy
+from src.scripts.batch import find_finished_run, format_progress, open_run
+
+from src.config import Config
+
+console = Console()
+
+
+@dataclass
+class WorkerSettings:
+    """Everything a worker process needs to rebuild the batch's agent; picklable for spawn."""
+    folder: Path
+    model_name: str
+    models: Optional[List[str]] = None
+    max_concurrency: int = Config.MAX_CONCURRENT_REQUESTS
+    grouped: bool = Config.GROUPED_EXTRACTION
+    use_cache: bool = Config.LLM_CACHE_ENABLED
+    chunking: str = Config.CHUNK_STRATEGY
+    policy: Optional[ExtractionPolicy] = None
+    host: Optional[str] = None  # Ollama server for this worker; None uses Config.OLLAMA_HOST
+
+
+def plan_runs(
+        files: Sequence[Path],
+        settings: WorkerSettings,
+        store: AuditStore,
+        ingest_workers: int = Config.INGEST_WORKERS,
+        retry_failed: bool = False
+    ) -> List[str]:
+    """
+    Makes sure every unfinished file has a run with its work items enqueued
+    (see open_run). Returns the run_ids the workers should drain. Parsing
+    fills the ingest cache, so workers reload each file cheaply.
+    """
+    run_ids = []
+    hashes = {f: file_content_hash(f) for f in files}
+    pending = [f for f in files if not find_finished_run(store, f.name, settings.model_name, retry_failed, hashes[f])]
+    content_hashes = [hashes[f] for f in pending]
+    for pdf_file, chunks, error in ingest_many(pending, workers=ingest_workers, strategy=settings.chunking, content_hashes=content_hashes):
+        if error:
+            console.print(f"[red]Failed to ingest {pdf_file.name}: {error}[/red]")
+            continue
+
+        # Leases are left alone: workers on other hosts may still hold them
+        run_ids.append(open_run(
+            store, pdf_file, settings.model_name, chunks, KeywordRetriever(chunks), hashes[pdf_file],
+            settings.policy, retry_failed, release_leased=False
+        ))
+    return run_ids
+
+
+def find_open_runs(files: Sequence[Path], model_name: str, store: AuditStore) -> List[str]:
+    """The 'running' runs of these files, for workers joining a batch planned elsewhere."""
+    runs = (store.find_run(f.name, model_name, status="running", content_hash=file_content_hash(f), with_jobs=True) for f in files)
+    return [run_id for run_id in runs if run_id]
+
+
+def finish_runs(store: AuditStore, run_ids: Sequence[str]) -> List[str]:
+    """Records the final status of every run whose items are all closed. Returns those runs."""
+    finished = []
+    for run_id in run_ids:
+        progress = store.job_progress(run_id)
+        if not any(progress.get(status) for status in OPEN_STATUSES):
+            store.finish_run(run_id, "failed" if progress.get("failed") else "completed")
+            finished.append(run_id)
+    return finished
+
+
+def run_worker(settings: WorkerSettings, run_ids: List[str]):
+    """
+    Worker process: leases all due items of one run at a time, sends them,
+    and repeats until no item of `run_ids` is open. Leases are renewed by a
+    heartbeat; items leased by a worker that died are reclaimed once their
+    lease runs out. Each worker has its own store connection and buffers its
+    audit rows, so workers only contend for the short lease transactions.
+    """
+    owner = default_owner()
+    store = AuditStore()
+    cache = ResponseCache() if settings.use_cache else None
+    client = LLMClient(host=settings.host) if settings.host else get_client()
+    models = settings.models or [settings.model_name]
+    # Cold start of this worker's server, logged on every run it works on
+    warmup = sum(client.warm_up(model) for model in models) if Config.LLM_WARMUP else None
+
+    documents: Dict[str, tuple] = {}
+    with Heartbeat(store, owner):
+        while True:
+            run_id, leased = store.lease_next_run(run_ids, owner, Config.JOB_LEASE_SECONDS)
+            if run_id is None:
+                jobs = store.batch_progress(run_ids)["jobs"]
+                if not any(jobs.get(status) for status in OPEN_STATUSES):
+                    break
+                # Items are backing off or held by other workers
+                time.sleep(Config.WORKER_POLL_SECONDS)
+                continue
+
+            if run_id not in documents:
+                filename, content_hash = store.run_source(run_id)
+                chunks = ingest_pdf(settings.folder / filename, workers=1, strategy=settings.chunking, content_hash=content_hash)
+                quote_index = QuoteIndex.from_chunks(chunks) if Config.QUOTE_INDEX_ENABLED else None
+                documents[run_id] = (KeywordRetriever(chunks), quote_index)
+                if warmup is not None:
+                    store.log_warmup(run_id, warmup)
+            retriever, quote_index = documents[run_id]
+
+            agent = ExtractionAgent(
+                model_name=settings.model_name,
+                store=store,
+                run_id=run_id,
+                max_concurrency=settings.max_concurrency,
+                cache=cache,
+                models=settings.models,
+                client=client,
+                quote_index=quote_index
+            )
+            queue = JobQueue(store, run_id, owner=owner)
+            queue.adopt(leased)
+            run_extraction(agent, retriever, grouped=settings.grouped, policy=settings.policy, queue=queue)
+            store.flush()
+            if finish_runs(store, [run_id]):
+                # Finished for every worker, so its document is not needed again
+                del documents[run_id]
+    store.close()
+
+
+def render_throughput(progress: dict, baseline: dict, elapsed: float) -> Table:
+    done = progress["jobs"].get("done", 0) - baseline["jobs"].get("done", 0)
+    prompts = progress["prompts"] - baseline["prompts"]
+    tokens = progress["eval_tokens"] - baseline["eval_tokens"]
+    rate = lambda n: f"{n / elapsed:.2f}/s" if elapsed > 0 else "-"
+
+    table = Table(title=f"Batch throughput after {elapsed:.0f}s ({format_progress(progress['jobs'])})")
+    table.add_column("Worker", style="cyan")
+    table.add_column("Items done", justify="right")
+    for owner, count in sorted(progress["workers"].items(), key=lambda item: str(item[0])):
+        table.add_row(str(owner), str(count))
+    table.add_section()
+    table.add_row("[bold]Items[/bold]", f"{done} ({rate(done)})")
+    table.add_row("[bold]LLM calls[/bold]", f"{prompts} ({rate(prompts)})")
+    table.add_row("[bold]Tokens generated[/bold]", f"{tokens} ({rate(tokens)})")
+    return table
+
+
+def supervise(
+        folder_path: Path,
+        settings: WorkerSettings,
+        workers: int,
+        hosts: Optional[Sequence[str]] = None,
+        ingest_workers: int = Config.INGEST_WORKERS,
+        retry_failed: bool = False,
+        join: bool = False,
+        report_seconds: float = 30.0
+    ) -> dict:
+    """
+    Runs a batch across `workers` local processes, assigned round-robin to
+    `hosts` (Ollama servers). Unless joining a batch planned on another
+    host, the folder is planned first (see plan_runs). Prints aggregate
+    throughput every `report_seconds` and once all workers have exited, then
+    returns the final progress.
+    """
+    files = sorted(folder_path.glob("*.pdf"))
+    store = AuditStore()
+    if join:
+        run_ids = find_open_runs(files, settings.model_name, store)
+    else:
+        run_ids = plan_runs(files, settings, store, ingest_workers, retry_failed)
+    store.flush()
+    console.print(f"Found {len(files)} PDFs, {len(run_ids)} with open work. Starting {workers} workers...")
+
+    baseline = store.batch_progress(run_ids)
+    context = multiprocessing.get_context("spawn")
+    processes = []
+    for index in range(workers):
+        host = hosts[index % len(hosts)] if hosts else None
+        process = context.Process(
+            target=run_worker, args=(replace(settings, host=host), run_ids), name=f"batch-worker-{index}"
+        )
+        process.start()
+        processes.append(process)
+
+    start = time.perf_counter()
+    while any(process.is_alive() for process in processes):
+        deadline = time.perf_counter() + report_seconds
+        for process in processes:
+            process.join(timeout=max(0.0, deadline - time.perf_counter()))
+        if any(process.is_alive() for process in processes):
+            console.print(render_throughput(store.batch_progress(run_ids), baseline, time.perf_counter() - start))
+
+    crashed = [p.name for p in processes if p.exitcode != 0]
+    if crashed:
+        console.print(f"[red]Workers exited with errors: {', '.join(crashed)}. Rerun to finish their items.[/red]")
+
+    finish_runs(store, run_ids)
+    progress = store.batch_progress(run_ids)
+    console.print(render_throughput(progress, baseline, time.perf_counter() - start))
+    store.close()
+    return progress
@@ -0,0 +1,323 @@
+import sys
+import json
+import contextlib
+import time
+import zlib
+import random
+import platform
+import argparse
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+import numpy as np
+from rich.console import Console
+from rich.table import Table
+
+from src.config import Config
+from src.core.agent import ExtractionAgent
+from src.core.pipeline import run_extraction
+from src.core.verifier import QuoteVerifier
+from src.infra.ingest import ingest_pdf
+from src.infra.llm import LLMClient
+from src.infra.quote_index import QuoteIndex
+from src.infra.retriever import KeywordRetriever
+from src.infra.store import AuditStore
+from src.infra.vector_store import NumpyVectorStore
+from src.scripts import build_knowledge_base, query_agent
+from src.scripts.mock_ollama import default_response
+from src.scripts.synthetic_labels import write_corpus
+
+# Tables go to stderr so stdout can carry the JSON results
+console = Console(stderr=True)
+
+STAGES = (
+    "ingest_pdf", "retriever_index", "retrieve", "verify", "quote_index_build", "quote_locate",
+    "audit_writes", "extract_stub_llm", "build_vector_index", "search_knowledge_base"
+)
+DEFAULT_THRESHOLD = 0.25  # fail when a stage is >25% slower per operation
+
+SEARCH_QUERIES = [
+    "What is the recommended dose?",
+    "Which patients should not take this drug?",
+    "Find any mention of hepatotoxicity or liver risks.",
+    "What cancers is it indicated for?",
+]
+
+
+class StubLLMClient(LLMClient):
+    """Answers every prompt instantly with the mock server's schema-valid response."""
+
+    calls = 0
+
+    def chat(self, model, messages, format=None, options=None, stream=False):
+        self.calls += 1
+        content = json.dumps(default_response(messages[-1]["content"]))
+        final = {"message": {"role": "assistant", "content": content}, "done": True, "eval_count": 1}
+        return iter([final]) if stream else final
+
+    def warm_up(self, model: str) -> float:
+        return 0.0
+
+
+class HashingEmbedder:
+    """Deterministic bag-of-words feature hashing, so indexing runs without a model."""
+
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+
+    def __call__(self, texts: List[str]) -> List[np.ndarray]:
+        vectors = []
+        for text in texts:
+            vector = np.zeros(self.dim, dtype=np.float32)
+            for token in text.lower().split():
+                vector[zlib.crc32(token.encode()) % self.dim] += 1.0
+            vectors.append(vector)
+        return vectors
+
+
+def _stage(seconds: float, operations: int) -> dict:
+    return {
+        "seconds": round(seconds, 6),
+        "operations": operations,
+        "per_op_ms": round(seconds * 1000 / max(1, operations), 6),
+        "ops_per_sec": round(operations / seconds, 2) if seconds > 0 else None,
+    }
+
+
+def _timed(fn: Callable[[], int]) -> dict:
+    start = time.perf_counter()
+    operations = fn()
+    return _stage(time.perf_counter() - start, operations)
+
+
+def run_stages(paths: List[Path], workdir: Path, seed: int = 0, stages=STAGES) -> Dict[str, dict]:
+    """
+    Runs each benchmark stage once over the corpus in `paths`, writing all
+    state under `workdir`. Later stages consume earlier outputs (chunks,
+    extracted facts), so they always run in order; `stages` only filters
+    what is reported.
+    """
+    rng = random.Random(seed)
+    results = {}
+    documents = {}
+
+    def ingest():
+        for path in paths:
+            documents[path] = ingest_pdf(path, workers=1, use_cache=False)
+        return sum(len(chunks) for chunks in documents.values())
+    results["ingest_pdf"] = _timed(ingest)
+
+    retrievers = {}
+
+    def index():
+        for path, chunks in documents.items():
+            retrievers[path] = KeywordRetriever(chunks)
+        return len(retrievers)
+    results["retriever_index"] = _timed(index)
+
+    queries = [f"{title} {question}" for title, question in Config.TARGET_SECTIONS.items()]
+
+    def retrieve():
+        count = 0
+        for retriever in retrievers.values():
+            for _ in range(10):
+                for query in queries:
+                    retriever.retrieve(query, top_k=3)
+                    count += 1
+        return count
+    results["retrieve"] = _timed(retrieve)
+
+    # Exact quotes, lightly corrupted quotes and hallucinated ones
+    verifier = QuoteVerifier(threshold=Config.VERIFICATION_THRESHOLD)
+    cases = []
+    for chunks in documents.values():
+        for chunk in chunks:
+            sentences = [s.strip() for s in chunk.text_content.split(".") if len(s.split()) > 4]
+            if not sentences:
+                continue
+            quote = rng.choice(sentences)
+            cases.append((chunk.text_content, quote))
+            cases.append((chunk.text_content, quote.replace("the", "teh", 1)))
+            cases.append((chunk.text_content, "The drug cured every patient in the trial"))
+
+    def verify():
+        for source, quote in cases:
+            verifier.verify(source, quote)
+        return len(cases)
+    results["verify"] = _timed(verify)
+
+    quote_indexes = {}
+
+    def build_quote_indexes():
+        for path, chunks in documents.items():
+            quote_indexes[path] = QuoteIndex.from_chunks(chunks)
+        return len(quote_indexes)
+    results["quote_index_build"] = _timed(build_quote_indexes)
+
+    def locate():
+        count = 0
+        for path, index in quote_indexes.items():
+            for chunk in documents[path]:
+                for quote in (chunk.text_content[:120], "The drug cured every patient in the trial"):
+                    index.locate(quote)
+                    count += 1
+        return count
+    results["quote_locate"] = _timed(locate)
+
+    def audit_writes():
+        store = AuditStore(workdir / "audit_writes.db")
+        run_id = store.start_run("bench.pdf", "bench", Config.SEED)
+        rows = 0
+        for chunks in documents.values():
+            for chunk in chunks:
+                store.log_interaction(run_id, chunk.chunk_id, "q", "prompt", "{}", True, 0.1)
+                store.log_section_stats(run_id, "Dosage", 0.1, 1)
+                rows += 2
+        store.close()
+        return rows
+    results["audit_writes"] = _timed(audit_writes)
+
+    db_path = workdir / "extract.db"
+
+    def extract():
+        store = AuditStore(db_path)
+        client = StubLLMClient()
+        for path, retriever in retrievers.items():
+            run_id = store.start_run(path.name, "stub", Config.SEED)
+            agent = ExtractionAgent(model_name="stub", store=store, run_id=run_id, client=client, quote_index=quote_indexes[path])
+            run_extraction(agent, retriever)
+        store.close()
+        return client.calls
+    results["extract_stub_llm"] = _timed(extract)
+
+    vector_store = NumpyVectorStore(path=workdir / "numpy_store")
+    embedder = HashingEmbedder()
+
+    def build():
+        build_knowledge_base.build_vector_index(rebuild=True, db_path=db_path, store=vector_store, embedder=embedder)
+        return vector_store.count()
+    results["build_vector_index"] = _timed(build)
+
+    def search():
+        for _ in range(5):
+            for query in SEARCH_QUERIES:
+                query_agent.search_knowledge_base(query, n_results=3, store=vector_store, embedder=embedder)
+        return 5 * len(SEARCH_QUERIES)
+    results["search_knowledge_base"] = _timed(search)
+
+    return {name: results[name] for name in stages}
+
+
+def run_benchmark(documents: int, pages: int, repeat: int = 3, seed: int = 0, stages=STAGES) -> dict:
+    """Generates a synthetic corpus and keeps each stage's best of `repeat` runs."""
+    best: Dict[str, dict] = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        paths = write_corpus(tmp / "corpus", documents, pages, seed)
+
+        # Stage output is rendered by the scripts themselves; keep it quiet,
+        # and keep stray prints off stdout, which carries the JSON results
+        quiet = (build_knowledge_base.console.quiet, query_agent.console.quiet)
+        build_knowledge_base.console.quiet = query_agent.console.quiet = True
+        try:
+            with contextlib.redirect_stdout(sys.stderr):
+                for attempt in range(repeat):
+                    workdir = tmp / f"run_{attempt}"
+                    workdir.mkdir()
+                    for name, result in run_stages(paths, workdir, seed, stages).items():
+                        if name not in best or result["seconds"] < best[name]["seconds"]:
+                            best[name] = result
+        finally:
+            build_knowledge_base.console.quiet, query_agent.console.quiet = quiet
+
+    return {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "documents": documents,
+            "pages": pages,
+            "repeat": repeat,
+            "seed": seed,
+        },
+        "stages": best,
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float = DEFAULT_THRESHOLD) -> List[dict]:
+    """
+    Compares per-operation time for every stage present in both runs.
+    A stage regresses when it is slower than its baseline by more than its
+    threshold (the baseline's "thresholds" entry for it, else `threshold`).
+    """
+    rows = []
+    limits = baseline.get("thresholds", {})
+    for name, current in results["stages"].items():
+        reference = baseline.get("stages", {}).get(name)
+        if not reference:
+            continue
+        limit = limits.get(name, threshold)
+        ratio = current["per_op_ms"] / reference["per_op_ms"] if reference["per_op_ms"] else 1.0
+        rows.append({
+            "stage": name,
+            "baseline_ms": reference["per_op_ms"],
+            "current_ms": current["per_op_ms"],
+            "ratio": round(ratio, 3),
+            "threshold": limit,
+            "regressed": ratio > 1 + limit,
+        })
+    return rows
+
+
+def render(results: dict, comparison: Optional[List[dict]] = None):
+    by_stage = {row["stage"]: row for row in comparison or []}
+    table = Table(title=f"Benchmark ({results['meta']['documents']} labels x {results['meta']['pages']} pages)")
+    table.add_column("Stage", style="cyan")
+    table.add_column("Ops", justify="right")
+    table.add_column("Total (s)", justify="right")
+    table.add_column("ms/op", justify="right")
+    table.add_column("vs baseline", justify="right")
+    for name, stage in results["stages"].items():
+        row = by_stage.get(name)
+        delta = "-"
+        if row:
+            color = "red" if row["regressed"] else "green"
+            delta = f"[{color}]{(row['ratio'] - 1) * 100:+.1f}%[/{color}]"
+        table.add_row(name, str(stage["operations"]), f"{stage['seconds']:.3f}", f"{stage['per_op_ms']:.3f}", delta)
+    console.print(table)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time each pipeline stage on a synthetic label corpus (LLM stubbed)")
+    parser.add_argument("--documents", type=int, default=5, help="Synthetic labels to generate")
+    parser.add_argument("--pages", type=int, default=30, help="Pages per label")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per stage; the fastest is kept")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES), help="Stages to report")
+    parser.add_argument("--output", help="Write results JSON here (default: stdout)")
+    parser.add_argument("--baseline", help="Baseline results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Allowed slowdown per op, e.g. 0.25")
+    parser.add_argument("--save-baseline", help="Also write the results as a new baseline here")
+    args = parser.parse_args()
+
+    results = run_benchmark(args.documents, args.pages, args.repeat, args.seed, args.stages)
+
+    comparison = None
+    if args.baseline:
+        comparison = compare(results, json.loads(Path(args.baseline).read_text()), args.threshold)
+        results["comparison"] = comparison
+    render(results, comparison)
+
+    payload = json.dumps(results, indent=2)
+    if args.output:
+        Path(args.output).write_text(payload)
+    else:
+        print(payload)
+    if args.save_baseline:
+        Path(args.save_baseline).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.save_baseline).write_text(json.dumps({k: results[k] for k in ("meta", "stages")}, indent=2))
+
+    regressed = [row["stage"] for row in comparison or [] if row["regressed"]]
+    if regressed:
+        console.print(f"[bold red]Regressions: {', '.join(regressed)}[/bold red]")
+        sys.exit(1)
@@ -1,33 +1,66 @@
 import sqlite3
-import chromadb
-from chromadb.utils import embedding_functions
+import argparse
+from pathlib import Path
+from typing import Optional
 from rich.console import Console
 from rich.progress import Progress, SpinnerColumn, BarColumn, TextColumn, TimeRemainingColumn
 from src.config import Config
+from src.infra.knowledge_base import fact_document, get_embedder
+from src.infra.vector_store import BACKENDS, VectorStore, open_store
 
 console = Console()
 
-def build_vector_index():
+FACTS_QUERY = """
+    SELECT f.id, f.attribute, f.value, f.citation_quote, f.confidence, f.run_id, r.filename
+    FROM facts f
+    LEFT JOIN runs r ON r.run_id = f.run_id
+    WHERE f.id > ? AND f.id <= ? AND LOWER(f.confidence) != 'low'
+    ORDER BY f.id
+"""
+
+def build_vector_index(
+        rebuild: bool = False,
+        batch_size: int = Config.EMBED_BATCH_SIZE,
+        backend: str = Config.VECTOR_BACKEND,
+        db_path: Path = Config.DB_PATH,
+        store: Optional[VectorStore] = None,
+        embedder=None
+    ):
+    """
+    Embeds facts added since the last build into the vector store.
+    `store` and `embedder` default to the configured backend and model.
+    """
     console.rule("[bold cyan]Week 3: Vector Knowledge Base Builder[/bold cyan]")
-    
-    # 1. Connect to SQLite
-    conn = sqlite3.connect(Config.DB_PATH)
+
+    store = store or open_store(backend, create=True)
+    if rebuild:
+        store.reset()
+
+    # 1. Connect to SQLite and find facts added since the last build
+    last_indexed = store.load_watermark()
+    conn = sqlite3.connect(db_path)
     cursor = conn.cursor()
 
-    cursor.execute("SELECT id, attribute, value, citation_quote, confidence FROM facts WHERE confidence != 'LOW'")
-    rows = cursor.fetchall()
-    conn.close()
-    
-    if not rows:
-        console.print("[yellow]⚠️ No high-confidence facts found in SQLite. Run extraction first.[/yellow]")
+    high_water = cursor.execute("SELECT COALESCE(MAX(id), 0) FROM facts").fetchone()[0]
+    total = cursor.execute(
+        "SELECT COUNT(*) FROM facts WHERE id > ? AND id <= ? AND LOWER(confidence) != 'low'",
+        (last_indexed, high_water)
+    ).fetchone()[0]
+
+    if not total:
+        conn.close()
+        store.save_watermark(max(last_indexed, high_water))
+        if last_indexed:
+            console.print(f"[green]✅ Knowledge base is up to date (facts indexed through id {last_indexed}).[/green]")
+        else:
+            console.print("[yellow]⚠️ No high-confidence facts found in SQLite. Run extraction first.[/yellow]")
         return
 
-    # 2. Setup Vector Store
-    chroma_client = chromadb.PersistentClient(path="./data/vector_store")
-    ef = embedding_functions.SentenceTransformerEmbeddingFunction(model_name="all-MiniLM-L6-v2")
-    collection = chroma_client.get_or_create_collection(name="fda_facts", embedding_function=ef)
+    # 2. Setup Embedder (the vector store was opened above)
+    embed = embedder or get_embedder()
 
-    # 3. Vectorize with Rich Progress
+    # 3. Embed and upsert in batches with Rich Progress
+    cursor.execute(FACTS_QUERY, (last_indexed, high_water))
     with Progress(
         SpinnerColumn(),
         TextColumn("[progress.description]{task.description}"),
@@ -37,20 +70,46 @@ def build_vector_index():
         console=console
     ) as progress:
         
-        task = progress.add_task("[cyan]Indexing facts...", total=len(rows))
+        task = progress.add_task("[cyan]Indexing facts...", total=total)
         
-        for row in rows:
-            fact_id, attr, val, quote, conf = row
-            doc_text = f"Attribute: {attr}. Value: {val}. Context: {quote}"
-            
-            collection.add(
-                documents=[doc_text],
-                metadatas=[{"attribute": attr, "confidence": conf}],
-                ids=[str(fact_id)]
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+
+            ids, documents, metadatas = [], [], []
+            for fact_id, attr, val, quote, conf, run_id, filename in rows:
+                ids.append(str(fact_id))
+                documents.append(fact_document(attr, val, quote))
+                metadatas.append({
+                    "attribute": attr,
+                    "confidence": conf,
+                    "fact_id": fact_id,
+                    "run_id": run_id or "",
+                    "filename": filename or ""
+                })
+
+            # One forward pass per batch (cached texts skip it entirely);
+            # upsert makes re-runs idempotent
+            store.upsert(
+                ids=ids,
+                embeddings=embed(documents),
+                documents=documents,
+                metadatas=metadatas
             )
-            progress.advance(task)
+            store.save_watermark(rows[-1][0])
+            progress.advance(task, len(rows))
 
-    console.print(f"\n[bold green]✅ Successfully indexed {len(rows)} facts into ChromaDB.[/bold green]")
+    conn.close()
+    store.save_watermark(high_water)
+
+    console.print(f"\n[bold green]✅ Successfully indexed {total} new facts into the {type(store).__name__}.[/bold green]")
 
 if __name__ == "__main__":
-    build_vector_index()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Index verified facts into the vector store")
+    parser.add_argument("--rebuild", action="store_true", help="Drop the index and re-index every fact")
+    parser.add_argument("--batch-size", type=int, default=Config.EMBED_BATCH_SIZE, help="Facts embedded per batch")
+    parser.add_argument("--backend", choices=BACKENDS, default=Config.VECTOR_BACKEND, help="Vector store to index into")
+    args = parser.parse_args()
+
+    build_vector_index(rebuild=args.rebuild, batch_size=args.batch_size, backend=args.backend)
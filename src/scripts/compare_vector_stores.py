@@ -0,0 +1,65 @@
+import sys
+import time
+import argparse
+from rich.console import Console
+from rich.table import Table
+from src.infra.knowledge_base import get_embedder
+from src.infra.vector_store import open_store
+from src.scripts.batch_query import read_queries
+
+console = Console()
+
+def _timed_query(store, embeddings, n_results):
+    start = time.perf_counter()
+    results = store.query(query_embeddings=embeddings, n_results=n_results)
+    return results, time.perf_counter() - start
+
+def compare(queries, n_results: int = 5):
+    """
+    Runs the same embedded queries against Chroma and the NumPy store and
+    reports recall@k of the NumPy results against Chroma's, plus open and
+    query latency for each backend.
+    """
+    embed = get_embedder()
+    embeddings = embed(queries)
+
+    rows = {}
+    for backend in ("chroma", "numpy"):
+        start = time.perf_counter()
+        store = open_store(backend)
+        store.count()  # forces Chroma to open the collection
+        opened = time.perf_counter() - start
+        results, elapsed = _timed_query(store, embeddings, n_results)
+        rows[backend] = (opened, elapsed, results["ids"])
+
+    reference, candidate = rows["chroma"][2], rows["numpy"][2]
+    overlaps = [
+        len(set(a) & set(b)) / len(a)
+        for a, b in zip(reference, candidate) if a
+    ]
+    recall = sum(overlaps) / len(overlaps) if overlaps else 0.0
+
+    table = Table(title=f"Vector store comparison ({len(queries)} queries, k={n_results})")
+    table.add_column("Backend", style="cyan")
+    table.add_column("Open (ms)", justify="right")
+    table.add_column("Query (ms/query)", justify="right")
+    for backend, (opened, elapsed, _) in rows.items():
+        table.add_row(backend, f"{opened * 1000:.1f}", f"{elapsed * 1000 / len(queries):.2f}")
+    console.print(table)
+    console.print(f"NumPy recall@{n_results} vs Chroma: [bold]{recall:.3f}[/bold]")
+    return recall
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare recall and latency of the Chroma and NumPy vector stores")
+    parser.add_argument("input", nargs="?", help="Query file (JSONL or one query per line); defaults to stdin")
+    parser.add_argument("-n", "--n-results", type=int, default=5, help="k for recall@k")
+    args = parser.parse_args()
+
+    # Both stores must be built first: build_knowledge_base.py --backend chroma / --backend numpy
+    source = open(args.input) if args.input else sys.stdin
+    with source:
+        queries = [item["query"] for item in read_queries(source)]
+    if not queries:
+        console.print("[yellow]No queries given.[/yellow]")
+    else:
+        compare(queries, args.n_results)
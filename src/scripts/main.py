@@ -1,104 +1,130 @@
-import sys
-import time
-import argparse
-from pathlib import Path
-from rich.console import Console
-from src.infra.ingest import ingest_pdf
-from src.infra.retriever import KeywordRetriever
-from src.core.agent import ExtractionAgent
-from src.core.schema import Section
-from src.infra.store import AuditStore
-import random
-
-from src.config import Config
-
-
-console = Console()
-
-def main():
-
-    parser = argparse.ArgumentParser(description="FDA Molecule Intelligence Agent")
-    parser.add_argument("pdf_path", help="Path to the FDA label PDF")
-    args = parser.parse_args()
-    
-    pdf_path = Path(args.pdf_path)
-    if not pdf_path.exists():
-        console.print(f"[bold red]File not found: {pdf_path}[/bold red]")
-        sys.exit(1)
-
-    with console.status(f"[bold green]Ingesting {pdf_path.name}...[/bold green]"):
-        chunks = ingest_pdf(pdf_path)
-    console.print(f"✅ Ingested [bold]{len(chunks)}[/bold] text chunks.")
-
-    store = AuditStore()
-    
-    # Use the fixed seed from Config
-    run_seed = Config.SEED
-    model_name = Config.DEFAULT_MODEL
-
-    run_id = store.start_run(
-        filename=pdf_path.name, 
-        model_name=model_name, 
-        seed=run_seed
-    )
-    
-    console.print(f"💾 Log Init. ID: [cyan]{run_id}[/cyan] | Seed: [magenta]{run_seed}[/magenta]")
-
-    retriever = KeywordRetriever(chunks)
-    
-    agent = ExtractionAgent(
-        model_name=model_name, 
-        store=store, 
-        run_id=run_id, 
-        seed=run_seed
-    )
-    
-    sections = []
-
-    console.print("\n[bold blue]Starting Extraction Pipeline...[/bold blue]")
-    
-    pipeline_start = time.perf_counter()
-
-    for title, question in Config.TARGET_SECTIONS.items():
-        console.print(f"  🔍 Analyzing: [cyan]{title}[/cyan]...")
-        section_start = time.perf_counter()
-        
-        relevant_chunks = retriever.retrieve(title + " " + question, top_k=3)
-        section_facts = []
-        
-        for chunk in relevant_chunks:
-            fact = agent.extract_fact(chunk, question)
-            if fact and fact.value != "NOT_FOUND":
-                section_facts.append(fact)
-
-        section_duration = time.perf_counter() - section_start
-        store.log_section_stats(run_id, title, section_duration, len(relevant_chunks))
-        console.print(f"     ⏱️  Finished in [yellow]{section_duration:.2f}s[/yellow]")
-
-        section = Section(
-            title=title,
-            facts=section_facts,
-            missing_info=[] if section_facts else ["No evidence found"]
-        )
-        sections.append(section)
-
-    total_duration = time.perf_counter() - pipeline_start
-    console.print(f"\n✅ Pipeline completed in [bold green]{total_duration:.2f}s[/bold green]")
-
-    console.print("\n")
-    console.rule(f"[bold]Molecule Brief: {pdf_path.stem}[/bold]")
-    
-    for sec in sections:
-        console.print(f"\n[bold underline]{sec.title}[/bold underline]")
-        if not sec.facts:
-            console.print("[italic red]No facts extracted.[/italic red]")
-            continue
-            
-        for fact in sec.facts:
-            color = "green" if fact.confidence.value == "high" else "yellow"
-            console.print(f"• {fact.value} [{color}]({fact.confidence.value})[/{color}]")
-            for cit in fact.citations:
-                console.print(f"  [dim]Citation (p{cit.page_number}): \"{cit.quote_snippet}\"[/dim]")
-
-if __name__ == "__main__":
+import sys
+import time
+import argparse
+from pathlib import Path
+from rich.console import Console
+from src.infra.ingest import file_content_hash, ingest_pdf
+from src.infra.chunking import STRATEGIES
+from src.infra.retriever import KeywordRetriever
+from src.infra.quote_index import QuoteIndex
+from src.core.agent import ExtractionAgent
+from src.core.pipeline import run_extraction
+from src.core.policy import ExtractionPolicy
+from src.infra.store import AuditStore
+from src.infra.cache import ResponseCache
+import random
+
+from src.config import Config
+
+
+console = Console()
+
+def main():
+
+    parser = argparse.ArgumentParser(description="FDA Molecule Intelligence Agent")
+    parser.add_argument("pdf_path", help="Path to the FDA label PDF")
+    parser.add_argument("--concurrency", type=int, default=Config.MAX_CONCURRENT_REQUESTS,
+                        help="Max LLM calls in flight")
+    parser.add_argument("--grouped", action="store_true", default=Config.GROUPED_EXTRACTION,
+                        help="Ask all questions sharing a chunk in one prompt")
+    parser.add_argument("--no-cache", action="store_true", default=not Config.LLM_CACHE_ENABLED,
+                        help="Always call the LLM, bypassing the response cache")
+    parser.add_argument("--chunking", choices=STRATEGIES, default=Config.CHUNK_STRATEGY,
+                        help="How pages are split into prompt-sized chunks")
+    parser.add_argument("--cascade", nargs="+", default=list(Config.CASCADE_MODELS), metavar="MODEL",
+                        help="Models to escalate through, smallest first")
+    parser.add_argument("--min-score", type=float, default=Config.MIN_RETRIEVAL_SCORE,
+                        help="Skip retrieved chunks below this BM25 score")
+    parser.add_argument("--stop-early", action="store_true", default=Config.STOP_ON_HIGH_CONFIDENCE,
+                        help="Stop a section after its first high-confidence fact")
+    parser.add_argument("--prefilter", action="store_true", default=Config.LEXICAL_PREFILTER,
+                        help="Only send chunks that mention one of the section's keywords")
+    args = parser.parse_args()
+    
+    pdf_path = Path(args.pdf_path)
+    if not pdf_path.exists():
+        console.print(f"[bold red]File not found: {pdf_path}[/bold red]")
+        sys.exit(1)
+
+    with console.status(f"[bold green]Ingesting {pdf_path.name}...[/bold green]"):
+        chunks = ingest_pdf(pdf_path, strategy=args.chunking)
+    console.print(f"✅ Ingested [bold]{len(chunks)}[/bold] text chunks.")
+
+    store = AuditStore()
+    
+    # Use the fixed seed from Config
+    run_seed = Config.SEED
+    model_name = ">".join(args.cascade) if args.cascade else Config.DEFAULT_MODEL
+
+    run_id = store.start_run(
+        filename=pdf_path.name, 
+        model_name=model_name, 
+        seed=run_seed,
+        content_hash=file_content_hash(pdf_path)
+    )
+    
+    console.print(f"💾 Log Init. ID: [cyan]{run_id}[/cyan] | Seed: [magenta]{run_seed}[/magenta]")
+
+    retriever = KeywordRetriever(chunks)
+    quote_index = QuoteIndex.from_chunks(chunks) if Config.QUOTE_INDEX_ENABLED else None
+    
+    agent = ExtractionAgent(
+        model_name=model_name, 
+        store=store, 
+        run_id=run_id, 
+        seed=run_seed,
+        max_concurrency=args.concurrency,
+        cache=None if args.no_cache else ResponseCache(),
+        models=args.cascade or None,
+        quote_index=quote_index
+    )
+    
+    if Config.LLM_WARMUP:
+        # Load the model(s) now so the first prompt is not charged the load time
+        with console.status("[bold green]Warming up model...[/bold green]"):
+            warmup = agent.warm_up()
+        store.log_warmup(run_id, warmup)
+        console.print(f"🔥 Model warm-up (cold start): [yellow]{warmup:.2f}s[/yellow]")
+
+    console.print("\n[bold blue]Starting Extraction Pipeline...[/bold blue]")
+    console.print(f"  🔍 Analyzing [cyan]{len(Config.TARGET_SECTIONS)}[/cyan] sections "
+                  f"([magenta]{agent.max_concurrency}[/magenta] calls in flight)...")
+
+    pipeline_start = time.perf_counter()
+
+    def report_section(title, duration, facts):
+        console.print(f"     ⏱️  [cyan]{title}[/cyan] finished in [yellow]{duration:.2f}s[/yellow]")
+
+    policy = ExtractionPolicy(
+        min_score=args.min_score,
+        stop_on_high_confidence=args.stop_early,
+        prefilters=dict(Config.SECTION_KEYWORDS) if args.prefilter else {}
+    )
+    sections = run_extraction(agent, retriever, grouped=args.grouped, on_section=report_section, policy=policy)
+    store.finish_run(run_id)
+    store.close()
+
+    total_duration = time.perf_counter() - pipeline_start
+    console.print(f"\n✅ Pipeline completed in [bold green]{total_duration:.2f}s[/bold green]")
+    if agent.cache:
+        stats = agent.cache.stats()
+        console.print(f"🗃️  Response cache: [green]{stats['hits']}[/green] hits, "
+                      f"[yellow]{stats['misses']}[/yellow] misses")
+
+    console.print("\n")
+    console.rule(f"[bold]Molecule Brief: {pdf_path.stem}[/bold]")
+    
+    for sec in sections:
+        console.print(f"\n[bold underline]{sec.title}[/bold underline]")
+        if not sec.facts:
+            console.print("[italic red]No facts extracted.[/italic red]")
+            continue
+            
+        for fact in sec.facts:
+            color = "green" if fact.confidence.value == "high" else "yellow"
+            console.print(f"• {fact.value} [{color}]({fact.confidence.value})[/{color}]")
+            for cit in fact.citations:
+                console.print(f"  [dim]Citation (p{cit.page_number}): \"{cit.quote_snippet}\"[/dim]")
+
+if __name__ == "__main__":
     main()
\ No newline at end of file
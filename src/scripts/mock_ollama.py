@@ -0,0 +1,437 @@
+import re
+import json
+import time
+import random
+import argparse
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+from rich.console import Console
+
+console = Console()
+
+DEFAULT_PORT = 11435  # next to Ollama's 11434, so both can run side by side
+DEFAULT_KEEP_ALIVE = 300.0  # Ollama unloads idle models after 5 minutes
+
+Distribution = Callable[[random.Random], float]
+
+CONTEXT_PATTERN = re.compile(r"TEXT CONTEXT \(Page \d+\):\n(.*?)\n\s*QUESTIONS?:", re.DOTALL)
+GROUPED_KEY_PATTERN = re.compile(r'^\s*- "([^"]+)": ', re.MULTILINE)
+SENTENCE_PATTERN = re.compile(r"[^.!?\n]*[A-Za-z][^.!?\n]*[.!?]")
+PIECE_PATTERN = re.compile(r"\s*\S+|\s")
+
+
+def parse_distribution(spec: str) -> Distribution:
+    """
+    Parses a latency spec in seconds:
+
+        0.5 / fixed:0.5       constant
+        uniform:0.2,0.8       uniform between the bounds
+        normal:0.5,0.1        normal (mean, sd), clamped at 0
+        lognormal:-1.0,0.5    lognormal (mu, sigma of the underlying normal)
+        exp:0.5               exponential with the given mean
+    """
+    kind, _, args = spec.partition(":")
+    if not args:
+        kind, args = "fixed", kind
+    try:
+        values = [float(v) for v in args.split(",")]
+        if kind == "fixed" and len(values) == 1:
+            return lambda rng: values[0]
+        if kind == "uniform" and len(values) == 2:
+            return lambda rng: rng.uniform(*values)
+        if kind == "normal" and len(values) == 2:
+            return lambda rng: max(0.0, rng.gauss(*values))
+        if kind == "lognormal" and len(values) == 2:
+            return lambda rng: rng.lognormvariate(*values)
+        if kind == "exp" and len(values) == 1:
+            return lambda rng: rng.expovariate(1 / values[0]) if values[0] > 0 else 0.0
+    except ValueError:
+        pass
+    raise ValueError(f"Invalid latency distribution '{spec}'")
+
+
+def parse_keep_alive(value) -> Optional[float]:
+    """Ollama keep_alive ("30m", "1h", 300, -1) in seconds; None means forever."""
+    if value is None:
+        return DEFAULT_KEEP_ALIVE
+    if isinstance(value, (int, float)):
+        return None if value < 0 else float(value)
+    match = re.fullmatch(r"(-?\d+(?:\.\d+)?)(ms|s|m|h)?", str(value).strip())
+    if not match:
+        return DEFAULT_KEEP_ALIVE
+    number = float(match.group(1))
+    if number < 0:
+        return None
+    return number * {"ms": 0.001, "s": 1, "m": 60, "h": 3600, None: 1}[match.group(2)]
+
+
+def _first_sentence(text: str) -> Optional[str]:
+    for match in SENTENCE_PATTERN.finditer(text):
+        sentence = match.group(0).strip()
+        if len(sentence.split()) >= 3:
+            return sentence
+    return None
+
+
+def _answer(context: str) -> dict:
+    sentence = _first_sentence(context)
+    if not sentence:
+        return {"value": "NOT_FOUND", "quote_snippet": "", "confidence": "low"}
+    return {"value": sentence[:120], "quote_snippet": sentence, "confidence": "high"}
+
+
+def default_response(prompt: str) -> dict:
+    """
+    A schema-valid answer built from the prompt itself: the first sentence
+    of the TEXT CONTEXT, quoted verbatim so it passes quote verification.
+    Grouped prompts get one answer per question label.
+    """
+    match = CONTEXT_PATTERN.search(prompt)
+    context = match.group(1) if match else ""
+    keys = GROUPED_KEY_PATTERN.findall(prompt) if "QUESTIONS:" in prompt else []
+    if keys:
+        return {key: _answer(context) for key in keys}
+    return _answer(context)
+
+
+class Fixtures:
+    """
+    Canned responses loaded from a JSON file:
+
+        [{"match": "<regex>", "model": "<optional>", "response": {...} or "<raw text>"}, ...]
+
+    The first rule whose regex matches the prompt (and whose model, if given,
+    matches the request) wins. A string response is sent as-is, which lets
+    fixtures return invalid JSON.
+    """
+
+    def __init__(self, rules: Optional[List[dict]] = None):
+        self.rules = [
+            (re.compile(rule["match"], re.DOTALL), rule.get("model"), rule["response"])
+            for rule in rules or []
+        ]
+
+    @classmethod
+    def load(cls, path: Path) -> "Fixtures":
+        return cls(json.loads(Path(path).read_text()))
+
+    def lookup(self, model: str, prompt: str):
+        for pattern, rule_model, response in self.rules:
+            if rule_model not in (None, model):
+                continue
+            if pattern.search(prompt):
+                return response
+        return None
+
+
+class MockOllama:
+    """
+    State shared by every request thread: fixtures, latency distributions,
+    the concurrency limit and which models are currently "loaded".
+
+    All randomness is drawn from an RNG seeded by (seed, model, prompt), so a
+    given prompt gets the same answer and the same latencies on every run,
+    regardless of how requests interleave.
+    """
+
+    def __init__(
+            self,
+            fixtures: Optional[Fixtures] = None,
+            ttft: str = "0",
+            token_delay: str = "0",
+            load_time: str = "0",
+            parallel: int = 4,
+            seed: int = 0,
+            not_found_rate: float = 0.0,
+            invalid_rate: float = 0.0,
+            tail_tokens: int = 0
+    ):
+        self.fixtures = fixtures or Fixtures()
+        self.ttft = parse_distribution(ttft)
+        self.token_delay = parse_distribution(token_delay)
+        self.load_time = parse_distribution(load_time)
+        self.seed = seed
+        self.not_found_rate = not_found_rate
+        self.invalid_rate = invalid_rate
+        self.tail_tokens = tail_tokens
+
+        self._slots = threading.BoundedSemaphore(max(1, parallel))
+        self._lock = threading.Lock()
+        # model -> (last used, keep-alive seconds or None for forever)
+        self._loaded: Dict[str, Tuple[float, Optional[float]]] = {}
+        self.stats = {"requests": 0, "completed": 0, "aborted": 0, "loads": 0, "in_flight": 0, "peak_in_flight": 0}
+
+    def rng(self, model: str, prompt: str) -> random.Random:
+        return random.Random(f"{self.seed}:{model}:{prompt}")
+
+    @contextmanager
+    def slot(self):
+        """Holds one of the `parallel` generation slots; extra requests queue."""
+        with self._slots:
+            with self._lock:
+                self.stats["in_flight"] += 1
+                self.stats["peak_in_flight"] = max(self.stats["peak_in_flight"], self.stats["in_flight"])
+            try:
+                yield
+            finally:
+                with self._lock:
+                    self.stats["in_flight"] -= 1
+
+    def count(self, key: str):
+        with self._lock:
+            self.stats[key] += 1
+
+    def load(self, model: str, keep_alive, rng: random.Random) -> float:
+        """Simulates loading `model` unless it is still resident. Returns seconds spent."""
+        now = time.monotonic()
+        with self._lock:
+            last_used, ttl = self._loaded.get(model, (None, 0.0))
+            resident = last_used is not None and (ttl is None or now - last_used <= ttl)
+            if not resident:
+                self.stats["loads"] += 1
+
+        seconds = 0.0 if resident else self.load_time(rng)
+        time.sleep(seconds)
+        self.touch(model, keep_alive)
+        return seconds
+
+    def touch(self, model: str, keep_alive):
+        with self._lock:
+            self._loaded[model] = (time.monotonic(), parse_keep_alive(keep_alive))
+
+    def loaded_models(self) -> List[str]:
+        now = time.monotonic()
+        with self._lock:
+            return [
+                model for model, (last_used, ttl) in self._loaded.items()
+                if ttl is None or now - last_used <= ttl
+            ]
+
+    def respond(self, model: str, prompt: str, rng: random.Random) -> str:
+        fixture = self.fixtures.lookup(model, prompt)
+        if fixture is not None:
+            text = fixture if isinstance(fixture, str) else json.dumps(fixture)
+        elif rng.random() < self.invalid_rate:
+            text = '{"value": "truncated'
+        elif rng.random() < self.not_found_rate:
+            text = json.dumps({"value": "NOT_FOUND", "quote_snippet": "", "confidence": "low"})
+        else:
+            text = json.dumps(default_response(prompt))
+        # Small models sometimes keep emitting whitespace after the object
+        return text + "\n" * self.tail_tokens
+
+    @staticmethod
+    def pieces(text: str, num_predict: Optional[int]) -> Tuple[List[str], str]:
+        """Splits a response into streamed "tokens", capped at num_predict."""
+        tokens = PIECE_PATTERN.findall(text)
+        if num_predict is not None and 0 <= num_predict < len(tokens):
+            return tokens[:num_predict], "length"
+        return tokens, "stop"
+
+
+class MockOllamaHandler(BaseHTTPRequestHandler):
+    """
+    The subset of the Ollama HTTP API the pipeline uses:
+
+        POST /api/chat      streaming (NDJSON) or single JSON response
+        POST /api/generate  empty prompt loads the model (warm-up); otherwise answers
+        GET  /api/tags      currently loaded models
+        GET  /api/version
+        GET  /mock/stats    request counters and peak concurrency
+    """
+
+    protocol_version = "HTTP/1.1"  # keep-alive, so pooled clients reuse connections
+    mock: MockOllama = None  # set by make_server()
+
+    def handle(self):
+        try:
+            super().handle()
+        except (BrokenPipeError, ConnectionResetError):
+            # The client closed a keep-alive connection or aborted mid-response;
+            # without this socketserver prints a traceback for every one
+            self.close_connection = True
+
+    def finish(self):
+        try:
+            super().finish()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def _send_json(self, status: int, payload: dict):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _write_chunk(self, payload: dict):
+        data = json.dumps(payload).encode() + b"\n"
+        self.wfile.write(f"{len(data):X}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def do_GET(self):
+        if self.path == "/api/tags":
+            self._send_json(200, {"models": [{"name": m, "model": m} for m in self.mock.loaded_models()]})
+        elif self.path == "/api/version":
+            self._send_json(200, {"version": "0.0.0-mock"})
+        elif self.path == "/mock/stats":
+            self._send_json(200, dict(self.mock.stats))
+        else:
+            self._send_json(404, {"error": f"Unknown path {self.path}"})
+
+    def do_POST(self):
+        if self.path not in ("/api/chat", "/api/generate"):
+            self._send_json(404, {"error": f"Unknown path {self.path}"})
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+            model = request["model"]
+            if self.path == "/api/chat":
+                prompt = request["messages"][-1]["content"]
+            else:
+                prompt = request.get("prompt") or ""
+        except (ValueError, KeyError, IndexError, TypeError) as e:
+            self._send_json(400, {"error": f"Bad request: {e}"})
+            return
+
+        self.mock.count("requests")
+        rng = self.mock.rng(model, prompt)
+        with self.mock.slot():
+            load_seconds = self.mock.load(model, request.get("keep_alive"), rng)
+            if self.path == "/api/generate" and not prompt:
+                # Warm-up request: load only
+                self._send_json(200, self._final(model, "generate", "", [], load_seconds, 0.0, 0.0, "load"))
+                self.mock.count("completed")
+                return
+            self._generate(request, model, prompt, rng, load_seconds)
+        self.mock.touch(model, request.get("keep_alive"))
+
+    def _generate(self, request: dict, model: str, prompt: str, rng: random.Random, load_seconds: float):
+        kind = "chat" if self.path == "/api/chat" else "generate"
+        options = request.get("options") or {}
+        text = self.mock.respond(model, prompt, rng)
+        pieces, done_reason = self.mock.pieces(text, options.get("num_predict"))
+
+        prompt_seconds = self.mock.ttft(rng)
+        delays = [self.mock.token_delay(rng) for _ in pieces]
+
+        if not request.get("stream", True):
+            time.sleep(prompt_seconds + sum(delays))
+            final = self._final(model, kind, "".join(pieces), pieces, load_seconds, prompt_seconds, sum(delays), done_reason, prompt)
+            self._send_json(200, final)
+            self.mock.count("completed")
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            time.sleep(prompt_seconds)
+            for piece, delay in zip(pieces, delays):
+                self._write_chunk(self._part(model, kind, piece))
+                time.sleep(delay)
+            self._write_chunk(self._final(model, kind, "", pieces, load_seconds, prompt_seconds, sum(delays), done_reason, prompt))
+            self.wfile.write(b"0\r\n\r\n")
+            self.wfile.flush()
+            self.mock.count("completed")
+        except (BrokenPipeError, ConnectionResetError):
+            # The client stopped reading (e.g. early abort once its JSON closed)
+            self.mock.count("aborted")
+            self.close_connection = True
+
+    @staticmethod
+    def _part(model: str, kind: str, content: str) -> dict:
+        part = {"model": model, "created_at": datetime.now(timezone.utc).isoformat(), "done": False}
+        if kind == "chat":
+            part["message"] = {"role": "assistant", "content": content}
+        else:
+            part["response"] = content
+        return part
+
+    @classmethod
+    def _final(
+            cls,
+            model: str,
+            kind: str,
+            content: str,
+            pieces: List[str],
+            load_seconds: float,
+            prompt_seconds: float,
+            eval_seconds: float,
+            done_reason: str,
+            prompt: str = ""
+        ) -> dict:
+        final = cls._part(model, kind, content)
+        ns = lambda seconds: int(seconds * 1e9)
+        final.update({
+            "done": True,
+            "done_reason": done_reason,
+            "total_duration": ns(load_seconds + prompt_seconds + eval_seconds),
+            "load_duration": ns(load_seconds),
+            "prompt_eval_count": max(1, len(prompt) // 4) if prompt else 0,
+            "prompt_eval_duration": ns(prompt_seconds),
+            "eval_count": len(pieces),
+            "eval_duration": ns(eval_seconds),
+        })
+        return final
+
+    def log_message(self, format, *args):
+        pass  # per-request logging would dominate load tests
+
+
+def make_server(host: str, port: int, mock: MockOllama) -> ThreadingHTTPServer:
+    """Builds (but does not start) a mock server; port 0 picks a free port."""
+    handler = type("BoundMockOllamaHandler", (MockOllamaHandler,), {"mock": mock})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def serve(host: str, port: int, mock: MockOllama):
+    console.rule("[bold green]Mock Ollama Server[/bold green]")
+    server = make_server(host, port, mock)
+    console.print(f"✅ Listening on [cyan]http://{host}:{port}[/cyan] "
+                  f"(set OLLAMA_HOST=http://{host}:{port} to use it)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        console.print(f"Stats: {mock.stats}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Deterministic stand-in for the Ollama API, for offline load testing")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--fixtures", help="JSON file of canned responses (see Fixtures)")
+    parser.add_argument("--ttft", default="0", help="Prompt processing time before the first token, e.g. normal:0.8,0.2")
+    parser.add_argument("--token-delay", default="0", help="Time between streamed tokens, e.g. fixed:0.05")
+    parser.add_argument("--load-time", default="0", help="Model load time on a cold start, e.g. uniform:2,4")
+    parser.add_argument("--parallel", type=int, default=4, help="Concurrent generations (like OLLAMA_NUM_PARALLEL)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for answers and latencies")
+    parser.add_argument("--not-found-rate", type=float, default=0.0, help="Fraction of prompts answered NOT_FOUND")
+    parser.add_argument("--invalid-rate", type=float, default=0.0, help="Fraction of prompts answered with broken JSON")
+    parser.add_argument("--tail-tokens", type=int, default=0, help="Whitespace tokens emitted after each JSON answer")
+    args = parser.parse_args()
+
+    mock = MockOllama(
+        fixtures=Fixtures.load(args.fixtures) if args.fixtures else None,
+        ttft=args.ttft,
+        token_delay=args.token_delay,
+        load_time=args.load_time,
+        parallel=args.parallel,
+        seed=args.seed,
+        not_found_rate=args.not_found_rate,
+        invalid_rate=args.invalid_rate,
+        tail_tokens=args.tail_tokens
+    )
+    serve(args.host, args.port, mock)
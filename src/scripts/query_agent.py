@@ -1,19 +1,17 @@
-import chromadb
-from chromadb.utils import embedding_functions
+import json
+import argparse
+import urllib.request
 from rich.console import Console
 from rich.table import Table
 from rich.panel import Panel
+from src.config import Config
 
 console = Console()
 
-def search_knowledge_base(query_text):
-    client = chromadb.PersistentClient(path="./data/vector_store")
-    ef = embedding_functions.SentenceTransformerEmbeddingFunction(model_name="all-MiniLM-L6-v2")
-    collection = client.get_collection(name="fda_facts", embedding_function=ef)
+DEFAULT_SERVER = f"http://{Config.QUERY_SERVER_HOST}:{Config.QUERY_SERVER_PORT}"
 
+def render_results(query_text, hits):
     console.print(Panel(f"[bold white]Query:[/bold white] [cyan]{query_text}[/cyan]", border_style="blue"))
-    
-    results = collection.query(query_texts=[query_text], n_results=3)
 
     # Create Rich Table for output
     table = Table(show_header=True, header_style="bold magenta", box=None)
@@ -21,20 +19,63 @@ def search_knowledge_base(query_text):
     table.add_column("Fact/Context", ratio=3)
     table.add_column("Confidence", justify="right")
 
-    for i in range(len(results['documents'][0])):
-        doc = results['documents'][0][i]
-        meta = results['metadatas'][0][i]
-        
+    for hit in hits:
+        meta = hit['metadata']
         table.add_row(
-            str(i+1),
-            doc,
-            f"[{'green' if meta['confidence']=='HIGH' else 'yellow'}]{meta['confidence']}[/]"
+            str(hit['rank']),
+            hit['document'],
+            f"[{'green' if meta['confidence'].lower()=='high' else 'yellow'}]{meta['confidence']}[/]"
         )
 
     console.print(table)
     console.print("\n")
 
+def search_knowledge_base(query_text, n_results=3, store=None, embedder=None, where=None):
+    # Imported lazily so client mode does not pay for the vector backend
+    from src.infra.knowledge_base import search
+    from src.infra.vector_store import open_store
+
+    store = store or open_store()
+    hits = search(store, query_text, n_results=n_results, embedder=embedder, where=where)
+    render_results(query_text, hits)
+    return hits
+
+def search_remote(server_url, query_text, n_results=3, where=None):
+    """Runs the search on a warm query server (see src/scripts/query_server.py)."""
+    request = urllib.request.Request(
+        f"{server_url.rstrip('/')}/search",
+        data=json.dumps({"query": query_text, "n_results": n_results, "where": where}).encode(),
+        headers={"Content-Type": "application/json"}
+    )
+    with urllib.request.urlopen(request) as response:
+        hits = json.load(response)["results"]
+    render_results(query_text, hits)
+    return hits
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="FDA AI Agent Query Interface")
+    parser.add_argument("queries", nargs="*", default=[
+        "What are the weight loss indications?",
+        "Find any mention of renal or kidney risks."
+    ])
+    parser.add_argument("-n", "--n-results", type=int, default=3, help="Results per query")
+    parser.add_argument("--server", nargs="?", const=DEFAULT_SERVER,
+                        help=f"Query a running query server instead of loading the model (default {DEFAULT_SERVER})")
+    parser.add_argument("--backend", choices=("chroma", "numpy"), default=Config.VECTOR_BACKEND, help="Vector store to search")
+    parser.add_argument("--confidence", help="Only return facts with this confidence (e.g. high)")
+    args = parser.parse_args()
+
+    where = {"confidence": args.confidence.lower()} if args.confidence else None
+
     console.rule("[bold green]FDA AI Agent Query Interface[/bold green]")
-    search_knowledge_base("What are the weight loss indications?")
-    search_knowledge_base("Find any mention of renal or kidney risks.")
\ No newline at end of file
+    if args.server:
+        for query in args.queries:
+            search_remote(args.server, query, args.n_results, where)
+    else:
+        # Load the model and store once for all queries
+        from src.infra.knowledge_base import get_embedder
+        from src.infra.vector_store import open_store
+        store = open_store(args.backend)
+        embedder = get_embedder()
+        for query in args.queries:
+            search_knowledge_base(query, args.n_results, store, embedder, where)
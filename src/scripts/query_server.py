@@ -0,0 +1,97 @@
+import json
+import time
+import argparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from rich.console import Console
+from src.config import Config
+from src.infra.knowledge_base import get_embedder, search, warm_up
+from src.infra.vector_store import BACKENDS, open_store
+
+console = Console()
+
+class QueryHandler(BaseHTTPRequestHandler):
+    """
+    JSON API over a vector store loaded once at start-up.
+
+        GET  /health  -> {"status": "ok", "facts": <count>}
+        POST /search  {"query": str, "n_results": int, "where": dict?} -> {"query", "results", "elapsed_ms"}
+    """
+
+    store = None  # set by serve()
+    embedder = None
+
+    def _send_json(self, status: int, payload: dict):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path != "/health":
+            self._send_json(404, {"error": f"Unknown path {self.path}"})
+            return
+        self._send_json(200, {"status": "ok", "facts": self.store.count()})
+
+    def do_POST(self):
+        if self.path != "/search":
+            self._send_json(404, {"error": f"Unknown path {self.path}"})
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+            query_text = request["query"]
+            n_results = int(request.get("n_results", 3))
+            where = request.get("where")
+        except (ValueError, KeyError, TypeError) as e:
+            self._send_json(400, {"error": f"Bad request: {e}"})
+            return
+
+        start = time.perf_counter()
+        try:
+            hits = search(self.store, query_text, n_results=n_results, embedder=self.embedder, where=where)
+        except Exception as e:
+            self._send_json(500, {"error": str(e)})
+            return
+
+        self._send_json(200, {
+            "query": query_text,
+            "results": hits,
+            "elapsed_ms": round((time.perf_counter() - start) * 1000, 2)
+        })
+
+    def log_message(self, format, *args):
+        console.print(f"[dim]{self.address_string()} {format % args}[/dim]")
+
+def serve(
+        host: str = Config.QUERY_SERVER_HOST,
+        port: int = Config.QUERY_SERVER_PORT,
+        backend: str = Config.VECTOR_BACKEND
+    ):
+    console.rule("[bold green]FDA Knowledge Base Query Server[/bold green]")
+
+    with console.status("[bold green]Loading embedding model and vector store...[/bold green]"):
+        QueryHandler.store = open_store(backend)
+        QueryHandler.embedder = get_embedder()
+        warm_up(QueryHandler.embedder)  # load weights before the first request arrives
+
+    # One thread per connection; the model and store are shared
+    server = ThreadingHTTPServer((host, port), QueryHandler)
+    console.print(f"✅ Serving {QueryHandler.store.count()} facts on [cyan]http://{host}:{port}[/cyan]")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Keep the knowledge base warm behind a local JSON API")
+    parser.add_argument("--host", default=Config.QUERY_SERVER_HOST)
+    parser.add_argument("--port", type=int, default=Config.QUERY_SERVER_PORT)
+    parser.add_argument("--backend", choices=BACKENDS, default=Config.VECTOR_BACKEND)
+    args = parser.parse_args()
+
+    serve(args.host, args.port, args.backend)
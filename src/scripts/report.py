@@ -3,6 +3,7 @@ import argparse
 import sqlite3
 from pathlib import Path
 from rich.console import Console
+from rich.markup import escape
 from rich.table import Table
 from src.config import Config
 
@@ -35,7 +36,8 @@ def generate_report(db_path: Path, run_id: str):
 
     # Fetch Facts grouped by Attribute (Question)
     cursor.execute("""
-        SELECT attribute, value, citation_quote, chunk_page, confidence 
+        SELECT attribute, value, citation_quote, chunk_page, confidence,
+               citation_start, citation_end, citation_evidence
         FROM facts 
         WHERE run_id = ? 
         ORDER BY id ASC
@@ -49,7 +51,7 @@ def generate_report(db_path: Path, run_id: str):
 
     # Group by "Section" (Attribute)
     current_section = None
-    for attribute, value, quote, page, confidence in facts:
+    for attribute, value, quote, page, confidence, start, end, evidence in facts:
         # Simple heuristic: The attribute usually maps to the section title
         if attribute != current_section:
             console.print(f"\n[bold underline]{attribute}[/bold underline]")
@@ -57,7 +59,15 @@ def generate_report(db_path: Path, run_id: str):
         
         color = "green" if confidence == "high" else "yellow"
         console.print(f"• {value} [{color}]({confidence})[/{color}]")
-        console.print(f"  [dim]Citation (p{page}): \"{quote}\"[/dim]")
+        if start is None:
+            console.print(f"  [dim]Citation (p{page}): \"{quote}\"[/dim]")
+            continue
+        # A quote across a page break has no end offset on its first page
+        span = f"{start}-{end}" if end is not None else f"{start}– (cont. p{page + 1})"
+        console.print(f"  [dim]Citation (p{page}, chars {span}): \"{quote}\"[/dim]")
+        # Fuzzy matches: show what the label actually says
+        if evidence and evidence != quote:
+            console.print(f"  [dim]Evidence:[/dim] [reverse]{escape(evidence)}[/reverse]")
 
     # Fetch Stats
     cursor.execute("SELECT section_name, duration_seconds FROM section_stats WHERE run_id = ?", (run_id,))
@@ -78,6 +88,38 @@ def generate_report(db_path: Path, run_id: str):
         console.print(table)
         console.print(f"[bold]Total Inference Time:[/bold] {total_time:.2f}s")
 
+        # Cold start (model load at run start) vs. warm per-call latency
+        cursor.execute("SELECT warmup_seconds FROM runs WHERE run_id = ?", (run_id,))
+        warmup = cursor.fetchone()[0]
+        cursor.execute(
+            "SELECT AVG(latency_seconds) FROM interactions WHERE run_id = ? AND NOT cached",
+            (run_id,)
+        )
+        warm_latency = cursor.fetchone()[0]
+        if warmup is not None:
+            console.print(f"[bold]Cold Start (model load):[/bold] {warmup:.2f}s")
+        if warm_latency is not None:
+            console.print(f"[bold]Mean Warm Call Latency:[/bold] {warm_latency:.2f}s")
+
+    # Cascade runs: how many calls (and how much time) each model took
+    cursor.execute("""
+        SELECT model_name, COUNT(*), SUM(latency_seconds)
+        FROM interactions
+        WHERE run_id = ?
+        GROUP BY model_name
+        ORDER BY MIN(id)
+    """, (run_id,))
+    by_model = cursor.fetchall()
+
+    if len(by_model) > 1:
+        table = Table(show_header=True, header_style="bold magenta")
+        table.add_column("Model")
+        table.add_column("Calls")
+        table.add_column("Latency (s)")
+        for model_name, calls, latency in by_model:
+            table.add_row(model_name or "-", str(calls), f"{latency or 0:.2f}")
+        console.print(table)
+
     conn.close()
 
 if __name__ == "__main__":
@@ -0,0 +1,103 @@
+import random
+import argparse
+from pathlib import Path
+from typing import List
+import fitz  # PyMuPDF
+from rich.console import Console
+
+console = Console()
+
+DRUGS = ["Zentravir", "Ocrelimab", "Tavoxin", "Pembralumab", "Nivatrel", "Duraprost", "Keltaxa", "Fenomira"]
+CONDITIONS = [
+    "unresectable or metastatic melanoma", "non-small cell lung cancer", "classical Hodgkin lymphoma",
+    "relapsing multiple sclerosis", "moderate to severe plaque psoriasis", "chronic hepatitis B infection",
+    "advanced renal cell carcinoma", "type 2 diabetes mellitus"
+]
+REACTIONS = [
+    "fatigue", "nausea", "rash", "diarrhea", "pruritus", "decreased appetite", "hepatotoxicity",
+    "immune-mediated pneumonitis", "infusion-related reactions", "renal impairment", "neutropenia"
+]
+FILLER = [
+    "Monitor patients for signs and symptoms and evaluate clinical chemistries periodically.",
+    "Withhold or permanently discontinue based on the severity of the reaction.",
+    "Safety and effectiveness in pediatric patients have not been established.",
+    "The pharmacokinetics were evaluated in a population analysis of adult patients.",
+    "No formal drug interaction studies have been conducted.",
+    "Advise females of reproductive potential of the potential risk to a fetus.",
+    "Administer as an intravenous infusion over 30 minutes through a sterile in-line filter.",
+    "Store vials refrigerated in the original carton to protect from light.",
+]
+
+SECTIONS = [
+    ("1 INDICATIONS AND USAGE", "indications"),
+    ("2 DOSAGE AND ADMINISTRATION", "dosage"),
+    ("4 CONTRAINDICATIONS", "contraindications"),
+    ("5 WARNINGS AND PRECAUTIONS", "warnings"),
+    ("6 ADVERSE REACTIONS", "reactions"),
+    ("12 CLINICAL PHARMACOLOGY", "filler"),
+]
+
+
+def _paragraph(kind: str, drug: str, rng: random.Random) -> str:
+    if kind == "indications":
+        return f"{drug} is indicated for the treatment of adult patients with {rng.choice(CONDITIONS)}."
+    if kind == "dosage":
+        dose = rng.choice([2, 10, 100, 200, 400])
+        weeks = rng.choice([2, 3, 4, 6])
+        return f"The recommended dosage of {drug} is {dose} mg administered every {weeks} weeks until disease progression."
+    if kind == "contraindications":
+        return rng.choice([
+            f"{drug} is contraindicated in patients with known hypersensitivity to any component.",
+            "None.",
+        ])
+    if kind == "warnings":
+        reaction = rng.choice(REACTIONS)
+        return f"{drug} can cause severe and fatal {reaction}. Monitor patients for {reaction} during treatment."
+    if kind == "reactions":
+        common = ", ".join(rng.sample(REACTIONS, 4))
+        return f"The most common adverse reactions (incidence of at least 20%) were {common}."
+    return rng.choice(FILLER)
+
+
+def label_pages(pages: int, seed: int = 0) -> List[str]:
+    """Text of a synthetic FDA label: one page of text per element."""
+    rng = random.Random(seed)
+    drug = rng.choice(DRUGS)
+    texts = []
+    for page in range(pages):
+        heading, kind = SECTIONS[page % len(SECTIONS)]
+        paragraphs = [heading, _paragraph(kind, drug, rng)]
+        paragraphs += [rng.choice(FILLER) for _ in range(rng.randint(8, 14))]
+        texts.append("\n\n".join(paragraphs))
+    return texts
+
+
+def write_label(path: Path, pages: int, seed: int = 0) -> Path:
+    """Writes a synthetic label PDF with `pages` pages of extractable text."""
+    doc = fitz.open()
+    for text in label_pages(pages, seed):
+        page = doc.new_page()
+        page.insert_textbox(fitz.Rect(54, 54, page.rect.width - 54, page.rect.height - 54), text, fontsize=9)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    doc.save(path)
+    doc.close()
+    return path
+
+
+def write_corpus(folder: Path, documents: int, pages: int, seed: int = 0) -> List[Path]:
+    """Writes `documents` labels named label_000.pdf, label_001.pdf, ..."""
+    return [
+        write_label(folder / f"label_{index:03d}.pdf", pages, seed=seed + index)
+        for index in range(documents)
+    ]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic FDA-label PDFs for benchmarks")
+    parser.add_argument("folder", help="Output folder")
+    parser.add_argument("--documents", type=int, default=10)
+    parser.add_argument("--pages", type=int, default=30, help="Pages per label")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    paths = write_corpus(Path(args.folder), args.documents, args.pages, args.seed)
+    console.print(f"✅ Wrote {len(paths)} labels of {args.pages} pages to [cyan]{args.folder}[/cyan]")
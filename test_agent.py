@@ -1,18 +1,31 @@
 # test_agent.py (Quick manual check)
+#
+#   python test_agent.py path/to/label.pdf [--chunk 1] [--question "..."]
+#
+# Runs against a real Ollama by default. Point OLLAMA_HOST at a mock server
+# (python -m src.scripts.mock_ollama) to check the wiring offline.
+import argparse
 from src.infra.ingest import ingest_pdf
 from src.core.agent import ExtractionAgent
 from pathlib import Path
 
-# Load chunks
-chunks = ingest_pdf(Path("data/raw_pdfs/keytruda.pdf"))
-# Pick a chunk we know has info (e.g., chunk 1 or 2 usually has Indications)
-target_chunk = chunks[1] 
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Extract one fact from one chunk of a label")
+    parser.add_argument("pdf_path", nargs="?", default="data/raw_pdfs/keytruda.pdf", help="FDA label PDF")
+    parser.add_argument("--chunk", type=int, default=1, help="Index of the chunk to ask about")
+    parser.add_argument("--question", default="What is the indication for Melanoma?")
+    args = parser.parse_args()
 
-agent = ExtractionAgent()
-fact = agent.extract_fact(target_chunk, "What is the indication for Melanoma?")
+    # Load chunks
+    chunks = ingest_pdf(Path(args.pdf_path))
+    # Pick a chunk we know has info (e.g., chunk 1 or 2 usually has Indications)
+    target_chunk = chunks[args.chunk]
 
-if fact:
-    print(f"\n✅ FOUND FACT: {fact.value}")
-    print(f"   Citation: \"{fact.citations[0].quote_snippet}\"")
-else:
-    print("\n❌ No fact found in this chunk.")
+    agent = ExtractionAgent()
+    fact = agent.extract_fact(target_chunk, args.question)
+
+    if fact:
+        print(f"\n✅ FOUND FACT: {fact.value}")
+        print(f"   Citation: \"{fact.citations[0].quote_snippet}\"")
+    else:
+        print("\n❌ No fact found in this chunk.")
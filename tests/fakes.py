@@ -0,0 +1,58 @@
+import json
+from src.core.schema import DocumentChunk
+from src.infra.llm import LLMClient
+
+
+def use_fake_chat(monkeypatch, chat, streaming: bool = False):
+    """
+    Routes LLMClient.chat to a fake. By default `chat(model, messages, format,
+    options)` returns one complete response, delivered to the agent as a
+    single stream part. With streaming=True the fake also takes `stream` and
+    returns the stream parts itself.
+    """
+    def fake(self, model, messages, format=None, options=None, stream=False):
+        if streaming:
+            return chat(model, messages, format, options, stream=stream)
+        response = chat(model, messages, format, options)
+        return iter([{**response, "done": True}]) if stream else response
+
+    monkeypatch.setattr(LLMClient, "chat", fake)
+
+
+def make_chunk(page: int, text: str = None, doc_name: str = "label.pdf") -> DocumentChunk:
+    """A whole-page chunk; the text defaults to the page's dose sentence (see page_chat)."""
+    text = f"Page {page} dose is {page}0 mg." if text is None else text
+    chunk = DocumentChunk(chunk_id="", doc_name=doc_name, page_number=page, text_content=text)
+    chunk.chunk_id = chunk.compute_id()
+    return chunk
+
+
+class StaticRetriever:
+    """Returns the chunks in order, with scores falling by rank: 3.0, 2.0, 1.0, ..."""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+
+    def retrieve_with_scores(self, query, top_k=5):
+        return [(3.0 - i, chunk) for i, chunk in enumerate(self.chunks[:top_k])]
+
+
+def page_chat(monkeypatch, failing=()):
+    """
+    Answers with the dose sentence of the prompt's page (see make_chunk) and
+    raises, like an unreachable server, for `failing` pages. Returns the
+    list of pages sent, in order.
+    """
+    sent = []
+
+    def chat(model, messages, format, options):
+        page = int(messages[0]['content'].split("(Page ")[1].split(")")[0])
+        sent.append(page)
+        if page in failing:
+            raise ConnectionError("connection refused")
+        return {'message': {'content': json.dumps({
+            "value": f"{page}0 mg", "quote_snippet": f"Page {page} dose is {page}0 mg.", "confidence": "high"
+        })}}
+
+    use_fake_chat(monkeypatch, chat)
+    return sent
@@ -0,0 +1,256 @@
+import json
+import time
+import pytest
+from src.core.agent import ExtractionAgent
+from tests.fakes import make_chunk, use_fake_chat
+
+
+class RecordingStore:
+    def __init__(self):
+        self.interactions = []
+        self.facts = []
+
+    def log_interaction(self, **row):
+        self.interactions.append(row)
+
+    def save_fact(self, run_id, fact, chunk_id=None):
+        self.facts.append(fact)
+
+
+@pytest.fixture
+def fake_chat(monkeypatch):
+    def chat(model, messages, format, options):
+        prompt = messages[0]['content']
+        # Later pages answer first, so completion order differs from task order
+        page = int(prompt.split("(Page ")[1].split(")")[0])
+        time.sleep(0.01 * (5 - page))
+        quote = f"Page {page} dose is {page}0 mg."
+        return {'message': {'content': json.dumps({
+            "value": f"{page}0 mg", "quote_snippet": quote, "confidence": "high"
+        })}}
+
+    use_fake_chat(monkeypatch, chat)
+
+
+def test_extract_many_preserves_task_order(fake_chat):
+    chunks = [make_chunk(p, f"Intro. Page {p} dose is {p}0 mg.") for p in range(1, 5)]
+    tasks = [(chunk, "What is the dose?") for chunk in chunks]
+
+    store = RecordingStore()
+    agent = ExtractionAgent(store=store, run_id="run-1", max_concurrency=4)
+    facts = list(agent.extract_many(tasks))
+
+    assert [f.value for f in facts] == ["10 mg", "20 mg", "30 mg", "40 mg"]
+    assert [row["chunk_id"] for row in store.interactions] == [c.chunk_id for c in chunks]
+    assert [f.value for f in store.facts] == ["10 mg", "20 mg", "30 mg", "40 mg"]
+
+
+def test_extract_many_matches_sequential_rows(fake_chat):
+    chunks = [make_chunk(p, f"Intro. Page {p} dose is {p}0 mg.") for p in range(1, 4)]
+    tasks = [(chunk, "What is the dose?") for chunk in chunks]
+
+    sequential, concurrent = RecordingStore(), RecordingStore()
+    for chunk, question in tasks:
+        ExtractionAgent(store=sequential, run_id="run-1").extract_fact(chunk, question)
+    list(ExtractionAgent(store=concurrent, run_id="run-1").extract_many(tasks))
+
+    timings = {"latency", "ttft", "tokens_per_sec"}
+    strip = lambda rows: [{k: v for k, v in r.items() if k not in timings} for r in rows]
+    assert strip(concurrent.interactions) == strip(sequential.interactions)
+
+
+def test_extract_grouped_saves_one_fact_per_section(monkeypatch):
+    calls = []
+
+    def chat(model, messages, format, options):
+        calls.append(messages[0]['content'])
+        return {'message': {'content': json.dumps({
+            "Dosage": {"value": "10 mg", "quote_snippet": "The dose is 10 mg daily.", "confidence": "high"},
+            "Warnings": {"value": "NOT_FOUND", "quote_snippet": "", "confidence": "low"},
+            "Indications": {"value": "Melanoma", "quote_snippet": "Used to treat lung cancer.", "confidence": "high"},
+        })}}
+
+    use_fake_chat(monkeypatch, chat)
+    chunk = make_chunk(2, "Used to treat melanoma. The dose is 10 mg daily.")
+
+    store = RecordingStore()
+    agent = ExtractionAgent(store=store, run_id="run-1")
+    facts = agent.extract_grouped(chunk, {
+        "Dosage": "What is the dose?",
+        "Warnings": "What are the warnings?",
+        "Indications": "What is it used for?",
+    })
+
+    assert len(calls) == 1
+    # NOT_FOUND is dropped and the hallucinated quote fails verification
+    assert list(facts) == ["Dosage"]
+    assert facts["Dosage"].attribute == "What is the dose?"
+    assert len(store.interactions) == 1
+    assert [f.value for f in store.facts] == ["10 mg"]
+    citation = facts["Dosage"].citations[0]
+    assert chunk.text_content[citation.char_start:citation.char_end] == citation.evidence == "The dose is 10 mg daily."
+
+
+def test_cache_hit_skips_llm_and_is_flagged(fake_chat, monkeypatch, tmp_path):
+    from src.infra.cache import ResponseCache
+
+    chunk = make_chunk(1, "Intro. Page 1 dose is 10 mg.")
+    cache = ResponseCache(db_path=tmp_path / "cache.db")
+    store = RecordingStore()
+
+    first = ExtractionAgent(store=store, run_id="run-1", cache=cache).extract_fact(chunk, "What is the dose?")
+
+    def no_chat(*args, **kwargs):
+        raise AssertionError("LLM should not be called on a cache hit")
+
+    use_fake_chat(monkeypatch, no_chat)
+    second = ExtractionAgent(store=store, run_id="run-2", cache=cache).extract_fact(chunk, "What is the dose?")
+
+    assert first.value == second.value == "10 mg"
+    assert [row["cached"] for row in store.interactions] == [False, True]
+    assert store.interactions[0]["response"] == store.interactions[1]["response"]
+
+
+def _cascade_chat(monkeypatch, answers):
+    """Fakes the LLM with one canned answer per model."""
+    calls = []
+
+    def chat(model, messages, format, options):
+        calls.append(model)
+        answer = answers[model]
+        return {'message': {'content': answer if isinstance(answer, str) else json.dumps(answer)}}
+
+    use_fake_chat(monkeypatch, chat)
+    return calls
+
+
+def test_cascade_stops_at_first_confident_answer(monkeypatch):
+    calls = _cascade_chat(monkeypatch, {
+        "small": {"value": "10 mg", "quote_snippet": "The dose is 10 mg daily.", "confidence": "high"},
+        "large": {"value": "unused", "quote_snippet": "unused", "confidence": "high"},
+    })
+    store = RecordingStore()
+    agent = ExtractionAgent(store=store, run_id="run-1", models=["small", "large"])
+    fact = agent.extract_fact(make_chunk(1, "The dose is 10 mg daily."), "What is the dose?")
+
+    assert calls == ["small"]
+    assert fact.reasoning.startswith("Extracted via small")
+    assert [row["model_name"] for row in store.interactions] == ["small"]
+
+
+@pytest.mark.parametrize("small_answer", [
+    "not json",
+    {"value": "10 mg", "quote_snippet": "Take it with food.", "confidence": "high"},
+    {"value": "10 mg", "quote_snippet": "The dose is 10 mg daily.", "confidence": "low"},
+])
+def test_cascade_escalates_on_failure(monkeypatch, small_answer):
+    calls = _cascade_chat(monkeypatch, {
+        "small": small_answer,
+        "large": {"value": "10 mg daily", "quote_snippet": "The dose is 10 mg daily.", "confidence": "high"},
+    })
+    store = RecordingStore()
+    agent = ExtractionAgent(store=store, run_id="run-1", models=["small", "large"])
+    fact = agent.extract_fact(make_chunk(1, "The dose is 10 mg daily."), "What is the dose?")
+
+    assert calls == ["small", "large"]
+    assert fact.value == "10 mg daily"
+    assert [row["model_name"] for row in store.interactions] == ["small", "large"]
+    assert [f.value for f in store.facts] == ["10 mg daily"]
+
+
+def test_cascade_does_not_escalate_not_found(monkeypatch):
+    calls = _cascade_chat(monkeypatch, {
+        "small": {"value": "NOT_FOUND", "quote_snippet": "", "confidence": "low"},
+        "large": {"value": "unused", "quote_snippet": "unused", "confidence": "high"},
+    })
+    agent = ExtractionAgent(models=["small", "large"])
+    assert agent.extract_fact(make_chunk(1, "Unrelated text."), "What is the dose?") is None
+    assert calls == ["small"]
+
+
+
+def test_quote_from_another_page_is_verified_by_the_document_index(monkeypatch):
+    from src.infra.quote_index import QuoteIndex
+
+    def chat(model, messages, format, options):
+        return {'message': {'content': json.dumps({
+            "value": "100 mg", "quote_snippet": "The recommended dose is 100 mg every 3 weeks.", "confidence": "high"
+        })}}
+
+    use_fake_chat(monkeypatch, chat)
+    chunks = [make_chunk(1, "2 DOSAGE AND ADMINISTRATION"), make_chunk(2, "Warnings.\n\nThe recommended dose is 100 mg\nevery 3 weeks.")]
+
+    assert ExtractionAgent().extract_fact(chunks[0], "What is the dose?") is None
+
+    fact = ExtractionAgent(quote_index=QuoteIndex.from_chunks(chunks)).extract_fact(chunks[0], "What is the dose?")
+    citation = fact.citations[0]
+    assert citation.page_number == 2
+    assert citation.evidence == chunks[1].text_content[citation.char_start:citation.char_end]
+    assert citation.evidence == "The recommended dose is 100 mg\nevery 3 weeks"
+
+def test_grouped_cascade_only_replaces_escalated_answers(monkeypatch):
+    calls = _cascade_chat(monkeypatch, {
+        "small": {
+            "Dosage": {"value": "10 mg", "quote_snippet": "The dose is 10 mg daily.", "confidence": "high"},
+            "Indications": {"value": "Melanoma", "quote_snippet": "Used to treat lung cancer.", "confidence": "high"},
+        },
+        "large": {
+            "Dosage": {"value": "overridden", "quote_snippet": "The dose is 10 mg daily.", "confidence": "high"},
+            "Indications": {"value": "Melanoma", "quote_snippet": "Used to treat melanoma.", "confidence": "high"},
+        },
+    })
+    agent = ExtractionAgent(models=["small", "large"])
+    facts = agent.extract_grouped(make_chunk(2, "Used to treat melanoma. The dose is 10 mg daily."), {
+        "Dosage": "What is the dose?",
+        "Indications": "What is it used for?",
+    })
+
+    assert calls == ["small", "large"]
+    assert facts["Dosage"].value == "10 mg"
+    assert facts["Indications"].reasoning.startswith("Extracted via large")
+
+
+def test_stream_stops_at_end_of_json_and_records_metrics(monkeypatch):
+    parts = ['{"value": "10 mg", ', '"quote_snippet": "The dose is {10} mg daily.", ', '"confidence": "high"}', "\n\n", "\n\n"]
+    read = []
+
+    def generate():
+        for text in parts:
+            read.append(text)
+            yield {'message': {'content': text}, 'done': False}
+        yield {'message': {'content': ''}, 'done': True, 'prompt_eval_count': 120, 'eval_count': 5, 'eval_duration': 10**9}
+
+    options_seen = []
+
+    def chat(model, messages, format, options, stream=False):
+        options_seen.append(options)
+        return generate()
+
+    use_fake_chat(monkeypatch, chat, streaming=True)
+    store = RecordingStore()
+    chunk = make_chunk(1, "The dose is {10} mg daily.")
+    fact = ExtractionAgent(store=store, run_id="run-1").extract_fact(chunk, "What is the dose?")
+
+    assert fact.value == "10 mg"
+    assert len(read) == 3  # trailing whitespace is never read
+    assert options_seen[0]["num_predict"] > 0
+    row = store.interactions[0]
+    assert row["response"].endswith('"high"}')
+    assert row["eval_tokens"] == 3 and row["prompt_eval_tokens"] is None
+    assert row["ttft"] is not None
+
+
+def test_stream_metrics_come_from_final_message(monkeypatch):
+    def chat(model, messages, format, options, stream=False):
+        return iter([
+            {'message': {'content': '{"value": "NOT_FOUND"'}, 'done': False},
+            {'message': {'content': ''}, 'done': True, 'prompt_eval_count': 120, 'eval_count': 8, 'eval_duration': 2 * 10**9},
+        ])
+
+    use_fake_chat(monkeypatch, chat, streaming=True)
+    store = RecordingStore()
+    ExtractionAgent(store=store, run_id="run-1").extract_fact(make_chunk(1, "text"), "q?")
+
+    row = store.interactions[0]
+    assert row["is_valid_json"] is False  # truncated output
+    assert (row["prompt_eval_tokens"], row["eval_tokens"], row["tokens_per_sec"]) == (120, 8, 4.0)
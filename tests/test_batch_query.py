@@ -0,0 +1,10 @@
+import io
+from src.scripts.batch_query import read_queries
+
+
+def test_lines_without_a_query_are_skipped(capsys):
+    source = io.StringIO('{"id": "a", "query": "dose"}\n{"id": "b", "text": "oops"}\n{not json\nstorage\n')
+
+    assert list(read_queries(source)) == [{"id": "a", "query": "dose"}, {"id": 4, "query": "storage"}]
+    err = capsys.readouterr().err
+    assert "line 2" in err and "line 3" in err
@@ -0,0 +1,31 @@
+from src.infra.ingest import ingest_pdf
+from src.scripts.benchmark import STAGES, compare, run_benchmark
+from src.scripts.synthetic_labels import label_pages, write_label
+
+
+def test_synthetic_label_round_trips_through_ingest(tmp_path):
+    path = write_label(tmp_path / "label.pdf", pages=6, seed=3)
+    chunks = ingest_pdf(path, workers=1, use_cache=False)
+
+    assert len(chunks) == 6
+    assert "INDICATIONS AND USAGE" in chunks[0].text_content
+    assert "recommended dosage" in chunks[1].text_content
+    assert label_pages(6, seed=3) == label_pages(6, seed=3)
+
+
+def test_benchmark_reports_every_stage():
+    results = run_benchmark(documents=1, pages=6, repeat=1)
+
+    assert list(results["stages"]) == list(STAGES)
+    assert all(stage["operations"] > 0 for stage in results["stages"].values())
+    assert results["meta"]["pages"] == 6
+
+
+def test_compare_flags_regressions_beyond_threshold():
+    def stages(**per_op):
+        return {"stages": {name: {"per_op_ms": ms} for name, ms in per_op.items()}}
+
+    baseline = {**stages(verify=1.0, retrieve=1.0, search_knowledge_base=1.0), "thresholds": {"retrieve": 1.0}}
+    rows = compare(stages(verify=1.3, retrieve=1.8, ingest_pdf=5.0), baseline, threshold=0.25)
+
+    assert {row["stage"]: row["regressed"] for row in rows} == {"verify": True, "retrieve": False}
@@ -0,0 +1,64 @@
+import json
+import pytest
+from src.core.agent import ExtractionAgent
+from src.infra.cache import ResponseCache
+from src.infra.llm import LLMClient
+from tests.fakes import make_chunk, use_fake_chat
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ResponseCache(db_path=tmp_path / "cache.db", max_entries=2, evict_every=1)
+
+
+def test_key_depends_on_model_prompt_and_options():
+    base = ResponseCache.make_key("gemma2:2b", "prompt", {"seed": 42, "temperature": 0.0})
+    assert base == ResponseCache.make_key("gemma2:2b", "prompt", {"temperature": 0.0, "seed": 42})
+    assert base != ResponseCache.make_key("llama3:8b", "prompt", {"seed": 42, "temperature": 0.0})
+    assert base != ResponseCache.make_key("gemma2:2b", "prompt!", {"seed": 42, "temperature": 0.0})
+    assert base != ResponseCache.make_key("gemma2:2b", "prompt", {"seed": 7, "temperature": 0.0})
+    assert base != ResponseCache.make_key("gemma2:2b", "prompt", {"seed": 42, "temperature": 0.0}, format="json")
+
+
+def test_runner_options_are_part_of_the_key(monkeypatch, cache):
+    calls = []
+
+    def chat(model, messages, format, options):
+        calls.append(options)
+        return {'message': {'content': json.dumps({"value": "10 mg", "quote_snippet": "Page 1 dose is 10 mg.", "confidence": "high"})}}
+
+    use_fake_chat(monkeypatch, chat)
+    chunk = make_chunk(1)
+    for num_ctx in (2048, 2048, 8192):
+        ExtractionAgent(cache=cache, client=LLMClient(num_ctx=num_ctx)).extract_fact(chunk, "What is the dose?")
+
+    # The second request is served from the cache; a larger context is not
+    assert len(calls) == 2
+
+
+def test_hit_and_miss_counters(cache):
+    assert cache.get("a") is None
+    cache.put("a", "m", "response-a")
+    assert cache.get("a") == "response-a"
+    assert cache.stats() == {"hits": 1, "misses": 1, "hit_rate": 0.5}
+
+
+def test_evicts_least_recently_used(cache):
+    cache.put("a", "m", "1")
+    cache.put("b", "m", "2")
+    cache.get("a")  # "b" is now the least recently used
+    cache.put("c", "m", "3")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "1"
+    assert cache.get("c") == "3"
+
+
+def test_eviction_runs_every_n_puts(tmp_path):
+    cache = ResponseCache(db_path=tmp_path / "cache.db", max_entries=1, evict_every=3)
+    cache.put("a", "m", "1")
+    cache.put("b", "m", "2")
+    assert cache.get("a") == "1"  # over the bound until the next eviction pass
+
+    cache.put("c", "m", "3")
+    assert [cache.get(key) for key in "abc"] == [None, None, "3"]
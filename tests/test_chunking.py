@@ -0,0 +1,66 @@
+import pytest
+from src.core.schema import DocumentChunk
+from src.infra.chunking import chunk_pages, estimate_tokens
+
+
+def make_page(text, page=3):
+    chunk = DocumentChunk(chunk_id="", doc_name="label.pdf", page_number=page, text_content=text)
+    chunk.chunk_id = chunk.compute_id()
+    return chunk
+
+
+def paragraph(word, sentences=6):
+    return " ".join(f"The {word} sentence number {i} is here." for i in range(sentences))
+
+
+@pytest.fixture
+def page():
+    blocks = [
+        "1 INDICATIONS AND USAGE", paragraph("indication"), paragraph("melanoma"),
+        "2 DOSAGE AND ADMINISTRATION", paragraph("dosage"), paragraph("schedule"),
+    ]
+    return make_page("\n\n".join(blocks))
+
+
+def test_page_strategy_is_unchanged(page):
+    assert chunk_pages([page], strategy="page") == [page]
+
+
+def test_short_pages_are_not_split(page):
+    assert chunk_pages([page], strategy="block", token_budget=10_000) == [page]
+
+
+@pytest.mark.parametrize("strategy", ["block", "section"])
+def test_windows_respect_budget_and_offsets(page, strategy):
+    chunks = chunk_pages([page], strategy=strategy, token_budget=80, overlap_tokens=0)
+
+    assert len(chunks) > 1
+    for chunk in chunks:
+        assert chunk.page_number == 3
+        assert estimate_tokens(chunk.text_content) <= 80
+        assert page.text_content[chunk.char_start:chunk.char_end] == chunk.text_content
+    assert len({c.chunk_id for c in chunks}) == len(chunks)
+
+
+def test_section_strategy_starts_windows_at_headings(page):
+    chunks = chunk_pages([page], strategy="section", token_budget=200, overlap_tokens=0)
+    assert [c.text_content.split("\n")[0] for c in chunks] == [
+        "1 INDICATIONS AND USAGE", "2 DOSAGE AND ADMINISTRATION"
+    ]
+
+
+def test_overlap_repeats_trailing_blocks(page):
+    chunks = chunk_pages([page], strategy="block", token_budget=120, overlap_tokens=60)
+    assert any(a.char_end > b.char_start for a, b in zip(chunks, chunks[1:]))
+
+
+def test_oversized_block_is_split_on_sentences():
+    page = make_page(paragraph("long", sentences=40))
+    chunks = chunk_pages([page], strategy="block", token_budget=50, overlap_tokens=0)
+    assert len(chunks) > 1
+    assert all(c.text_content.endswith(".") for c in chunks)
+
+
+def test_unknown_strategy(page):
+    with pytest.raises(ValueError):
+        chunk_pages([page], strategy="sentences")
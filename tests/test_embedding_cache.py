@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+from src.infra.embedding_cache import CachedEmbeddingFunction, EmbeddingCache
+
+
+class CountingEmbedder:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, texts):
+        self.calls.append(list(texts))
+        return [np.array([len(t), t.count("a"), 1.0], dtype=np.float64) for t in texts]
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return EmbeddingCache(db_path=tmp_path / "embeddings.db")
+
+
+def test_only_missing_texts_are_embedded(cache):
+    model = CountingEmbedder()
+    embed = CachedEmbeddingFunction(lambda: model, model_name="mini", cache=cache)
+
+    first = embed(["alpha", "beta"])
+    second = embed(["beta", "gamma", "alpha  "])  # whitespace-normalized hit
+
+    assert model.calls == [["alpha", "beta"], ["gamma"]]
+    assert np.array_equal(second[0], first[1])
+    assert np.array_equal(second[2], first[0])
+    assert all(v.dtype == np.float32 for v in first + second)
+    assert (cache.hits, cache.misses) == (2, 3)
+
+
+def test_fully_cached_batch_never_builds_the_model(cache):
+    CachedEmbeddingFunction(CountingEmbedder, model_name="mini", cache=cache)(["alpha"])
+
+    def fail():
+        raise AssertionError("model should not be loaded")
+
+    vectors = CachedEmbeddingFunction(fail, model_name="mini", cache=cache)(["alpha"])
+    assert vectors[0].tolist() == [5.0, 2.0, 1.0]
+
+
+def test_cache_is_keyed_by_model(cache):
+    a, b = CountingEmbedder(), CountingEmbedder()
+    CachedEmbeddingFunction(lambda: a, model_name="mini", cache=cache)(["alpha"])
+    CachedEmbeddingFunction(lambda: b, model_name="mpnet", cache=cache)(["alpha"])
+    assert b.calls == [["alpha"]]
+
+
+def test_duplicate_misses_are_embedded_once(cache):
+    model = CountingEmbedder()
+    vectors = CachedEmbeddingFunction(lambda: model, model_name="mini", cache=cache)(["x", "x", "y"])
+    assert model.calls == [["x", "y"]]
+    assert np.array_equal(vectors[0], vectors[1])
+
+
+def test_vectors_of_another_size_are_embedded_again(cache):
+    CachedEmbeddingFunction(CountingEmbedder, model_name="mini", cache=cache)(["alpha"])
+    cache.put_many("mini", ["torn"], [np.ones(3, dtype=np.float32)])
+    conn = cache._get_conn()
+    conn.execute("UPDATE embeddings SET vector = X'00000000' WHERE text_hash = 'torn'")
+    conn.commit()
+    conn.close()
+
+    assert cache.get_many("mini", ["torn"]) == [None]
+    model = CountingEmbedder()
+    # The model now produces 3-dim vectors, but the cache is asked for 4
+    vectors = CachedEmbeddingFunction(lambda: model, model_name="mini", cache=cache, dim=4)(["alpha"])
+    assert model.calls == [["alpha"]]
+    assert vectors[0].shape == (3,)
+
+
+def test_cached_search_never_loads_the_model(cache, tmp_path):
+    from src.infra.knowledge_base import search
+    from src.infra.vector_store import NumpyVectorStore
+
+    CachedEmbeddingFunction(CountingEmbedder, model_name="mini", cache=cache)(["dose", "alpha"])
+    store = NumpyVectorStore(tmp_path / "vectors")
+    store.upsert(["1"], [np.array([5.0, 2.0, 1.0])], ["alpha"], [{"confidence": "high"}])
+
+    def fail():
+        raise AssertionError("model should not be loaded")
+
+    hits = search(store, "dose", embedder=CachedEmbeddingFunction(fail, model_name="mini", cache=cache, dim=3))
+    assert [hit["fact_id"] for hit in hits] == [1]
@@ -0,0 +1,89 @@
+import fitz
+import pytest
+from src.config import Config
+from src.infra import ingest
+from src.infra.ingest import ingest_many, ingest_pdf, iter_pdf_chunks
+
+
+def write_pdf(path, page_count):
+    doc = fitz.open()
+    for index in range(page_count):
+        page = doc.new_page()
+        if index % 5 != 4:  # leave some pages blank
+            page.insert_text((72, 72), f"Section {index + 1}: recommended dosage is {index} mg.")
+            page.insert_text((72, 144), "Warnings and precautions apply.")
+    doc.save(path)
+    doc.close()
+    return path
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    path = tmp_path / "ingest_cache"
+    monkeypatch.setattr(Config, "INGEST_CACHE_DIR", path)
+    return path
+
+
+@pytest.fixture
+def label(tmp_path):
+    return write_pdf(tmp_path / "label.pdf", 12)
+
+
+def test_parallel_ingest_matches_sequential(label, monkeypatch):
+    monkeypatch.setattr(Config, "INGEST_PARALLEL_MIN_PAGES", 1)
+    sequential = ingest_pdf(label, workers=1)
+    parallel = ingest_pdf(label, workers=3)
+
+    assert [c.model_dump() for c in parallel] == [c.model_dump() for c in sequential]
+    assert [c.page_number for c in sequential] == [1, 2, 3, 4, 6, 7, 8, 9, 11, 12]
+
+
+def test_iter_pdf_chunks_streams_in_page_order(label):
+    stream = iter_pdf_chunks(label, workers=1)
+    first = next(stream)
+    assert first.page_number == 1
+    assert first.chunk_id == first.compute_id()
+
+
+def test_ingest_many_reports_failures_in_order(tmp_path, label):
+    other = write_pdf(tmp_path / "other.pdf", 3)
+    missing = tmp_path / "missing.pdf"
+
+    results = list(ingest_many([label, missing, other], workers=2))
+
+    assert [path.name for path, _, _ in results] == ["label.pdf", "missing.pdf", "other.pdf"]
+    assert results[1][1] is None and results[1][2] is not None
+    assert len(results[2][1]) == 3
+
+
+def test_cache_serves_unchanged_file_without_parsing(label, cache_dir, monkeypatch):
+    first = ingest_pdf(label, workers=1)
+    assert len(list(cache_dir.iterdir())) == 1
+
+    def no_parse(*args):
+        raise AssertionError("cached file should not be parsed")
+
+    monkeypatch.setattr(ingest, "_page_to_chunk", no_parse)
+    second = ingest_pdf(label, workers=1)
+    assert [c.model_dump() for c in second] == [c.model_dump() for c in first]
+
+
+def test_cache_keeps_doc_name_of_renamed_copy(label, tmp_path):
+    ingest_pdf(label, workers=1)
+    copy = tmp_path / "renamed.pdf"
+    copy.write_bytes(label.read_bytes())
+
+    chunks = ingest_pdf(copy, workers=1)
+    assert {c.doc_name for c in chunks} == {"renamed.pdf"}
+    assert all(c.chunk_id == c.compute_id() for c in chunks)
+
+
+def test_cache_invalidated_by_content_or_version(label, tmp_path, cache_dir, monkeypatch):
+    ingest_pdf(label, workers=1)
+    monkeypatch.setattr(Config, "INGEST_VERSION", "2")
+    ingest_pdf(label, workers=1)
+
+    write_pdf(label, 4)
+    chunks = ingest_pdf(label, workers=1)
+    assert len(chunks) == 4
+    assert len(list(cache_dir.iterdir())) == 3
@@ -0,0 +1,157 @@
+import pytest
+from src.config import Config
+from src.core.agent import ExtractionAgent
+from src.core.pipeline import run_extraction
+from src.core.policy import ExtractionPolicy
+from src.infra.ingest import file_content_hash
+from src.infra.jobs import Heartbeat, JobQueue
+from src.infra.store import AuditStore
+from src.scripts import batch, batch_workers
+from tests.fakes import StaticRetriever, make_chunk, page_chat
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = AuditStore(tmp_path / "audit.db")
+    yield store
+    store.close()
+
+
+def test_failed_items_back_off_then_fail_for_good(store):
+    run_id = store.start_run("label.pdf", "m", 42)
+    queue = JobQueue(store, run_id, max_attempts=2, backoff_seconds=0, max_backoff_seconds=0)
+    queue.enqueue([("Dosage", "c1"), ("Dosage", "c2")])
+
+    assert queue.lease() == [("Dosage", "c1"), ("Dosage", "c2")]
+    assert queue.lease() == [("Dosage", "c1"), ("Dosage", "c2")]  # held, not leased twice
+    assert queue.progress() == {"leased": 2}
+    queue.complete("Dosage", "c1")
+    queue.fail("Dosage", "c2", "timeout")
+    store.flush()
+    assert queue.progress() == {"done": 1, "pending": 1}
+
+    assert queue.lease() == [("Dosage", "c2")]
+    queue.fail("Dosage", "c2", "timeout")
+    store.flush()
+    assert queue.progress() == {"done": 1, "failed": 1}
+    assert queue.is_finished()
+
+    # Re-enqueueing keeps finished items; --retry-failed gives a fresh set
+    queue.enqueue([("Dosage", "c1"), ("Dosage", "c2")])
+    store.release_jobs(run_id, failed=True)
+    assert queue.lease() == [("Dosage", "c2")]
+
+
+def test_pipeline_retries_only_the_failed_call(monkeypatch, store):
+    sent = page_chat(monkeypatch, failing={2})
+    chunks = [make_chunk(1), make_chunk(2)]
+    run_id = store.start_run("label.pdf", "m", 42)
+    agent = ExtractionAgent(store=store, run_id=run_id)
+    queue = JobQueue(store, run_id, backoff_seconds=0)
+    sections = {"Dosage": "What is the dose?", "Storage": "How is it stored?"}
+    policy = ExtractionPolicy(prefilters={"Storage": ("refrigerate",)})
+
+    run_extraction(agent, StaticRetriever(chunks), sections=sections, policy=policy, queue=queue)
+    store.flush()
+    assert sent == [1, 2]
+    assert queue.progress() == {"done": 1, "pending": 1}
+
+    # The server is back; only the failed item is sent again
+    sent = page_chat(monkeypatch)
+    result = run_extraction(agent, StaticRetriever(chunks), sections=sections, policy=policy, queue=queue)
+    store.flush()
+    assert sent == [2]
+    assert [f.value for f in result[0].facts] == ["20 mg"]
+    assert queue.progress() == {"done": 2}
+
+    # Each section's stats are logged by the first pass only
+    stats = store._get_conn().execute("SELECT section_name, chunk_count, skipped_chunks FROM section_stats ORDER BY id").fetchall()
+    assert sorted(stats) == [("Dosage", 2, 0), ("Storage", 0, 2)]
+
+
+def test_items_no_longer_selected_are_skipped(monkeypatch, store):
+    # Planned with a looser policy: pages 2 and 3 are no longer retrieved
+    sent = page_chat(monkeypatch)
+    chunks = [make_chunk(page) for page in (1, 2, 3)]
+    run_id = store.start_run("label.pdf", "m", 42)
+    queue = JobQueue(store, run_id)
+    queue.enqueue(("Dosage", c.chunk_id) for c in chunks)
+
+    run_extraction(ExtractionAgent(store=store, run_id=run_id), StaticRetriever(chunks[:1]), sections={"Dosage": "What is the dose?"}, queue=queue)
+    store.flush()
+    assert sent == [1]
+    assert queue.progress() == {"done": 1, "skipped": 2}
+    assert queue.is_finished()
+
+def test_batch_resumes_an_interrupted_run(monkeypatch, tmp_path, store):
+    monkeypatch.setattr(Config, "LLM_WARMUP", False)
+    chunks = [make_chunk(page) for page in (1, 2, 3)]
+    monkeypatch.setattr(batch.KeywordRetriever, "retrieve_with_scores", lambda self, query, top_k=3: [(1.0, c) for c in chunks])
+    items = [(title, c.chunk_id) for title in Config.TARGET_SECTIONS for c in chunks]
+
+    # An earlier batch finished page 1, then died holding the leases on the rest
+    (tmp_path / "label.pdf").write_bytes(b"%PDF label")
+    run_id = store.start_run("label.pdf", "m", 42, content_hash=file_content_hash(tmp_path / "label.pdf"))
+    store.enqueue_jobs(run_id, items)
+    crashed = JobQueue(store, run_id, owner="dead-worker")
+    crashed.lease()
+    for title in Config.TARGET_SECTIONS:
+        crashed.complete(title, chunks[0].chunk_id)
+    store.flush()
+
+    sent = page_chat(monkeypatch)
+    status = batch.process_one_file(tmp_path / "label.pdf", "m", store, chunks=chunks)
+
+    assert status == "completed"
+    assert sorted(sent) == [2] * len(Config.TARGET_SECTIONS) + [3] * len(Config.TARGET_SECTIONS)
+    assert store.job_progress(run_id) == {"done": len(items)}
+    assert store.find_run("label.pdf", "m", status="completed") == run_id
+    assert batch.process_one_file(tmp_path / "label.pdf", "m", store, chunks=chunks) is None
+
+
+def test_workers_never_share_items_and_reclaim_expired_leases(tmp_path, store):
+    runs = [store.start_run(f"label{i}.pdf", "m", 42) for i in range(2)]
+    for run_id in runs:
+        store.enqueue_jobs(run_id, [("Dosage", "c1"), ("Dosage", "c2")])
+    other = AuditStore(tmp_path / "audit.db")
+
+    # Each worker leases all due items of one run
+    first, leased = store.lease_next_run(runs, "w1", lease_seconds=60)
+    second, other_leased = other.lease_next_run(runs, "w2", lease_seconds=60)
+    assert (first, second) == tuple(runs)
+    assert not set(leased.values()) & set(other_leased.values())
+    assert other.lease_next_run(runs, "w3", lease_seconds=60) == (None, {})
+
+    # w1 died: its heartbeat stops, its leases run out and w3 takes the items over
+    store.renew_leases("w1", lease_seconds=-1)
+    with Heartbeat(other, "w2", lease_seconds=60, interval=0.01):
+        assert other.lease_next_run(runs, "w3", lease_seconds=60) == (first, leased)
+
+    # w1 was only slow: its late results no longer close the items w3 holds
+    store.complete_job(leased[("Dosage", "c1")], "w1")
+    store.fail_job(leased[("Dosage", "c2")], "w1", "timeout", 3, 0, 0)
+    store.flush()
+    assert store.job_progress(first) == {"leased": 2}
+    other.close()
+
+
+def test_worker_drains_the_planned_runs(monkeypatch, tmp_path, store):
+    monkeypatch.setattr(batch_workers.LLMClient, "warm_up", lambda self, model: 1.5)
+    chunks = [make_chunk(page) for page in (1, 2)]
+    monkeypatch.setattr(batch_workers.KeywordRetriever, "retrieve_with_scores", lambda self, query, top_k=3: [(1.0, c) for c in chunks])
+    monkeypatch.setattr(batch_workers, "ingest_pdf", lambda path, workers, strategy, content_hash: chunks)
+    monkeypatch.setattr(batch_workers, "AuditStore", lambda: AuditStore(tmp_path / "audit.db"))
+    settings = batch_workers.WorkerSettings(folder=tmp_path, model_name="m", use_cache=False)
+
+    run_id = store.start_run("label.pdf", "m", 42)
+    store.enqueue_jobs(run_id, [(title, c.chunk_id) for title in Config.TARGET_SECTIONS for c in chunks])
+    sent = page_chat(monkeypatch)
+    batch_workers.run_worker(settings, [run_id])
+
+    assert len(sent) == 2 * len(Config.TARGET_SECTIONS)
+    progress = store.batch_progress([run_id])
+    assert progress["jobs"] == {"done": len(sent)}
+    assert progress["prompts"] == len(sent)
+    assert list(progress["workers"].values()) == [len(sent)]
+    assert store.find_run("label.pdf", "m", status="completed") == run_id
+    assert store._get_conn().execute("SELECT warmup_seconds FROM runs WHERE run_id = ?", (run_id,)).fetchone() == (1.5,)
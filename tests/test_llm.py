@@ -0,0 +1,40 @@
+from src.core.agent import ExtractionAgent
+from src.infra.llm import LLMClient
+
+
+class RecordingOllama:
+    def __init__(self):
+        self.calls = []
+
+    def chat(self, **kwargs):
+        self.calls.append(("chat", kwargs))
+        return iter([])
+
+    def generate(self, **kwargs):
+        self.calls.append(("generate", kwargs))
+        return {"done": True}
+
+
+def test_requests_carry_keep_alive_and_runtime_options():
+    client = LLMClient(keep_alive="1h", num_ctx=4096, num_thread=None)
+    client.client = RecordingOllama()
+
+    client.chat("gemma2:2b", [{"role": "user", "content": "hi"}], format="json", options={"seed": 42}, stream=True)
+
+    (_, kwargs), = client.client.calls
+    assert kwargs["keep_alive"] == "1h"
+    assert kwargs["options"] == {"num_ctx": 4096, "seed": 42}
+    assert kwargs["stream"] is True
+
+
+def test_agent_warms_up_every_cascade_model():
+    client = LLMClient(keep_alive=-1)
+    client.client = RecordingOllama()
+    agent = ExtractionAgent(models=["small", "large"], client=client)
+
+    seconds = agent.warm_up()
+
+    assert [kwargs["model"] for _, kwargs in client.client.calls] == ["small", "large"]
+    assert all(kwargs["keep_alive"] == -1 for _, kwargs in client.client.calls)
+    assert set(client.warmup_seconds) == {"small", "large"}
+    assert seconds >= 0
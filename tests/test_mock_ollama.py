@@ -0,0 +1,87 @@
+import random
+import socket
+import struct
+import threading
+import time
+import pytest
+from src.core.agent import ExtractionAgent
+from src.infra.llm import LLMClient
+from src.scripts.mock_ollama import Fixtures, MockOllama, default_response, make_server, parse_distribution
+from tests.fakes import make_chunk
+
+
+@pytest.fixture
+def serve_mock():
+    servers = []
+
+    def start(mock: MockOllama) -> LLMClient:
+        server = make_server("127.0.0.1", 0, mock)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return LLMClient(host=f"http://127.0.0.1:{server.server_address[1]}", keep_alive="5m", timeout=10)
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def test_distributions_are_deterministic_per_seed():
+    for spec in ("0.5", "uniform:0.1,0.2", "normal:0.5,0.1", "lognormal:-1,0.5", "exp:0.3"):
+        sample = parse_distribution(spec)
+        assert sample(random.Random("x")) == sample(random.Random("x")) >= 0
+    with pytest.raises(ValueError):
+        parse_distribution("gamma:1")
+
+
+def test_default_response_quotes_the_context():
+    agent = ExtractionAgent(client=LLMClient())
+    chunk = make_chunk(3, "Intro\nKEYTRUDA is indicated for melanoma. Other text.")
+
+    single = default_response(agent._build_prompt(chunk, "What is it for?"))
+    grouped = default_response(agent._build_grouped_prompt(chunk, {"A": "a?", "B": "b?"}))
+
+    assert single["quote_snippet"] == "KEYTRUDA is indicated for melanoma."
+    assert set(grouped) == {"A", "B"}
+
+
+def test_agent_runs_end_to_end_within_the_concurrency_limit(serve_mock):
+    mock = MockOllama(ttft="0.02", parallel=2, tail_tokens=20)
+    client = serve_mock(mock)
+    chunks = [make_chunk(p, f"Page {p}. The recommended dose is {p}0 mg daily.") for p in range(1, 7)]
+
+    agent = ExtractionAgent(client=client, max_concurrency=4)
+    facts = list(agent.extract_many([(chunk, "What is the dose?") for chunk in chunks]))
+
+    assert [f.citations[0].quote_snippet for f in facts] == [f"The recommended dose is {p}0 mg daily." for p in range(1, 7)]
+    assert mock.stats["requests"] == 6
+    assert mock.stats["peak_in_flight"] == 2
+
+
+def test_fixtures_and_cold_starts(serve_mock):
+    fixtures = Fixtures([{"match": "Page 9", "response": "not json"}])
+    mock = MockOllama(fixtures=fixtures, load_time="0.2")
+    client = serve_mock(mock)
+
+    agent = ExtractionAgent(model_name="mock-model", client=client)
+    assert agent.warm_up() >= 0.2
+    assert agent.warm_up() < 0.2  # still resident under keep-alive
+    assert agent.extract_fact(make_chunk(9, "The dose is 10 mg daily."), "Dose?") is None
+    assert mock.stats["loads"] == 1
+
+
+def test_client_resets_are_not_reported(capsys):
+    server = make_server("127.0.0.1", 0, MockOllama(ttft="0.1"))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    body = b'{"model": "m", "messages": [{"role": "user", "content": "hi"}]}'
+
+    # Sends a request, then resets the connection while the answer is pending
+    conn = socket.create_connection(server.server_address)
+    conn.sendall(b"POST /api/chat HTTP/1.1\r\nContent-Length: %d\r\n\r\n%s" % (len(body), body))
+    conn.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack("ii", 1, 0))
+    conn.close()
+    time.sleep(0.3)
+    server.shutdown()
+    server.server_close()
+
+    assert "Traceback" not in capsys.readouterr().err
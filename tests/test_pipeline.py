@@ -0,0 +1,110 @@
+import json
+from src.core.agent import ExtractionAgent
+from src.core.pipeline import run_extraction
+from src.core.policy import ExtractionPolicy
+from tests.fakes import StaticRetriever, make_chunk, use_fake_chat
+
+
+def test_grouped_run_sends_each_chunk_once(monkeypatch):
+    prompts = []
+
+    def chat(model, messages, format, options):
+        prompts.append(messages[0]['content'])
+        return {'message': {'content': json.dumps({
+            "A": {"value": "alpha", "quote_snippet": "alpha is here", "confidence": "high"},
+            "B": {"value": "beta", "quote_snippet": "beta is here", "confidence": "medium"},
+        })}}
+
+    use_fake_chat(monkeypatch, chat)
+    chunks = [make_chunk(1, "alpha is here. beta is here."), make_chunk(2, "alpha is here and beta is here")]
+    sections = {"A": "Where is alpha?", "B": "Where is beta?"}
+    durations = {}
+
+    result = run_extraction(
+        ExtractionAgent(), StaticRetriever(chunks), sections=sections, grouped=True,
+        on_section=lambda title, duration, facts: durations.setdefault(title, duration)
+    )
+
+    assert len(prompts) == 2
+    assert [s.title for s in result] == ["A", "B"]
+    assert [f.value for f in result[0].facts] == ["alpha", "alpha"]
+    assert [f.value for f in result[1].facts] == ["beta", "beta"]
+    assert set(durations) == {"A", "B"}
+
+
+def test_ungrouped_run_sends_one_prompt_per_section_chunk(monkeypatch):
+    prompts = []
+
+    def chat(model, messages, format, options):
+        prompts.append(messages[0]['content'])
+        return {'message': {'content': json.dumps({"value": "NOT_FOUND", "quote_snippet": "", "confidence": "low"})}}
+
+    use_fake_chat(monkeypatch, chat)
+    chunks = [make_chunk(1, "alpha"), make_chunk(2, "beta")]
+
+    result = run_extraction(ExtractionAgent(), StaticRetriever(chunks), sections={"A": "a?", "B": "b?"})
+
+    assert len(prompts) == 4
+    assert all(s.missing_info == ["No evidence found"] for s in result)
+
+
+class StatsStore:
+    def __init__(self):
+        self.stats = {}
+
+    def log_interaction(self, **row):
+        pass
+
+    def save_fact(self, run_id, fact, chunk_id=None):
+        pass
+
+    def log_section_stats(self, run_id, section_name, duration, chunk_count, skipped_chunks=0):
+        self.stats[section_name] = (chunk_count, skipped_chunks)
+
+
+def _answer_by_page(confidences):
+    """Fake chat whose answer confidence depends on the page in the prompt."""
+    prompts = []
+
+    def chat(model, messages, format, options):
+        prompt = messages[0]['content']
+        prompts.append(prompt)
+        page = int(prompt.split("(Page ")[1].split(")")[0])
+        return {'message': {'content': json.dumps({
+            "value": f"page {page}", "quote_snippet": f"fact on page {page}", "confidence": confidences[page]
+        })}}
+
+    return prompts, chat
+
+
+def test_stop_on_high_confidence_skips_remaining_chunks(monkeypatch):
+    prompts, chat = _answer_by_page({1: "medium", 2: "high", 3: "high"})
+    use_fake_chat(monkeypatch, chat)
+    chunks = [make_chunk(p, f"fact on page {p}") for p in (1, 2, 3)]
+
+    store = StatsStore()
+    result = run_extraction(
+        ExtractionAgent(store=store, run_id="run-1"), StaticRetriever(chunks),
+        sections={"A": "a?"}, policy=ExtractionPolicy(stop_on_high_confidence=True)
+    )
+
+    assert len(prompts) == 2
+    assert [f.value for f in result[0].facts] == ["page 1", "page 2"]
+    assert store.stats == {"A": (2, 1)}
+
+
+def test_min_score_and_prefilter_gate_chunks(monkeypatch):
+    prompts, chat = _answer_by_page({1: "high", 2: "high", 3: "high"})
+    use_fake_chat(monkeypatch, chat)
+    chunks = [make_chunk(1, "fact on page 1"), make_chunk(2, "fact on page 2 about dosing"), make_chunk(3, "fact on page 3")]
+
+    store = StatsStore()
+    policy = ExtractionPolicy(min_score=1.5, prefilters={"B": ("dosing",)})
+    run_extraction(
+        ExtractionAgent(store=store, run_id="run-1"), StaticRetriever(chunks),
+        sections={"A": "a?", "B": "b?"}, policy=policy
+    )
+
+    # A keeps pages 1-2 (score >= 1.5); B additionally requires "dosing"
+    assert len(prompts) == 3
+    assert store.stats == {"A": (2, 1), "B": (1, 2)}
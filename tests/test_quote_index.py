@@ -0,0 +1,54 @@
+import numpy as np
+from src.core.schema import DocumentChunk
+from src.infra.chunking import chunk_pages
+from src.infra.quote_index import QuoteIndex, suffix_array
+
+PAGES = {
+    1: "1 INDICATIONS AND USAGE\n\nDrug X is indicated for the treatment of adult patients with\nmelanoma.",
+    2: "2 DOSAGE AND ADMINISTRATION\n\nThe recommended dose is 100 mg every 3 weeks.\n\nDo not exceed 10 mg/kg.",
+}
+
+
+def test_suffix_array_sorts_every_suffix():
+    text = "mississippi banana, mississippi"
+    codes = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32)
+    assert list(suffix_array(codes)) == sorted(range(len(text)), key=lambda i: text[i:])
+
+
+def test_locate_maps_hits_to_pages_across_breaks():
+    index = QuoteIndex(PAGES)
+
+    dose, = index.locate("the recommended DOSE is 100 mg")
+    assert (dose.page_number, dose.end_page_number) == (2, 2)
+    assert PAGES[2][dose.char_start:dose.char_end] == dose.evidence == "The recommended dose is 100 mg"
+
+    # Crosses a line break within the page, then a page break
+    crossing, = index.locate("adult patients with melanoma. 2 Dosage and Administration")
+    assert (crossing.page_number, crossing.end_page_number) == (1, 2)
+    assert crossing.evidence.startswith("adult patients") and crossing.evidence.endswith("ADMINISTRATION")
+
+    # Whole words only, and unknown quotes miss
+    assert index.locate("dose is 10 mg") == []
+    assert index.locate("indicated for lung cancer") == []
+
+
+def test_from_chunks_rebuilds_windowed_pages():
+    pages = [
+        DocumentChunk(chunk_id=str(n), doc_name="label.pdf", page_number=n, text_content=text)
+        for n, text in PAGES.items()
+    ]
+    windows = chunk_pages(pages, strategy="block", token_budget=8, overlap_tokens=0)
+    assert len(windows) > len(pages)
+
+    hit, = QuoteIndex.from_chunks(windows).locate("every 3 weeks. Do not exceed")
+    assert PAGES[2][hit.char_start:hit.char_end] == "every 3 weeks.\n\nDo not exceed"
+
+
+def test_quotes_cross_empty_pages_and_case_fold_consistently():
+    index = QuoteIndex({1: "the dose is 10 mg", 2: "", 3: "  \n", 4: "daily with food"})
+    hit, = index.locate("10 mg daily")
+    assert (hit.page_number, hit.end_page_number) == (1, 4)
+
+    # "İ" lowercases to two characters; quote and index fold it the same way
+    hit, = QuoteIndex({1: "Take İBUPROFEN with water."}).locate("take İbuprofen")
+    assert hit.evidence == "Take İBUPROFEN"
@@ -0,0 +1,38 @@
+from src.core.schema import DocumentChunk
+from src.infra.retriever import KeywordRetriever
+
+
+def make_chunks(*texts):
+    chunks = []
+    for page, text in enumerate(texts, start=1):
+        chunk = DocumentChunk(chunk_id="", doc_name="label.pdf", page_number=page, text_content=text)
+        chunk.chunk_id = chunk.compute_id()
+        chunks.append(chunk)
+    return chunks
+
+
+def test_rare_terms_outrank_common_ones():
+    chunks = make_chunks(
+        "The drug is given with the meal and the water.",
+        "Recommended dosage: 200 mg every 3 weeks. Dosage adjustments for renal impairment.",
+        "The patient is monitored and the dose is recorded.",
+    )
+    results = KeywordRetriever(chunks).retrieve("What is the recommended dosage?", top_k=3)
+    assert results[0].page_number == 2
+
+
+def test_non_matching_chunks_are_excluded():
+    chunks = make_chunks("alpha beta", "gamma delta", "beta beta beta")
+    results = KeywordRetriever(chunks).retrieve("beta", top_k=5)
+    assert [c.page_number for c in results] == [3, 1]
+
+
+def test_scores_are_descending_and_top_k_is_respected():
+    chunks = make_chunks("warning", "boxed warning", "boxed warning warning", "nothing here")
+    scored = KeywordRetriever(chunks).retrieve_with_scores("boxed warning", top_k=2)
+    assert len(scored) == 2
+    assert scored[0][0] >= scored[1][0] > 0
+
+
+def test_empty_corpus():
+    assert KeywordRetriever([]).retrieve("anything") == []
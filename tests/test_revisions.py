@@ -0,0 +1,85 @@
+import sqlite3
+from src.config import Config
+from src.infra.revisions import match_unchanged
+from src.infra.store import AuditStore
+from src.scripts import batch
+from tests.fakes import make_chunk, page_chat
+
+
+def make_label(name, texts):
+    return [make_chunk(page, text, doc_name=name) for page, text in enumerate(texts, start=1)]
+
+
+def test_moved_pages_still_match():
+    old = make_label("label.pdf", ["Page 1 dose is 10 mg.", "Page 2 dose is 20 mg."])
+    new = make_label("label.pdf", ["New boxed warning.", "Page 1 dose is 10 mg.", "Page 2 dose is 20 mg."])
+    previous = [(c.chunk_id, c.page_number, c.content_hash()) for c in old]
+
+    matched = match_unchanged(previous, new)
+    assert matched == {new[1].chunk_id: (old[0].chunk_id, 1), new[2].chunk_id: (old[1].chunk_id, 2)}
+
+
+def test_revision_only_sends_changed_pages(monkeypatch, tmp_path):
+    monkeypatch.setattr(Config, "LLM_WARMUP", True)
+    store = AuditStore(tmp_path / "audit.db")
+    selected, warmed = [], []
+    monkeypatch.setattr(batch.ExtractionAgent, "warm_up", lambda self: warmed.append(self.run_id) or 0.5)
+    monkeypatch.setattr(batch.KeywordRetriever, "retrieve_with_scores", lambda self, query, top_k=3: [(1.0, c) for c in selected])
+    sections = len(Config.TARGET_SECTIONS)
+
+    def process(name, texts):
+        path = tmp_path / name
+        path.write_bytes("|".join(texts).encode())
+        selected[:] = make_label(name, texts)
+        sent = page_chat(monkeypatch)
+        batch.process_one_file(path, "m", store, chunks=list(selected))
+        return sent, store.find_run(name, "m", status="completed")
+
+    sent, first = process("label.pdf", [f"Page {p} dose is {p}0 mg." for p in (1, 2, 3)])
+    assert sorted(sent) == sorted([1, 2, 3] * sections)
+
+    # Same name, page 2 revised: only page 2 goes to the LLM
+    sent, second = process("label.pdf", ["Page 1 dose is 10 mg.", "Page 2 dose is 25 mg.", "Page 3 dose is 30 mg."])
+    assert second != first
+    assert sent == [2] * sections
+    assert store.job_progress(second) == {"done": sections, "carried": 2 * sections}
+
+    # Same content under a new name: nothing is sent
+    sent, renamed = process("label-copy.pdf", ["Page 1 dose is 10 mg.", "Page 2 dose is 25 mg.", "Page 3 dose is 30 mg."])
+    assert sent == []
+    assert store.job_progress(renamed) == {"carried": 3 * sections}
+    assert warmed == [first, second]
+    store.close()
+
+    conn = sqlite3.connect(tmp_path / "audit.db")
+    assert conn.execute("SELECT parent_run_id FROM runs WHERE run_id = ?", (renamed,)).fetchone() == (second,)
+    lineage = conn.execute(
+        """SELECT f.chunk_page, f.value, source.run_id FROM facts f JOIN facts source ON source.id = f.carried_from
+           WHERE f.run_id = ? ORDER BY f.id""",
+        (second,)
+    ).fetchall()
+    assert {(page, value) for page, value, _ in lineage} == {(1, "10 mg"), (3, "30 mg")}
+    assert {run_id for _, _, run_id in lineage} == {first}
+    assert conn.execute("SELECT COUNT(*) FROM facts WHERE run_id = ?", (renamed,)).fetchone() == (3 * sections,)
+    conn.close()
+
+
+def test_only_hashed_batch_runs_are_resumed(tmp_path):
+    store = AuditStore(tmp_path / "audit.db")
+    path = tmp_path / "label.pdf"
+    path.write_bytes(b"%PDF revision 2")
+    content_hash = batch.file_content_hash(path)
+
+    # Interrupted before hashes were recorded, and an interrupted main.py run (no jobs)
+    legacy = store.start_run("label.pdf", "m", 42)
+    store.enqueue_jobs(legacy, [("Dosage", "c1")])
+    store.start_run("label.pdf", "m", 42, content_hash=content_hash)
+    assert store.find_run("label.pdf", "m", status="running", content_hash=content_hash, with_jobs=True) is None
+
+    # A completed legacy run may predate a revision, so the file is processed again
+    store.finish_run(legacy)
+    assert batch.find_finished_run(store, "label.pdf", "m", content_hash=content_hash) is None
+    store.close()
+    conn = sqlite3.connect(tmp_path / "audit.db")
+    assert conn.execute("SELECT content_hash FROM runs WHERE run_id = ?", (legacy,)).fetchone() == (None,)
+    conn.close()
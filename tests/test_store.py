@@ -0,0 +1,151 @@
+import gc
+import sqlite3
+import time
+import weakref
+import pytest
+from src.core.schema import Citation, ConfidenceLevel, Fact
+from src.infra.store import AuditStore
+
+
+def count(db_path, table):
+    conn = sqlite3.connect(db_path)
+    n = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+    conn.close()
+    return n
+
+
+def make_fact(value="10 mg"):
+    return Fact(
+        attribute="What is the dose?", value=value, is_negation=False,
+        confidence=ConfidenceLevel.HIGH, reasoning="test",
+        citations=[Citation(doc_id="label.pdf", page_number=2, quote_snippet="dose is 10 mg")]
+    )
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return tmp_path / "audit.db"
+
+
+def test_uses_wal_journal(db_path):
+    store = AuditStore(db_path)
+    mode = store._get_conn().execute("PRAGMA journal_mode").fetchone()[0]
+    assert mode == "wal"
+    store.close()
+
+
+def test_write_behind_buffers_until_flush(db_path):
+    store = AuditStore(db_path, write_behind=True, flush_rows=100, flush_seconds=3600)
+    run_id = store.start_run("label.pdf", "gemma2:2b", 42)
+    store.log_interaction(run_id, "c1", "q", "p", "{}", True, 0.5)
+    store.save_fact(run_id, make_fact())
+
+    # The run is written immediately; buffered rows are not
+    assert count(db_path, "runs") == 1
+    assert count(db_path, "interactions") == 0
+
+    store.flush()
+    assert count(db_path, "interactions") == 1
+    assert count(db_path, "facts") == 1
+    store.close()
+
+
+def test_flushes_on_a_timer_without_further_writes(db_path):
+    store = AuditStore(db_path, write_behind=True, flush_rows=100, flush_seconds=0.05)
+    store.log_section_stats("run", "s", 0.1, 1)
+
+    deadline = time.monotonic() + 5
+    while count(db_path, "section_stats") == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert count(db_path, "section_stats") == 1
+    store.close()
+
+
+def test_closed_stores_are_freed(db_path):
+    store = AuditStore(db_path, write_behind=True, flush_seconds=3600)
+    store.log_section_stats("run", "s", 0.1, 1)
+    store.close()
+    ref = weakref.ref(store)
+    del store
+    gc.collect()
+    assert ref() is None
+
+
+def test_flushes_at_row_threshold(db_path):
+    store = AuditStore(db_path, write_behind=True, flush_rows=3, flush_seconds=3600)
+    for i in range(7):
+        store.log_section_stats("run", f"s{i}", 0.1, 1)
+    assert count(db_path, "section_stats") == 6
+
+    store.close()
+    assert count(db_path, "section_stats") == 7
+
+
+def test_immediate_mode_and_find_run(db_path):
+    store = AuditStore(db_path, write_behind=False)
+    run_id = store.start_run("label.pdf", "gemma2:2b", 42)
+    store.save_fact(run_id, make_fact())
+
+    assert count(db_path, "facts") == 1
+    assert store.find_run("label.pdf", "gemma2:2b") == run_id
+    assert store.find_run("label.pdf", "other") is None
+    store.close()
+
+
+def test_migrations_upgrade_a_legacy_database(db_path):
+    # Schema as created before versioned migrations existed
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE runs (run_id TEXT PRIMARY KEY, filename TEXT, model_name TEXT, seed INTEGER, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)")
+    conn.execute("CREATE TABLE section_stats (id INTEGER PRIMARY KEY AUTOINCREMENT, run_id TEXT, section_name TEXT, duration_seconds REAL, chunk_count INTEGER)")
+    conn.execute("CREATE TABLE interactions (id INTEGER PRIMARY KEY AUTOINCREMENT, run_id TEXT, chunk_id TEXT, question TEXT, prompt_snapshot TEXT, raw_response TEXT, is_valid_json BOOLEAN, latency_seconds REAL)")
+    conn.execute("CREATE TABLE facts (id INTEGER PRIMARY KEY AUTOINCREMENT, run_id TEXT, chunk_page INTEGER, attribute TEXT, value TEXT, citation_quote TEXT, confidence TEXT)")
+    conn.execute("INSERT INTO runs (run_id, filename, model_name, seed) VALUES ('old', 'label.pdf', 'gemma2:2b', 42)")
+    conn.execute("INSERT INTO interactions (run_id, chunk_id, question) VALUES ('old', 'c0', 'q')")
+    conn.commit()
+    conn.close()
+
+    store = AuditStore(db_path, write_behind=False)
+    store.log_interaction("old", "c1", "q", "p", "{}", True, 0.1, cached=True)
+    assert store.find_run("label.pdf", "gemma2:2b") == "old"
+    store.close()
+
+    conn = sqlite3.connect(db_path)
+    indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    plan = conn.execute("EXPLAIN QUERY PLAN SELECT run_id FROM runs WHERE filename = 'x' AND model_name = 'y'").fetchall()
+    models = conn.execute("SELECT chunk_id, model_name FROM interactions ORDER BY id").fetchall()
+    conn.close()
+
+    # Legacy rows inherit their run's model; new rows default to NULL when not given
+    assert models == [("c0", "gemma2:2b"), ("c1", None)]
+
+    assert {"idx_runs_filename_model", "idx_facts_run", "idx_interactions_run"} <= indexes
+    assert "idx_runs_filename_model" in str(plan)
+
+
+def test_migrations_run_once(db_path):
+    from src.infra.migrations import MIGRATIONS, apply_migrations, current_version
+
+    AuditStore(db_path).close()
+    conn = sqlite3.connect(db_path)
+    assert apply_migrations(conn) == []
+    assert current_version(conn) == MIGRATIONS[-1][0]
+    conn.close()
+
+
+def test_migrations_recheck_the_version_under_the_lock(monkeypatch, db_path):
+    from src.infra import migrations
+
+    # Another process migrated the database after this one read the version
+    AuditStore(db_path).close()
+    real = migrations.current_version
+    reads = []
+
+    def stale_first_read(conn):
+        reads.append(conn)
+        return 0 if len(reads) == 1 else real(conn)
+
+    monkeypatch.setattr(migrations, "current_version", stale_first_read)
+
+    conn = sqlite3.connect(db_path)
+    assert migrations.apply_migrations(conn) == []
+    conn.close()
@@ -0,0 +1,142 @@
+import numpy as np
+import pytest
+from src.core.schema import Citation, ConfidenceLevel, Fact
+from src.infra.store import AuditStore
+from src.infra import vector_store
+from src.infra.vector_store import NumpyVectorStore
+from src.scripts.benchmark import HashingEmbedder
+from src.scripts.build_knowledge_base import build_vector_index
+
+
+def _vectors(count, dim=16, seed=0):
+    return np.random.default_rng(seed).normal(size=(count, dim)).astype(np.float32)
+
+
+def _fill(store, vectors):
+    ids = [str(i) for i in range(len(vectors))]
+    metadatas = [{"confidence": "high" if i % 2 == 0 else "medium", "page": i} for i in range(len(vectors))]
+    store.upsert(ids=ids, embeddings=vectors, documents=[f"doc {i}" for i in ids], metadatas=metadatas)
+
+
+@pytest.fixture
+def vectors():
+    return _vectors(50)
+
+
+def test_query_returns_exact_top_k_in_order(tmp_path, vectors):
+    store = NumpyVectorStore(path=tmp_path)
+    _fill(store, vectors)
+
+    query = vectors[7] + 0.01
+    results = store.query(query_embeddings=[query], n_results=5)
+
+    unit = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    expected = np.argsort(-(unit @ (query / np.linalg.norm(query))))[:5]
+    assert results["ids"][0] == [str(i) for i in expected]
+    assert results["ids"][0][0] == "7"
+    assert results["distances"][0] == sorted(results["distances"][0])
+    assert results["documents"][0][0] == "doc 7"
+
+
+def test_upsert_replaces_existing_ids_and_persists(tmp_path, vectors):
+    store = NumpyVectorStore(path=tmp_path)
+    _fill(store, vectors)
+    store.upsert(ids=["3"], embeddings=[vectors[10]], documents=["updated"], metadatas=[{"confidence": "low"}])
+
+    reopened = NumpyVectorStore(path=tmp_path)
+    assert reopened.count() == 50
+    results = reopened.query(query_embeddings=[vectors[10]], n_results=2)
+    assert set(results["ids"][0]) == {"3", "10"}
+    assert "updated" in results["documents"][0]
+
+
+def test_int8_ranking_tracks_float32(tmp_path, vectors):
+    exact = NumpyVectorStore(path=tmp_path / "f32", dtype="float32")
+    quantized = NumpyVectorStore(path=tmp_path / "i8", dtype="int8")
+    _fill(exact, vectors)
+    _fill(quantized, vectors)
+
+    queries = _vectors(10, seed=1)
+    a = exact.query(query_embeddings=queries, n_results=5)
+    b = quantized.query(query_embeddings=queries, n_results=5)
+
+    assert [ids[0] for ids in a["ids"]] == [ids[0] for ids in b["ids"]]
+    assert np.allclose(a["distances"], b["distances"], atol=0.05)
+
+
+def test_int8_queries_score_in_blocks(monkeypatch, tmp_path, vectors):
+    store = NumpyVectorStore(path=tmp_path, dtype="int8")
+    _fill(store, vectors)
+    queries = _vectors(3, seed=1)
+    whole = store.query(query_embeddings=queries, n_results=5)
+
+    monkeypatch.setattr(vector_store, "SCORE_BLOCK_ROWS", 7)
+    blocked = store.query(query_embeddings=queries, n_results=5)
+    assert blocked["ids"] == whole["ids"]
+    assert np.allclose(blocked["distances"], whole["distances"])
+
+def test_where_filters(tmp_path, vectors):
+    store = NumpyVectorStore(path=tmp_path)
+    _fill(store, vectors)
+
+    high = store.query(query_embeddings=[vectors[1]], n_results=5, where={"confidence": "high"})
+    assert all(m["confidence"] == "high" for m in high["metadatas"][0])
+    assert "1" not in high["ids"][0]
+
+    some = store.query(query_embeddings=[vectors[1]], n_results=10, where={"$and": [
+        {"page": {"$in": [1, 2, 3]}}, {"confidence": {"$ne": "high"}}
+    ]})
+    assert sorted(some["ids"][0]) == ["1", "3"]
+
+
+def test_reset_clears_vectors_and_watermark(tmp_path, vectors):
+    store = NumpyVectorStore(path=tmp_path)
+    _fill(store, vectors)
+    store.save_watermark(42)
+    assert NumpyVectorStore(path=tmp_path).load_watermark() == 42
+
+    store.reset()
+    assert store.count() == 0
+    assert store.load_watermark() == 0
+    assert store.query(query_embeddings=[vectors[0]], n_results=3)["ids"] == [[]]
+
+
+def test_backends_must_implement_the_whole_interface():
+    class Partial(vector_store.VectorStore):
+        def count(self):
+            return 0
+
+    with pytest.raises(TypeError):
+        Partial()
+
+
+def test_incremental_build_embeds_only_new_facts(tmp_path):
+    db_path = tmp_path / "audit.db"
+    store = NumpyVectorStore(path=tmp_path / "kb")
+    embedded = []
+    hashing = HashingEmbedder(dim=16)
+
+    def embed(texts):
+        embedded.extend(texts)
+        return hashing(texts)
+
+    def add_facts(values):
+        with AuditStore(db_path) as audit:
+            run_id = audit.start_run("label.pdf", "m", 42)
+            for value in values:
+                audit.save_fact(run_id, Fact(
+                    attribute="Dose", value=value, is_negation=False, confidence=ConfidenceLevel.HIGH, reasoning="test",
+                    citations=[Citation(doc_id="label.pdf", page_number=1, quote_snippet=f"dose is {value}")]
+                ))
+
+    add_facts(["10 mg", "20 mg"])
+    build_vector_index(db_path=db_path, store=store, embedder=embed)
+    build_vector_index(db_path=db_path, store=store, embedder=embed)
+    assert len(embedded) == 2
+
+    add_facts(["30 mg"])
+    build_vector_index(db_path=db_path, store=store, embedder=embed)
+    assert len(embedded) == 3
+    assert "30 mg" in embedded[-1]
+    assert store.count() == 3
+    assert sorted(NumpyVectorStore(path=tmp_path / "kb").ids) == ["1", "2", "3"]
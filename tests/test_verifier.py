@@ -27,3 +27,22 @@ def test_hallucination_rejection(verifier):
     result = verifier.verify(source, quote)
     assert result["is_verified"] is False
     assert result["score"] < 85
+
+def test_spans_point_at_the_evidence(verifier):
+    source = "  1 INDICATIONS\nTumor Mutational Burden-High (TMB-H) cancer in adults."
+    exact = verifier.verify(source, "cancer in adults")
+    fuzzy = verifier.verify(source, "Tumor Mutational Burden High TMB-H cancer")
+
+    assert source[slice(*exact["span"])] == "cancer in adults"
+    assert fuzzy["matched_substring"] == source[slice(*fuzzy["span"])] == "Tumor Mutational Burden-High (TMB-H) cancer"
+
+def test_verify_many_matches_verify(verifier):
+    source = "Keytruda is indicated for melanoma. The recommended dose is 200 mg every 3 weeks."
+    quotes = [
+        "The recommended dose is 200 mg every 3 weeks.",
+        "recommended dose is 200mg every 3 weeks",
+        "Keytruda is indicated for lung cancer.",
+        "",
+        source + " More text.",
+    ]
+    assert verifier.verify_many(source, quotes) == [verifier.verify(source, q) for q in quotes]